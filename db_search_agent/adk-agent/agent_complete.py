@@ -2,21 +2,19 @@
 Complete ADK Agent combining MCP Toolbox + Logging + AgentOps.
 This is the production-ready version with all features integrated.
 """
+import functools
 import os
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from google.adk.agents import Agent
-from db_wrapper import (
-    MCPToolboxForDatabases,
-    DatabaseCredentialsConfig
-)
 from logging_config import setup_logging
-import google.auth
+from cache import ttl_cached
+from tool_runtime import run_tool, install_uvloop
+from instructions import SHARED_INSTRUCTION
 
 # Setup logging
 logger = setup_logging(
@@ -24,47 +22,12 @@ logger = setup_logging(
     log_file=os.getenv("LOG_FILE", "logs/agent.log")
 )
 
-# Initialize AgentOps
-agentops = None
-if os.getenv("AGENTOPS_API_KEY"):
-    try:
-        from agentops import AgentOps
-        agentops = AgentOps(
-            api_key=os.getenv("AGENTOPS_API_KEY"),
-            tags=["ecommerce", "product-catalog", "mcp"],
-            max_wait_time=5
-        )
-        logger.info("AgentOps initialized")
-    except ImportError:
-        logger.warning("AgentOps package not installed. Install with: pip install agentops")
-    except Exception as e:
-        logger.warning(f"Failed to initialize AgentOps: {str(e)}")
-else:
-    logger.info("AgentOps API key not found, observability disabled")
-
-# Setup MCP Toolbox
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is required")
-
-try:
-    credentials, project = google.auth.default()
-    credentials_config = DatabaseCredentialsConfig(credentials=credentials)
-    logger.info("Google credentials loaded successfully")
-except Exception as e:
-    logger.warning(f"Could not load Google credentials: {e}. Using default credentials.")
-    credentials_config = DatabaseCredentialsConfig()
-
-try:
-    mcp_toolbox = MCPToolboxForDatabases(
-        database_type="postgresql",
-        connection_string=DATABASE_URL,
-        credentials_config=credentials_config
-    )
-    logger.info("MCP Toolbox initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize MCP Toolbox: {str(e)}", exc_info=True)
-    raise
+# Faster event loop for the async tool wrappers, when available
+install_uvloop()
+
+# AgentOps, google.auth, the toolbox and the agents are all created on first
+# use, so importing this module stays cheap on worker cold starts.
+from toolbox_setup import get_agentops, get_mcp_toolbox
 
 # Import custom tools
 from tools.product_tools import (
@@ -72,13 +35,22 @@ from tools.product_tools import (
     get_product_details_mcp,
     get_product_by_slug_mcp,
     check_product_availability_mcp,
+    check_product_availability_batch_mcp,
     get_product_variants_mcp,
+    get_product_with_variants_mcp,
     get_categories_mcp
 )
 from tools.image_search import search_images
+from tools.catalog_program import execute_catalog_program_mcp
+
+# Tool results are cached in-process; categories and images change far less often than products
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "600"))
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "600"))
 
 # Create tool wrappers
-def search_products(
+@ttl_cached(ttl=TOOL_CACHE_TTL, casefold=("query", "category", "brand"))
+async def search_products(
     query: Optional[str] = None,
     category: Optional[str] = None,
     max_price: Optional[float] = None,
@@ -86,7 +58,8 @@ def search_products(
     brand: Optional[str] = None,
     in_stock: bool = True,
     featured: Optional[bool] = None,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None
 ) -> Dict:
     """
     Search for products in the catalog.
@@ -95,8 +68,9 @@ def search_products(
     DO NOT use this when users are asking about attributes (sizes/colors) of a product 
     they've already been discussing - use get_product_variants() instead.
     """
-    return search_products_mcp(
-        mcp_toolbox=mcp_toolbox,
+    return await run_tool(
+        search_products_mcp,
+        mcp_toolbox=get_mcp_toolbox(),
         query=query,
         category=category,
         max_price=max_price,
@@ -104,35 +78,59 @@ def search_products(
         brand=brand,
         in_stock=in_stock,
         featured=featured,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
 
 
-def get_product_details(product_id: int) -> Dict:
+@ttl_cached(ttl=TOOL_CACHE_TTL)
+async def get_product_details(product_id: int) -> Dict:
     """Get detailed information about a specific product."""
-    return get_product_details_mcp(mcp_toolbox=mcp_toolbox, product_id=product_id)
+    return await run_tool(get_product_details_mcp, mcp_toolbox=get_mcp_toolbox(), product_id=product_id)
 
 
-def get_product_by_slug(slug: str) -> Dict:
+@ttl_cached(ttl=TOOL_CACHE_TTL)
+async def get_product_by_slug(slug: str) -> Dict:
     """Get product details by slug."""
-    return get_product_by_slug_mcp(mcp_toolbox=mcp_toolbox, slug=slug)
+    return await run_tool(get_product_by_slug_mcp, mcp_toolbox=get_mcp_toolbox(), slug=slug)
 
 
-def check_product_availability(
+async def check_product_availability(
     product_id: int,
     size: Optional[str] = None,
     color: Optional[str] = None
 ) -> Dict:
     """Check if a product is available in specific size and/or color."""
-    return check_product_availability_mcp(
-        mcp_toolbox=mcp_toolbox,
+    return await run_tool(
+        check_product_availability_mcp,
+        mcp_toolbox=get_mcp_toolbox(),
         product_id=product_id,
         size=size,
         color=color
     )
 
 
-def get_product_variants(
+async def check_product_availability_batch(
+    product_ids: List[int],
+    size: Optional[str] = None,
+    color: Optional[str] = None
+) -> Dict:
+    """
+    Check availability of several products at once in a specific size and/or color.
+
+    Prefer this over calling check_product_availability() repeatedly when you already
+    have a list of products (e.g. from search_products() results).
+    """
+    return await run_tool(
+        check_product_availability_batch_mcp,
+        mcp_toolbox=get_mcp_toolbox(),
+        product_ids=product_ids,
+        size=size,
+        color=color
+    )
+
+
+async def get_product_variants(
     product_id: Optional[int] = None,
     product_name: Optional[str] = None
 ) -> Dict:
@@ -155,19 +153,34 @@ def get_product_variants(
     You can provide either product_id or product_name. If product_name is provided, the tool will find the product first.
     If product_name is None but you know the product from conversation context, extract it from the recent messages.
     """
-    return get_product_variants_mcp(
-        mcp_toolbox=mcp_toolbox,
+    return await run_tool(
+        get_product_variants_mcp,
+        mcp_toolbox=get_mcp_toolbox(),
         product_id=product_id,
         product_name=product_name
     )
 
 
-def get_categories() -> Dict:
+@ttl_cached(ttl=TOOL_CACHE_TTL)
+async def get_product_with_variants(name_or_slug: str) -> Dict:
+    """
+    Get a product AND all its variants (sizes, colors, stock) in a single call.
+
+    Prefer this for follow-up questions about a product already in the conversation
+    (e.g. "do you have it in blue?", "what sizes?"): pass its name ('Blue Denim Jeans',
+    'jeans') or slug.
+    """
+    return await run_tool(get_product_with_variants_mcp, mcp_toolbox=get_mcp_toolbox(), name_or_slug=name_or_slug)
+
+
+@ttl_cached(ttl=CATEGORY_CACHE_TTL, maxsize=1)
+async def get_categories() -> Dict:
     """Get all available product categories."""
-    return get_categories_mcp(mcp_toolbox=mcp_toolbox)
+    return await run_tool(get_categories_mcp, mcp_toolbox=get_mcp_toolbox())
 
 
-def search_product_images(query: str, count: int = 3) -> Dict:
+@ttl_cached(ttl=IMAGE_CACHE_TTL, maxsize=256)
+async def search_product_images(query: str, count: int = 3) -> Dict:
     """
     Search for product images - FIRST checks database, then falls back to Unsplash.
     
@@ -197,190 +210,136 @@ def search_product_images(query: str, count: int = 3) -> Dict:
         Dict with 'images' array containing image objects with 'url' field
         Images from database are prioritized over Unsplash images.
     """
-    return search_images(query=query, count=count, mcp_toolbox=mcp_toolbox)
-
-
-# Shared instruction for both agents
-shared_instruction = (
-    "You are a helpful product assistant. Help users find products by searching the catalog. "
-    "IMPORTANT: Always respond in English, regardless of the user's language. "
-    "When showing products, always include the name, price, stock quantity, and availability. "
-    "Be conversational and friendly. "
-    ""
-    "CRITICAL: CONTEXT AWARENESS - YOU MUST MAINTAIN CONVERSATION CONTEXT: "
-    ""
-    "STEP 1: BEFORE ANSWERING ANY QUESTION, CHECK THE CONVERSATION HISTORY: "
-    "- Look at the last 2-5 messages in the conversation history. "
-    "- Identify if a specific product was mentioned or discussed. "
-    "- If a product was mentioned, that product is NOW IN CONTEXT for follow-up questions. "
-    ""
-    "STEP 2: UNDERSTAND WHAT THE USER IS ASKING: "
-    "- If user asks about 'sizes', 'colors', 'alternative color', 'other color', 'do you have [color]', "
-    "  'what colors', etc. WITHOUT mentioning a product name, they are asking about THE PRODUCT FROM CONTEXT. "
-    "- DO NOT search for new products. DO NOT ask them to specify the product. "
-    "- Use the product from conversation history. "
-    ""
-    "CONCRETE EXAMPLES OF CORRECT BEHAVIOR: "
-    ""
-    "Example 1: "
-    "User: 'jeans' "
-    "You: [Show jeans product] "
-    "User: 'do you have alternative color' "
-    "You: [MUST use get_product_variants(product_name='jeans') or get_product_variants(product_name='Blue Denim Jeans') "
-    "      to check available colors. DO NOT ask them to specify the product - you know it's jeans from context!] "
-    ""
-    "Example 2: "
-    "User: 'red cotton t shirt' "
-    "You: [Show product] "
-    "User: 'what sizes available' "
-    "You: [MUST use get_product_variants(product_name='red cotton t shirt') - DO NOT ask which product] "
-    "User: 'do you have blue color' "
-    "You: [MUST use get_product_variants(product_name='red cotton t shirt') to check if blue is available. "
-    "      This means 'does the red cotton t-shirt come in blue', NOT 'search for blue products'] "
-    ""
-    "Example 3: "
-    "User: 'jeans' "
-    "You: [Show Blue Denim Jeans] "
-    "User: 'do you have any other color?' "
-    "You: [MUST use get_product_variants(product_name='Blue Denim Jeans') or get_product_variants(product_name='jeans'). "
-    "      DO NOT ask 'which product' - you know it's jeans from the previous message!] "
-    ""
-    "RULE: PRODUCT CONTEXT PERSISTS UNTIL A NEW PRODUCT IS MENTIONED: "
-    "- Once a product is mentioned or discussed, it stays in context. "
-    "- Follow-up questions about attributes (sizes, colors, prices, stock) refer to that product. "
-    "- Only when user mentions a DIFFERENT product name does the context change. "
-    ""
-    "WHEN TO USE WHICH TOOL: "
-    "- search_products(): Only when user is searching for NEW products or browsing categories. "
-    "- get_product_variants(): When user asks about sizes/colors/attributes of a product (from context or explicitly mentioned). "
-    "- get_product_details(): When user asks for detailed information about a specific product. "
-    "- search_product_images(): ALWAYS use when user asks to see images, pictures, photos, or asks 'show me the picture'. "
-    "  This is MANDATORY - never say images are unavailable without calling this tool first! "
-    ""
-    "HOW TO EXTRACT PRODUCT NAME FROM CONTEXT: "
-    "- Look for product names in the last few messages: 'jeans', 'Blue Denim Jeans', 'red cotton t shirt', 'Red Cotton T-Shirt', etc. "
-    "- Use the most recent product mentioned. "
-    "- If multiple products were mentioned, use the most recent one. "
-    "- Product names can be partial ('jeans') or full ('Blue Denim Jeans') - both work with get_product_variants(). "
-    ""
-    "HANDLING UNAVAILABLE FEATURES OR INFORMATION: "
-    "- If a user asks about something not in the product data (e.g., 'bulk discount', 'warranty', 'shipping', 'return policy'), "
-    "  simply state that it's not available or not provided, rather than saying 'I don't have the functionality' or 'I cannot fulfill this request'. "
-    "- Examples: "
-    "  * User asks 'bulk discount?' → Say 'We don't currently offer bulk discounts' or 'Bulk discounts are not available' "
-    "  * User asks 'warranty?' → Say 'Warranty information is not available for this product' "
-    "  * User asks 'shipping cost?' → Say 'Shipping information is not available' "
-    "  * NEVER say 'I don't have the functionality' or 'I cannot fulfill this request' - just state the feature is not available. "
-    "CRITICAL: IMAGE REQUESTS - YOU MUST USE search_product_images() TOOL: "
-    "  * When users ask for images, pictures, photos, or to 'show'/'see' images, you MUST use search_product_images() tool. "
-    "  * Common phrases that trigger image search (MUST call the tool for ANY of these): "
-    "    - 'show me the picture', 'show me pictures', 'show me images', 'show me photos' "
-    "    - 'can you show me the picture', 'can you show me pictures', 'can I see the picture' "
-    "    - 'I want to see pictures', 'I want to see images', 'I want to see the image' "
-    "    - 'do you have images', 'are there pictures', 'show images of [product]' "
-    "    - 'picture', 'image', 'photo', 'images' (when used in context of asking to see something) "
-    "    - 'picture of it', 'image of it', 'photo of it' "
-    "  * If the user mentions ANY word related to seeing/viewing images, you MUST call search_product_images()! "
-    "  * ALWAYS extract the product name from conversation context if not explicitly mentioned. "
-    "  * IMPORTANT: When calling search_product_images(), use the FULL product name from context when available! "
-    "  * The tool FIRST searches the database for product images, then falls back to Unsplash. "
-    "  * Examples: "
-    "    - If user discussed 'Red Cotton T-Shirt' → use search_product_images(query='Red Cotton T-Shirt') to get DB images! "
-    "    - If user discussed 'Blue Denim Jeans' → use search_product_images(query='Blue Denim Jeans') to get DB images! "
-    "    - If only product type mentioned (e.g., 't-shirt') → use search_product_images(query='t-shirt') "
-    "  * CRITICAL: Using the full product name (e.g., 'Red Cotton T-Shirt') will search the database first "
-    "    and return the actual product images from your catalog, which is what users want to see! "
-    "  * Only use simple product types (e.g., 't-shirt') if the full product name is not available from context. "
-    "  * NEVER say 'Images are not available' - ALWAYS call search_product_images() first! "
-    "  * After calling search_product_images(query='product_name'), you will get a dict with an 'images' array. "
-    "  * Each item in 'images' has a 'url' field. Extract ALL URLs from the 'images' array. "
-    "  * Format your response EXACTLY as: 'Here are some images: [[IMAGE_URLS:url1,url2,url3]]' "
-    "  * IMPORTANT: Separate URLs with commas, no spaces. Include ALL image URLs from the result. "
-    "  * CRITICAL: You MUST include the [[IMAGE_URLS:...]] format in your response, otherwise images won't display! "
-    "  * Example flow: "
-    "    User: 'do you have t shirt' "
-    "    You: [Show product details for 'Red Cotton T-Shirt'] "
-    "    User: 'can you show me the picture' "
-    "    You: [STEP 1: Call search_product_images(query='t-shirt')] "
-    "    You: [STEP 2: Get result with 'images' array, e.g., {'images': [{'url': 'url1'}, {'url': 'url2'}]}] "
-    "    You: [STEP 3: Extract all URLs: url1, url2] "
-    "    You: [STEP 4: Format response: 'Here are some images of the t-shirt: [[IMAGE_URLS:url1,url2]]'] "
-    "  * CRITICAL: The [[IMAGE_URLS:...]] format is REQUIRED - without it, images won't display in the UI! "
-    ""
-    "SEARCH IMPROVEMENTS: "
-    "- When searching, the search function handles multiple variations automatically. 'red t shirt' should match 'Red Cotton T-Shirt'. "
-    "- The search matches words individually, so 'red t shirt' will match products containing 'red', 't', and 'shirt' in the name. "
-    "- If a search fails, check conversation history - if you showed a product earlier (e.g., 'Red Cotton T-Shirt'), "
-    "  and user asks about it with different wording (e.g., 'red t shirt'), use get_product_details() or get_product_variants() "
-    "  with the product name from context instead of searching again. "
-    "- The search handles hyphens and spaces, so 'red t shirt', 'red t-shirt', 'Red Cotton T-Shirt' should all work. "
-    "- Remember: If a product was mentioned in recent conversation, prefer using it from context over searching again. "
-    ""
-    "LANGUAGE HANDLING: "
-    "- Users may speak in different languages, but you MUST respond in English. "
-    "- If a user query is in another language, translate it to English in your mind and search using English terms. "
-    "- For example: 'टीशर्ट' (Hindi) means 't-shirt' - search for 't-shirt' or 'tshirt'. "
-    "- 'काला' (Hindi) means 'black' - search for 'black'. "
-    "- Always interpret user intent correctly regardless of language. "
-    ""
-    "SEARCH ACCURACY: "
-    "- When searching for products, use multiple search strategies: "
-    "  * Try exact product name first (e.g., 't-shirt', 'tshirt', 't shirt') "
-    "  * Try category search if product name fails (e.g., search in 'Apparel' category) "
-    "  * Try partial matches (e.g., 'black cloth' should find 'black clothing') "
-    "- If initial search fails, try alternative terms: "
-    "  * 't-shirt' → try 'tshirt', 't shirt', 'shirt', or search in 'Apparel' category "
-    "  * 'black cloths' → try 'black clothing', 'black apparel', or search 'black' in 'Apparel' category "
-    "- Always use the search_products() tool with appropriate filters (category, brand, etc.) "
-    "- If search returns no results, try broader search terms or different categories "
-    ""
-    "GENERAL GUIDELINES: "
-    "- When users ask about quantities or stock, use the stockQuantity field from search results. "
-    "- If searching by product type (like 'T shirt' or 'apparel'), try searching both as a query and by category name. "
-    "- Always check product availability and stock quantities before confirming availability. "
-    "- Be proactive: if you know the product from context, use it immediately without asking for clarification. "
-    "- If a feature or information isn't in the product data, simply state it's not available rather than saying functionality is missing. "
-    "- When a user asks about categories, use get_categories() to show available categories. "
-    "- If user asks 'do you have different category' or 'what categories', list all available categories from get_categories()."
-)
+    return await run_tool(search_images, query=query, count=count, mcp_toolbox=get_mcp_toolbox())
 
-# Create chat agent (for text-based chat)
-chat_agent = Agent(
-    name="product_catalog_agent_chat",
-    model="gemini-2.5-flash",
-    description="Agent to help users search and find products in the catalog. Maintains strong conversation context - remembers products discussed and answers follow-up questions about those products without asking for clarification. Always responds in English.",
-    instruction=shared_instruction,
-    tools=[
-        search_products,
-        get_product_details,
-        get_product_by_slug,
-        check_product_availability,
-        get_product_variants,
-        get_categories,
-        search_product_images
-    ]
-)
 
-# Create voice agent (for audio/voice interactions)
-voice_agent = Agent(
-    name="product_catalog_agent_voice",
-    model="gemini-2.5-flash-native-audio-preview-09-2025",
-    description="Agent to help users search and find products in the catalog. Maintains strong conversation context - remembers products discussed and answers follow-up questions about those products without asking for clarification. Always responds in English.",
-    instruction=shared_instruction,
-    tools=[
-        search_products,
-        get_product_details,
-        get_product_by_slug,
-        check_product_availability,
-        get_product_variants,
-        get_categories,
-        search_product_images
-    ]
+async def execute_catalog_query(program: str) -> Dict:
+    """
+    Run several catalog lookups in ONE tool call when you already know the chain you need.
+
+    Write one call per line, optionally assigned to a name; later lines can use earlier results.
+    Functions (keyword arguments only): search(query, category, max_price, min_price, brand,
+    in_stock, featured, limit), details(product_id), by_slug(slug), availability(product_id, size,
+    color), availability_batch(product_ids, size, color), variants(product_id, product_name),
+    categories().
+
+    Example:
+        r = search(query="jeans", limit=3)
+        v = variants(product_id=r["products"][0]["id"])
+        a = availability_batch(product_ids=[p["id"] for p in r["products"] if p["price"] < 50], color="blue")
+
+    Arguments may use literals, earlier results, indexing, list comprehensions and, in
+    comprehension filters, comparisons (== != < <= > >= in, not in) with and/or/not.
+
+    Returns:
+        Dict with 'results' holding each step's output by name (unnamed lines are step_N)
+    """
+    return await run_tool(execute_catalog_program_mcp, mcp_toolbox=get_mcp_toolbox(), program=program)
+
+
+async def warmup() -> None:
+    """
+    Seed the tool caches and prepared statements before the first user turn.
+
+    Loads the category list and the default product search into the TTL caches,
+    then fetches details/variants for one product so their statements are
+    PREPAREd on a pooled connection. Failures are logged, never raised.
+    """
+    try:
+        await get_categories()
+        result = await search_products()
+        products = result.get("products") or []
+        if products:
+            product_id = products[0]["id"]
+            await get_product_details(product_id)
+            await get_product_variants(product_id=product_id)
+        logger.info("Tool warmup complete")
+    except Exception as e:
+        logger.warning("Tool warmup failed: %s", e)
+
+
+# Tool functions registered on both agents
+CATALOG_TOOLS = (
+    search_products,
+    get_product_details,
+    get_product_by_slug,
+    check_product_availability,
+    check_product_availability_batch,
+    get_product_variants,
+    get_product_with_variants,
+    get_categories,
+    search_product_images,
+    execute_catalog_query,
 )
 
-# For backward compatibility, export root_agent as chat_agent
-root_agent = chat_agent
 
-logger.info("Chat agent created successfully (model: gemini-2.5-flash)")
-logger.info("Voice agent created successfully (model: gemini-2.5-flash-native-audio-preview-09-2025)")
+@functools.lru_cache(maxsize=None)
+def get_tools():
+    """Wrap the catalog tools once; the chat and voice agents share the same FunctionTools."""
+    from google.adk.tools import FunctionTool
+
+    class CachedFunctionTool(FunctionTool):
+        """
+        FunctionTool that builds its FunctionDeclaration once.
+
+        ADK otherwise re-introspects the signature, type hints and docstring on
+        every LLM request, for every agent the tool is registered on.
+        """
+
+        def _get_declaration(self):
+            declaration = getattr(self, "_cached_declaration", None)
+            if declaration is None:
+                declaration = self._cached_declaration = super()._get_declaration()
+            return declaration
+
+    return [CachedFunctionTool(tool) for tool in CATALOG_TOOLS]
+
+
+@functools.lru_cache(maxsize=None)
+def get_chat_agent():
+    """Create the chat agent (for text-based chat)."""
+    from google.adk.agents import Agent
+    get_agentops()
+    agent = Agent(
+        name="product_catalog_agent_chat",
+        model="gemini-2.5-flash",
+        description="Agent to help users search and find products in the catalog. Maintains strong conversation context - remembers products discussed and answers follow-up questions about those products without asking for clarification. Always responds in English.",
+        instruction=SHARED_INSTRUCTION,
+        tools=get_tools()
+    )
+    logger.info("Chat agent created successfully (model: gemini-2.5-flash)")
+    return agent
+
+
+@functools.lru_cache(maxsize=None)
+def get_voice_agent():
+    """Create the voice agent (for audio/voice interactions)."""
+    from google.adk.agents import Agent
+    get_agentops()
+    agent = Agent(
+        name="product_catalog_agent_voice",
+        model="gemini-2.5-flash-native-audio-preview-09-2025",
+        description="Agent to help users search and find products in the catalog. Maintains strong conversation context - remembers products discussed and answers follow-up questions about those products without asking for clarification. Always responds in English.",
+        instruction=SHARED_INSTRUCTION,
+        tools=get_tools()
+    )
+    logger.info("Voice agent created successfully (model: gemini-2.5-flash-native-audio-preview-09-2025)")
+    return agent
+
+
+# chat_agent, voice_agent, mcp_toolbox and root_agent (chat_agent, for backward
+# compatibility) are resolved lazily on first attribute access
+_LAZY_ATTRIBUTES = {
+    "chat_agent": get_chat_agent,
+    "voice_agent": get_voice_agent,
+    "root_agent": get_chat_agent,
+    "mcp_toolbox": get_mcp_toolbox,
+}
+
 
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        # Bind into module globals so later lookups skip this hook entirely
+        value = globals()[name] = _LAZY_ATTRIBUTES[name]()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
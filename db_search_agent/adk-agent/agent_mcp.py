@@ -2,6 +2,7 @@
 ADK Agent with MCP Toolbox for Databases 
 Direct database access via Model Context Protocol for better performance.
 """
+import functools
 import os
 import logging
 from typing import Optional, Dict
@@ -10,13 +11,9 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-from google.adk.agents import Agent
-from db_wrapper import (
-    MCPToolboxForDatabases,
-    DatabaseCredentialsConfig
-)
-import google.auth
 from logging_config import setup_logging
+from cache import ttl_cached
+from tool_runtime import run_tool, install_uvloop
 from tools.product_tools import (
     search_products_mcp,
     get_product_details_mcp,
@@ -31,45 +28,20 @@ logger = setup_logging(
     log_file=os.getenv("LOG_FILE", "logs/agent.log")
 )
 
-# Optional: Initialize AgentOps for observability
-try:
-    from agentops_setup import agentops
-    if agentops:
-        logger.info("AgentOps observability enabled")
-except ImportError:
-    logger.debug("AgentOps not configured, skipping observability setup")
-
-# Database connection configuration
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is required")
-
-logger.info(f"Initializing MCP Toolbox with database: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else 'configured'}")
-
-# Set up credentials (supports Application Default Credentials)
-try:
-    credentials, project = google.auth.default()
-    credentials_config = DatabaseCredentialsConfig(credentials=credentials)
-    logger.info("Google credentials loaded successfully")
-except Exception as e:
-    logger.warning(f"Could not load Google credentials: {e}. Using default credentials.")
-    credentials_config = DatabaseCredentialsConfig()
-
-# Initialize MCP Toolbox for PostgreSQL
-try:
-    mcp_toolbox = MCPToolboxForDatabases(
-        database_type="postgresql",
-        connection_string=DATABASE_URL,
-        credentials_config=credentials_config
-    )
-    logger.info("MCP Toolbox initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize MCP Toolbox: {str(e)}", exc_info=True)
-    raise
+# Faster event loop for the async tool wrappers, when available
+install_uvloop()
+
+# Toolbox, credentials and AgentOps setup is shared with agent_complete
+from toolbox_setup import get_agentops, get_mcp_toolbox
+
+# Tool results are cached in-process; categories change far less often than products
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "600"))
 
 
 # Create tool wrappers that include mcp_toolbox
-def search_products(
+@ttl_cached(ttl=TOOL_CACHE_TTL, casefold=("query", "category", "brand"))
+async def search_products(
     query: Optional[str] = None,
     category: Optional[str] = None,
     max_price: Optional[float] = None,
@@ -77,7 +49,8 @@ def search_products(
     brand: Optional[str] = None,
     in_stock: bool = True,
     featured: Optional[bool] = None,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None
 ) -> Dict:
     """
     Search for products in the catalog.
@@ -91,12 +64,14 @@ def search_products(
         in_stock: Only show products in stock (default: True)
         featured: Filter by featured status
         limit: Maximum number of results (default: 10)
+        cursor: 'nextCursor' from the previous page when browsing without a query
 
     Returns:
         dict: Dictionary with status and list of matching products
     """
-    return search_products_mcp(
-        mcp_toolbox=mcp_toolbox,
+    return await run_tool(
+        search_products_mcp,
+        mcp_toolbox=get_mcp_toolbox(),
         query=query,
         category=category,
         max_price=max_price,
@@ -104,11 +79,13 @@ def search_products(
         brand=brand,
         in_stock=in_stock,
         featured=featured,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
 
 
-def get_product_details(product_id: int) -> Dict:
+@ttl_cached(ttl=TOOL_CACHE_TTL)
+async def get_product_details(product_id: int) -> Dict:
     """
     Get detailed information about a specific product.
 
@@ -118,10 +95,11 @@ def get_product_details(product_id: int) -> Dict:
     Returns:
         dict: Product details or error message
     """
-    return get_product_details_mcp(mcp_toolbox=mcp_toolbox, product_id=product_id)
+    return await run_tool(get_product_details_mcp, mcp_toolbox=get_mcp_toolbox(), product_id=product_id)
 
 
-def get_product_by_slug(slug: str) -> Dict:
+@ttl_cached(ttl=TOOL_CACHE_TTL)
+async def get_product_by_slug(slug: str) -> Dict:
     """
     Get product details by slug.
 
@@ -131,10 +109,10 @@ def get_product_by_slug(slug: str) -> Dict:
     Returns:
         dict: Product details or error message
     """
-    return get_product_by_slug_mcp(mcp_toolbox=mcp_toolbox, slug=slug)
+    return await run_tool(get_product_by_slug_mcp, mcp_toolbox=get_mcp_toolbox(), slug=slug)
 
 
-def check_product_availability(
+async def check_product_availability(
     product_id: int,
     size: Optional[str] = None,
     color: Optional[str] = None
@@ -150,48 +128,66 @@ def check_product_availability(
     Returns:
         dict: Availability information
     """
-    return check_product_availability_mcp(
-        mcp_toolbox=mcp_toolbox,
+    return await run_tool(
+        check_product_availability_mcp,
+        mcp_toolbox=get_mcp_toolbox(),
         product_id=product_id,
         size=size,
         color=color
     )
 
 
-def get_categories() -> Dict:
+@ttl_cached(ttl=CATEGORY_CACHE_TTL, maxsize=1)
+async def get_categories() -> Dict:
     """
     Get all available product categories.
 
     Returns:
         dict: List of categories
     """
-    return get_categories_mcp(mcp_toolbox=mcp_toolbox)
-
-
-# Create the agent
-root_agent = Agent(
-    name="product_catalog_agent_mcp",
-    model="gemini-2.0-flash",
-    description="Agent to help users search and find products using direct database access via MCP Toolbox.",
-    instruction=(
-        "You are a helpful product assistant. Help users find products by searching the catalog. "
-        "When showing products, always include the name, price, and availability. "
-        "Be conversational and friendly. If a product is not found, suggest similar items or ask for clarification. "
-        "When users ask about 'this product' or 'the blue one', refer to products from recent search results stored in session state. "
-        "Always check product availability before confirming it's in stock. "
-        "Use the search_products tool first to find products, then use get_product_details or get_product_by_slug for more information. "
-        "When checking availability for specific sizes or colors, use the check_product_availability tool."
-    ),
-    tools=[
-        search_products,
-        get_product_details,
-        get_product_by_slug,
-        check_product_availability,
-        get_categories
-    ]
-)
+    return await run_tool(get_categories_mcp, mcp_toolbox=get_mcp_toolbox())
+
+
+@functools.lru_cache(maxsize=None)
+def get_root_agent():
+    """Create the agent on first use (initializes AgentOps first, if configured)."""
+    from google.adk.agents import Agent
+    get_agentops()
+    agent = Agent(
+        name="product_catalog_agent_mcp",
+        model="gemini-2.0-flash",
+        description="Agent to help users search and find products using direct database access via MCP Toolbox.",
+        instruction=(
+            "You are a helpful product assistant. Help users find products by searching the catalog. "
+            "When showing products, always include the name, price, and availability. "
+            "Be conversational and friendly. If a product is not found, suggest similar items or ask for clarification. "
+            "When users ask about 'this product' or 'the blue one', refer to products from recent search results stored in session state. "
+            "Always check product availability before confirming it's in stock. "
+            "Use the search_products tool first to find products, then use get_product_details or get_product_by_slug for more information. "
+            "When checking availability for specific sizes or colors, use the check_product_availability tool."
+        ),
+        tools=[
+            search_products,
+            get_product_details,
+            get_product_by_slug,
+            check_product_availability,
+            get_categories
+        ]
+    )
+    logger.info("Agent created successfully with MCP Toolbox integration")
+    return agent
+
+
+def __getattr__(name: str):
+    # root_agent and mcp_toolbox are built lazily on first access (PEP 562)
+    if name == "root_agent":
+        value = globals()[name] = get_root_agent()
+        return value
+    if name == "mcp_toolbox":
+        value = globals()[name] = get_mcp_toolbox()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-logger.info("Agent created successfully with MCP Toolbox integration")
 
 if __name__ == "__main__":
     logger.info("Agent module loaded. Use this agent with an ADK Runner.")
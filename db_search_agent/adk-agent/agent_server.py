@@ -3,126 +3,275 @@ HTTP Server for ADK Agent Integration.
 This server exposes the agent via REST API for the Express backend to call.
 Also supports WebSocket for voice/audio streaming.
 """
+import functools
+import io
+import logging
 import os
+import secrets
 import sys
-import json
 import asyncio
-import base64
 import warnings
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.websockets import WebSocketDisconnect
 from pydantic import BaseModel
 import uvicorn
 
+try:
+    import pybase64 as base64  # SIMD base64, drop-in for the stdlib module
+except ImportError:
+    import base64
+
+from cache import TTLCache
+
+if TYPE_CHECKING:
+    from google.adk.agents import LiveRequestQueue
+
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
 # Load environment variables
 load_dotenv()
 
-# Import agents
+# Import agents. ADK/genai are imported where they are first used (runners,
+# handlers), so the port binds and /health answers before that multi-second load.
 try:
-    from agent_complete import chat_agent, voice_agent, root_agent
-    from google.adk.runners import Runner
-    from google.adk.sessions.in_memory_session_service import InMemorySessionService
-    from google.adk.agents import LiveRequestQueue
-    from google.adk.agents.run_config import RunConfig, StreamingMode
-    from google.genai import types
-    from google.genai.types import Part, Content, Blob
+    from agent_complete import get_chat_agent, get_voice_agent, warmup
 except ImportError as e:
     print(f"Error importing agent: {e}")
     print("Make sure you're in the adk-agent directory and dependencies are installed")
     sys.exit(1)
 
+# agent_complete configures logging (LOG_LEVEL / LOG_FILE). The per-frame voice
+# logs are DEBUG, and production defaults this module to WARNING.
+logger = logging.getLogger("agent_server")
+logger.setLevel(os.getenv(
+    "LOG_LEVEL",
+    "WARNING" if os.getenv("NODE_ENV") == "production" else "INFO"
+).upper())
+
 # Initialize FastAPI app
 app = FastAPI(title="ADK Agent Server", version="1.0.0")
 
 # Configure CORS to allow requests from frontend
 # Frontend connects directly to agent server (bypasses Express backend)
 frontend_origin = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
-allowed_origins = [
+allowed_origins = {
     frontend_origin,
     "http://localhost:3000",  # Default Next.js dev server
     "http://127.0.0.1:3000",
-]
+}
 
 # In production, you should set FRONTEND_ORIGIN to your actual frontend URL
 if os.getenv("NODE_ENV") != "production":
-    allowed_origins.append("*")  # Allow all in development
+    allowed_origins.add("*")  # Allow all in development
+allowed_origins = frozenset(allowed_origins)
 
+# The frontend never sends cookies, so credentials are only allowed with an exact
+# origin list; with "*" the middleware can answer without echoing each Origin back
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
-    allow_credentials=True,
+    allow_credentials="*" not in allowed_origins,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
-# Initialize session service (in-memory for now, can be replaced with persistent storage)
-session_service = InMemorySessionService()
 
-# Initialize runners for different agent types
+async def _warm_server():
+    """Build the runners (importing ADK) off the event loop, then warm the tools."""
+    try:
+        chat_agent = (await asyncio.to_thread(get_chat_runner)).agent
+        voice_agent = (await asyncio.to_thread(get_voice_runner)).agent
+    except Exception as e:
+        # Requests will retry (and report) the failure on first use
+        logger.exception("Failed to create runners: %s", e)
+        return
+    logger.info("Chat Agent: %s (Model: %s), Voice Agent: %s (Model: %s), Tools: %s",
+                chat_agent.name, chat_agent.model, voice_agent.name, voice_agent.model,
+                len(chat_agent.tools))
+    await warmup()
+
+
+@app.on_event("startup")
+async def warm_tools():
+    """Warm the runners, MCP toolbox and tool caches in the background while the server idles."""
+    app.state.warmup_task = asyncio.create_task(_warm_server())
+
+
 APP_NAME = "product-catalog-agent"
 
-# Chat runner (for text-based chat)
-chat_runner = Runner(
-    app_name=APP_NAME,
-    agent=chat_agent,
-    session_service=session_service,
-)
 
-# Voice runner (for audio/voice interactions)
-voice_runner = Runner(
-    app_name=APP_NAME,
-    agent=voice_agent,
-    session_service=session_service,
-)
+@functools.lru_cache(maxsize=None)
+def get_session_service():
+    """
+    Session service shared by both runners: Redis when REDIS_URL is set (shared
+    across workers and restarts), otherwise in-memory.
+    """
+    if os.getenv("REDIS_URL"):
+        from session_store import RedisSessionService
+        return RedisSessionService(
+            os.getenv("REDIS_URL"),
+            ttl=int(os.getenv("SESSION_TTL", "3600")),
+        )
+    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+    return InMemorySessionService()
+
+
+@functools.lru_cache(maxsize=None)
+def get_chat_runner():
+    """Runner for text-based chat, created on first use."""
+    from google.adk.runners import Runner
+    return Runner(
+        app_name=APP_NAME,
+        agent=get_chat_agent(),
+        session_service=get_session_service(),
+    )
+
 
-# For backward compatibility
-runner = chat_runner
-root_agent = chat_agent
+@functools.lru_cache(maxsize=None)
+def get_voice_runner():
+    """Runner for audio/voice interactions, created on first use."""
+    from google.adk.runners import Runner
+    return Runner(
+        app_name=APP_NAME,
+        agent=get_voice_agent(),
+        session_service=get_session_service(),
+    )
+
+
+# Module attributes kept for backward compatibility, resolved on first access
+_LAZY_ATTRIBUTES = {
+    "session_service": get_session_service,
+    "chat_runner": get_chat_runner,
+    "voice_runner": get_voice_runner,
+    "runner": get_chat_runner,
+    "root_agent": get_chat_agent,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        value = globals()[name] = _LAZY_ATTRIBUTES[name]()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Sessions known to exist, so repeat requests skip the session-store lookup.
+# Short TTL bounds staleness when another worker or Redis expiry removes one.
+_known_sessions = TTLCache(
+    maxsize=int(os.getenv("SESSION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", "30")),
+)
 
 
 # WebSocket helper functions
+async def _get_or_create_session(session_service, user_id: str, session_id: Optional[str]) -> str:
+    """
+    Return the id of an existing session, creating it if needed.
+    
+    Sessions seen recently are answered from `_known_sessions` without a
+    session-store round trip. Without a session_id a new session is always
+    created.
+    
+    Args:
+        session_service: Session service shared by the runners
+        user_id: User the session belongs to
+        session_id: Requested session id, if any
+        
+    Returns:
+        The session id to run the agent with
+    """
+    if session_id:
+        if _known_sessions.get((APP_NAME, user_id, session_id)):
+            logger.debug("[SESSION]: Using existing session: %s", session_id)
+            return session_id
+        session = await session_service.get_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+        )
+    else:
+        session = None
+
+    if session is None:
+        session = await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+        )
+        logger.info("[SESSION]: Created new session: %s", session.id)
+    else:
+        logger.debug("[SESSION]: Using existing session: %s", session_id)
+    _known_sessions.set((APP_NAME, user_id, session.id), True)
+    return session.id
+
+
+# Native audio models this server is used with; other names fall back to a
+# substring check, memoized per model name
+_NATIVE_AUDIO_MODELS = frozenset({
+    "gemini-2.5-flash-native-audio-preview-09-2025",
+    "gemini-2.5-flash-preview-native-audio-dialog",
+    "gemini-live-2.5-flash-preview-native-audio",
+})
+
+
+@functools.lru_cache(maxsize=None)
+def _is_native_audio_model(model_name: str) -> bool:
+    """Whether a model supports the AUDIO response modality."""
+    return model_name in _NATIVE_AUDIO_MODELS or "native-audio" in model_name.lower()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_run_config(is_native_audio: bool, is_audio: bool):
+    """
+    One RunConfig per (is_native_audio, is_audio) combination, built once.
+    
+    Session resumption is always on; output transcription only for native audio
+    models in audio mode. Native audio models answer with AUDIO, others with TEXT
+    (audio input is still accepted and converted to text).
+    Note: Language configuration may be available in future ADK versions
+    """
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+    return RunConfig(
+        streaming_mode=StreamingMode.BIDI,
+        response_modalities=["AUDIO" if is_native_audio else "TEXT"],
+        session_resumption=types.SessionResumptionConfig(),
+        output_audio_transcription=types.AudioTranscriptionConfig() if (is_native_audio and is_audio) else None,
+    )
+
+
 async def start_agent_session(user_id: str, is_audio: bool = False):
     """Starts an agent session for WebSocket streaming"""
-    print(f"[SESSION]: Starting agent session for user_id={user_id}, is_audio={is_audio}")
+    logger.debug("[SESSION]: Starting agent session for user_id=%s, is_audio=%s", user_id, is_audio)
     
     # Select the appropriate agent and runner based on audio mode
+    from google.adk.agents import LiveRequestQueue
+
     if is_audio:
-        agent = voice_agent
-        runner_to_use = voice_runner
-        print(f"[SESSION]: Using VOICE agent (model: {voice_agent.model})")
+        runner_to_use = get_voice_runner()
+        agent = runner_to_use.agent
+        logger.debug("[SESSION]: Using VOICE agent (model: %s)", agent.model)
     else:
-        agent = chat_agent
-        runner_to_use = chat_runner
-        print(f"[SESSION]: Using CHAT agent (model: {chat_agent.model})")
+        runner_to_use = get_chat_runner()
+        agent = runner_to_use.agent
+        logger.debug("[SESSION]: Using CHAT agent (model: %s)", agent.model)
     
     # Get or create session
-    session_id = f"{APP_NAME}_{user_id}"
-    session = await runner_to_use.session_service.get_session(
-        app_name=APP_NAME,
-        user_id=user_id,
-        session_id=session_id,
+    session_id = await _get_or_create_session(
+        runner_to_use.session_service, user_id, f"{APP_NAME}_{user_id}"
     )
-    if not session:
-        print(f"[SESSION]: Creating new session: {session_id}")
-        session = await runner_to_use.session_service.create_session(
-            app_name=APP_NAME,
-            user_id=user_id,
-            session_id=session_id,
-        )
-    else:
-        print(f"[SESSION]: Using existing session: {session_id}")
 
     # Configure response format based on client preference
     # Check if model supports native audio
     model_name = agent.model if isinstance(agent.model, str) else agent.model.model
-    is_native_audio = "native-audio" in model_name.lower() if model_name else False
-    print(f"[SESSION]: Model: {model_name}, Native audio: {is_native_audio}")
+    is_native_audio = _is_native_audio_model(model_name) if model_name else False
+    logger.debug("[SESSION]: Model: %s, Native audio: %s", model_name, is_native_audio)
     
     # IMPORTANT: gemini-2.0-flash doesn't support AUDIO modality for bidiGenerateContent
     # For non-native audio models, we use TEXT modality but still accept audio input
@@ -130,158 +279,231 @@ async def start_agent_session(user_id: str, is_audio: bool = False):
     if is_native_audio:
         # Native audio models can use AUDIO modality
         modality = "AUDIO"
-        print(f"[SESSION]: Using native audio model with AUDIO modality")
+        logger.debug("[SESSION]: Using native audio model with AUDIO modality")
     elif is_audio:
         # For non-native models with audio input, use TEXT modality
         # Audio input will be converted to text automatically
         modality = "TEXT"
-        print(f"[SESSION]: WARNING: Model {model_name} doesn't support AUDIO output")
-        print(f"[SESSION]: Using TEXT modality - audio input will be converted to text")
-        print(f"[SESSION]: For full audio streaming, use a native audio model (see AUDIO_MODEL_SETUP.md)")
+        logger.warning("[SESSION]: Model %s doesn't support AUDIO output", model_name)
+        logger.debug("[SESSION]: Using TEXT modality - audio input will be converted to text")
+        logger.debug("[SESSION]: For full audio streaming, use a native audio model (see AUDIO_MODEL_SETUP.md)")
     else:
         modality = "TEXT"
     
-    print(f"[SESSION]: Final modality: {modality}")
+    logger.debug("[SESSION]: Final modality: %s", modality)
 
-    # Enable session resumption and output transcription for audio
-    # Only enable audio transcription for native audio models
-    # Note: Language configuration may be available in future ADK versions
-    run_config = RunConfig(
-        streaming_mode=StreamingMode.BIDI,
-        response_modalities=[modality],
-        session_resumption=types.SessionResumptionConfig(),
-        output_audio_transcription=types.AudioTranscriptionConfig() if (is_native_audio and is_audio) else None,
-    )
-    print(f"[SESSION]: RunConfig created: streaming_mode={run_config.streaming_mode}, modalities={run_config.response_modalities}")
+    run_config = _get_run_config(is_native_audio, is_audio)
+    logger.debug("[SESSION]: RunConfig created: streaming_mode=%s, modalities=%s", run_config.streaming_mode, run_config.response_modalities)
 
     # Create LiveRequestQueue
     live_request_queue = LiveRequestQueue()
-    print(f"[SESSION]: LiveRequestQueue created")
+    logger.debug("[SESSION]: LiveRequestQueue created")
 
     # Start streaming session
-    print(f"[SESSION]: Calling runner.run_live...")
+    logger.debug("[SESSION]: Calling runner.run_live...")
     live_events = runner_to_use.run_live(
         user_id=user_id,
-        session_id=session.id,
+        session_id=session_id,
         live_request_queue=live_request_queue,
         run_config=run_config,
     )
-    print(f"[SESSION]: runner.run_live returned, live_events iterator created")
+    logger.debug("[SESSION]: runner.run_live returned, live_events iterator created")
     return live_events, live_request_queue
 
 
+# WebSocket frame batching: text/control messages produced within WS_BATCH_WINDOW
+# seconds are sent together as one JSON array frame
+WS_BATCH_WINDOW = float(os.getenv("WS_BATCH_WINDOW", "0.002"))
+WS_BATCH_MAX_MESSAGES = 32
+
+# Audio frames at least this large are base64 encoded/decoded in a worker thread
+# so one big frame does not stall every other connection on the event loop
+WS_BASE64_OFFLOAD_BYTES = int(os.getenv("WS_BASE64_OFFLOAD_BYTES", "4096"))
+
+# Turn-boundary control messages never change, so they are encoded once
+_TURN_COMPLETE_JSON = orjson.dumps({"turn_complete": True, "interrupted": False})
+_INTERRUPTED_JSON = orjson.dumps({"turn_complete": False, "interrupted": True})
+
+# Audio frames are assembled around the base64 bytes directly (base64 never
+# needs JSON escaping), skipping the ascii decode and the JSON re-encode
+_AUDIO_FRAME_PREFIX = b'{"mime_type":"audio/pcm","data":"'
+_AUDIO_FRAME_SUFFIX = b'"}'
+
+
+async def _websocket_writer(websocket: WebSocket, outbox: asyncio.Queue):
+    """
+    Drain `outbox` onto the WebSocket until a None sentinel arrives.
+
+    Frames are orjson-encoded and sent as binary (UTF-8 JSON) frames, which
+    skips the str round trip of send_text.
+
+    Text messages are coalesced into one JSON array frame. Pre-encoded bytes
+    frames (audio, turn_complete / interrupted) are never batched: any pending
+    batch is flushed and the frame is sent on its own straight away, which
+    keeps message order.
+    """
+    loop = asyncio.get_running_loop()
+    batch = []
+
+    async def flush():
+        if batch:
+            await websocket.send_bytes(orjson.dumps(batch[0] if len(batch) == 1 else batch))
+            batch.clear()
+
+    while True:
+        message = await outbox.get()
+        deadline = loop.time() + WS_BATCH_WINDOW
+        while message is not None:
+            if isinstance(message, bytes):
+                await flush()
+                await websocket.send_bytes(message)
+            else:
+                batch.append(message)
+                if len(batch) >= WS_BATCH_MAX_MESSAGES:
+                    await flush()
+
+            if not batch:
+                break
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(outbox.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+        await flush()
+        if message is None:
+            return
+
+
 async def agent_to_client_messaging(websocket: WebSocket, live_events):
     """Agent to client communication via WebSocket"""
+    outbox: asyncio.Queue = asyncio.Queue()
+    send = outbox.put_nowait
+    writer_task = asyncio.create_task(_websocket_writer(websocket, outbox))
     try:
-        print("[AGENT TO CLIENT]: Starting to listen for events...")
+        logger.debug("[AGENT TO CLIENT]: Starting to listen for events...")
         event_count = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
+        b64encode = base64.b64encode
         async for event in live_events:
+            if writer_task.done():
+                # The socket is gone (or the writer failed); surface its exception
+                writer_task.result()
+                break
             event_count += 1
+
+            # Read each event attribute once; this is the hottest loop in the server
+            turn_complete = getattr(event, 'turn_complete', False)
+            interrupted = getattr(event, 'interrupted', False)
+            input_transcription = getattr(event, 'input_transcription', None)
+            output_transcription = getattr(event, 'output_transcription', None)
+            content = event.content
+            parts = content.parts if content else None
+
             # Reduced logging for performance - only log important events
-            if event_count % 10 == 0 or hasattr(event, 'turn_complete') and event.turn_complete:
-                print(f"[AGENT TO CLIENT]: Received event #{event_count}, type: {type(event).__name__}")
+            if debug and (event_count % 10 == 0 or turn_complete):
+                logger.debug("[AGENT TO CLIENT]: Received event #%s, type: %s", event_count, type(event).__name__)
             
             # Handle input audio transcription (user's speech)
             # Only send when turn is complete to avoid fragmentation
-            if hasattr(event, 'input_transcription') and event.input_transcription and event.input_transcription.text:
+            transcript_text = input_transcription.text if input_transcription else None
+            if transcript_text:
                 # Check if this is a final transcription (turn complete) or partial
-                is_final = hasattr(event, 'turn_complete') and event.turn_complete
-                transcript_text = event.input_transcription.text
+                is_final = bool(turn_complete)
+                stripped = transcript_text.strip()
                 
                 # Only send if it's a meaningful chunk (not just single characters)
-                if transcript_text.strip() and (is_final or len(transcript_text.strip()) > 1):
-                    message = {
+                if stripped and (is_final or len(stripped) > 1):
+                    send({
                         "mime_type": "text/plain",
                         "data": transcript_text,
                         "is_user_transcript": True,  # Mark as user transcript
                         "role": "user",
                         "turn_complete": is_final  # Indicate if this is the final chunk
-                    }
-                    await websocket.send_text(json.dumps(message))
-                    print(f"[AGENT TO CLIENT]: user input transcript: {transcript_text} (final: {is_final})")
+                    })
+                    if debug:
+                        logger.debug("[AGENT TO CLIENT]: user input transcript: %s (final: %s)", transcript_text, is_final)
             
             # Handle output audio transcription (agent's speech)
-            if hasattr(event, 'output_transcription') and event.output_transcription and event.output_transcription.text:
-                transcript_text = event.output_transcription.text
-                message = {
+            transcript_text = output_transcription.text if output_transcription else None
+            if transcript_text:
+                send({
                     "mime_type": "text/plain",
                     "data": transcript_text,
                     "is_transcript": True,  # Mark as agent transcript
                     "role": "agent"
-                }
-                await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: agent output transcript: {transcript_text}")
-
-            # Read the Content and its first Part
-            part: Part = None
-            if event.content and event.content.parts and len(event.content.parts) > 0:
-                part = event.content.parts[0]
-                print(f"[AGENT TO CLIENT]: Part type: {type(part).__name__}")
-            
+                })
+                if debug:
+                    logger.debug("[AGENT TO CLIENT]: agent output transcript: %s", transcript_text)
+
+            # Read the first Part of the Content
+            part = parts[0] if parts else None
             if part:
+                if debug:
+                    logger.debug("[AGENT TO CLIENT]: Part type: %s", type(part).__name__)
+
                 # Audio data must be Base64-encoded for JSON transport
-                is_audio = part.inline_data and part.inline_data.mime_type.startswith("audio/pcm")
-                if is_audio:
-                    audio_data = part.inline_data and part.inline_data.data
+                inline_data = part.inline_data
+                if inline_data and inline_data.mime_type.startswith("audio/pcm"):
+                    audio_data = inline_data.data
                     if audio_data:
-                        message = {
-                            "mime_type": "audio/pcm",
-                            "data": base64.b64encode(audio_data).decode("ascii")
-                        }
-                        await websocket.send_text(json.dumps(message))
-                        print(f"[AGENT TO CLIENT]: audio/pcm: {len(audio_data)} bytes.")
+                        if len(audio_data) < WS_BASE64_OFFLOAD_BYTES:
+                            encoded = b64encode(audio_data)
+                        else:
+                            encoded = await asyncio.to_thread(b64encode, audio_data)
+                        send(_AUDIO_FRAME_PREFIX + encoded + _AUDIO_FRAME_SUFFIX)
+                        if debug:
+                            logger.debug("[AGENT TO CLIENT]: audio/pcm: %s bytes.", len(audio_data))
 
                 # If it's text, send it (only send meaningful chunks to reduce fragmentation)
-                if hasattr(part, 'text') and part.text:
-                    # Only send if it's a meaningful chunk (not just single characters)
-                    if len(part.text.strip()) > 0:
-                        message = {
-                            "mime_type": "text/plain",
-                            "data": part.text
-                        }
-                        await websocket.send_text(json.dumps(message))
-                        # Reduced logging
-                        if len(part.text) > 50:
-                            print(f"[AGENT TO CLIENT]: text/plain: {part.text[:50]}...")
+                text = getattr(part, 'text', None)
+                if text and text.strip():
+                    send({
+                        "mime_type": "text/plain",
+                        "data": text
+                    })
+                    # Reduced logging
+                    if debug and len(text) > 50:
+                        logger.debug("[AGENT TO CLIENT]: text/plain: %s...", text[:50])
 
             # If the turn complete or interrupted, send it
-            if hasattr(event, 'turn_complete') and event.turn_complete:
-                message = {
-                    "turn_complete": True,
-                    "interrupted": False,
-                }
-                await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: turn_complete")
+            if turn_complete:
+                send(_TURN_COMPLETE_JSON)
+                if debug:
+                    logger.debug("[AGENT TO CLIENT]: turn_complete")
             
-            if hasattr(event, 'interrupted') and event.interrupted:
-                message = {
-                    "turn_complete": False,
-                    "interrupted": True,
-                }
-                await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: interrupted")
+            if interrupted:
+                send(_INTERRUPTED_JSON)
+                if debug:
+                    logger.debug("[AGENT TO CLIENT]: interrupted")
                 
-        print(f"[AGENT TO CLIENT]: Event loop ended. Total events: {event_count}")
+        logger.debug("[AGENT TO CLIENT]: Event loop ended. Total events: %s", event_count)
+        send(None)
+        await writer_task
     except WebSocketDisconnect:
-        print("Client disconnected from agent_to_client_messaging")
+        logger.info("Client disconnected from agent_to_client_messaging")
     except Exception as e:
-        print(f"Error in agent_to_client_messaging: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in agent_to_client_messaging: %s", e)
+    finally:
+        if not writer_task.done():
+            writer_task.cancel()
 
 
-async def client_to_agent_messaging(websocket: WebSocket, live_request_queue: LiveRequestQueue):
+async def client_to_agent_messaging(websocket: WebSocket, live_request_queue: "LiveRequestQueue"):
     """Client to agent communication via WebSocket"""
+    from google.genai.types import Blob, Content, Part
+
     try:
-        while True:
-            message_json = await websocket.receive_text()
-            message = json.loads(message_json)
+        # iter_text() ends cleanly when the client disconnects
+        async for message_json in websocket.iter_text():
+            message = orjson.loads(message_json)
             mime_type = message.get("mime_type")
             
             # Handle interrupt/stop signal
             if mime_type == "interrupt" or message.get("action") == "interrupt":
                 live_request_queue.interrupt()
-                print(f"[CLIENT TO AGENT]: Interrupt signal received")
+                logger.debug("[CLIENT TO AGENT]: Interrupt signal received")
                 continue
             
             data = message.get("data")
@@ -290,20 +512,20 @@ async def client_to_agent_messaging(websocket: WebSocket, live_request_queue: Li
                 # send_content() sends text in "turn-by-turn mode"
                 content = Content(role="user", parts=[Part.from_text(text=data)])
                 live_request_queue.send_content(content=content)
-                print(f"[CLIENT TO AGENT]: {data}")
+                logger.debug("[CLIENT TO AGENT]: %s", data)
             elif mime_type == "audio/pcm":
                 # send_realtime() sends audio in "realtime mode"
-                decoded_data = base64.b64decode(data)
+                if len(data) < WS_BASE64_OFFLOAD_BYTES:
+                    decoded_data = base64.b64decode(data, validate=False)
+                else:
+                    decoded_data = await asyncio.to_thread(base64.b64decode, data, validate=False)
                 live_request_queue.send_realtime(Blob(data=decoded_data, mime_type=mime_type))
-                print(f"[CLIENT TO AGENT]: audio/pcm: {len(decoded_data)} bytes")
+                logger.debug("[CLIENT TO AGENT]: audio/pcm: %s bytes", len(decoded_data))
             else:
                 raise ValueError(f"Mime type not supported: {mime_type}")
-    except WebSocketDisconnect:
-        print("Client disconnected from client_to_agent_messaging")
+        logger.info("Client disconnected from client_to_agent_messaging")
     except Exception as e:
-        print(f"Error in client_to_agent_messaging: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in client_to_agent_messaging: %s", e)
 
 
 # Request/Response models
@@ -325,6 +547,22 @@ async def health_check():
     return {"status": "ok", "service": "adk-agent-server"}
 
 
+async def _resolve_query_session(session_id: Optional[str]) -> tuple:
+    """
+    Get or create the chat session for a /query request.
+    
+    Args:
+        session_id: sessionId sent by the client, if any
+        
+    Returns:
+        (user_id, session_id) to run the chat agent with
+    """
+    # Anonymous requests get a fresh user and go straight to create_session
+    user_id = f"user-{session_id or secrets.token_hex(8)}"
+    session_id = await _get_or_create_session(get_session_service(), user_id, session_id)
+    return user_id, session_id
+
+
 @app.post("/query", response_model=AgentQueryResponse)
 async def query_agent(request: AgentQueryRequest):
     """
@@ -340,58 +578,39 @@ async def query_agent(request: AgentQueryRequest):
         if not request.message or not request.message.strip():
             raise HTTPException(status_code=400, detail="Message is required")
         
-        # Get or create session
-        session_id = request.sessionId
-        user_id = f"user-{session_id}" if session_id else f"user-{os.urandom(8).hex()}"
-        
         # Get or create session for this user (using chat runner's session service)
-        try:
-            if session_id:
-                session = await chat_runner.session_service.get_session(
-                    app_name="product-catalog-agent",
-                    session_id=session_id
-                )
-            else:
-                # Create a new session
-                session = await chat_runner.session_service.create_session(
-                    app_name="product-catalog-agent",
-                    user_id=user_id,
-                )
-                session_id = session.id
-        except Exception:
-            # Session doesn't exist, create a new one
-            session = await chat_runner.session_service.create_session(
-                app_name="product-catalog-agent",
-                user_id=user_id,
-            )
-            session_id = session.id
+        user_id, session_id = await _resolve_query_session(request.sessionId)
         
         # Create message content
+        from google.genai import types
         new_message = types.Content(parts=[types.Part(text=request.message)])
         
         # Run the agent query with the session using CHAT agent
-        # Note: runner.run() returns a generator, so we need to collect the response
-        response_generator = chat_runner.run(
+        # run_async() yields events without blocking the event loop between API calls
+        response_generator = get_chat_runner().run_async(
             user_id=user_id,
             session_id=session_id,
             new_message=new_message,
         )
         
         # Collect response from generator
-        response_parts = []
+        response_buffer = io.StringIO()
         generator_error = None
         try:
             # Try to get at least one event from the generator
             event_count = 0
-            for event in response_generator:
+            async for event in response_generator:
                 event_count += 1
-                if hasattr(event, 'content') and event.content:
-                    for part in event.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            response_parts.append(part.text)
+                content = getattr(event, 'content', None)
+                if content:
+                    for part in content.parts:
+                        text = getattr(part, 'text', None)
+                        if text:
+                            response_buffer.write(text)
+                            response_buffer.write(" ")
             
             # If generator completed without yielding any events, it might have failed silently
-            if event_count == 0 and not response_parts:
+            if event_count == 0 and not response_buffer.tell():
                 # Check if there's a rate limit issue by checking recent logs or error state
                 # For now, assume it's a rate limit if no events were yielded
                 generator_error = "Rate limit exceeded - no response from API"
@@ -400,9 +619,7 @@ async def query_agent(request: AgentQueryRequest):
             # Handle errors from the generator (e.g., rate limits)
             generator_error = gen_error
             error_str = str(gen_error)
-            print(f"Error in response generator: {error_str}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in response generator: %s", error_str)
         
         # Handle generator errors (including silent failures)
         if generator_error:
@@ -432,7 +649,8 @@ async def query_agent(request: AgentQueryRequest):
                 )
         
         # If no response parts and no error, it might be a silent failure
-        if not response_parts:
+        response_text = response_buffer.getvalue().rstrip(" ")
+        if not response_text:
             # Check if this might be a rate limit issue
             user_message = (
                 "I'm sorry, but I couldn't get a response. This might be due to API rate limits. "
@@ -446,8 +664,6 @@ async def query_agent(request: AgentQueryRequest):
                 error="No response received - possible rate limit"
             )
         
-        response_text = " ".join(response_parts)
-        
         return AgentQueryResponse(
             status="success",
             response=response_text,
@@ -455,9 +671,7 @@ async def query_agent(request: AgentQueryRequest):
         )
     except Exception as e:
         error_message = str(e)
-        print(f"Error querying agent: {error_message}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error querying agent: %s", error_message)
         
         # Check for rate limit errors
         if "429" in error_message or "RESOURCE_EXHAUSTED" in error_message or "quota" in error_message.lower():
@@ -481,6 +695,49 @@ async def query_agent(request: AgentQueryRequest):
         )
 
 
+@app.post("/query/stream")
+async def query_agent_stream(request: AgentQueryRequest):
+    """
+    Query the agent and stream its reply as Server-Sent Events.
+    
+    Each text chunk is sent as `data: {"text": ...}` as soon as the agent
+    produces it, followed by a final `data: {"done": true, "sessionId": ...}`.
+    Errors are sent as `data: {"error": ...}`.
+    
+    Args:
+        request: AgentQueryRequest with message and optional sessionId
+    """
+    if not request.message or not request.message.strip():
+        raise HTTPException(status_code=400, detail="Message is required")
+
+    from google.genai import types
+
+    user_id, session_id = await _resolve_query_session(request.sessionId)
+    new_message = types.Content(parts=[types.Part(text=request.message)])
+
+    async def event_iter():
+        try:
+            async for event in get_chat_runner().run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=new_message,
+            ):
+                content = getattr(event, 'content', None)
+                if not content:
+                    continue
+                for part in content.parts:
+                    text = getattr(part, 'text', None)
+                    if text:
+                        yield b"data: " + orjson.dumps({'text': text}) + b"\n\n"
+        except Exception as e:
+            logger.exception("Error streaming agent response: %s", e)
+            yield b"data: " + orjson.dumps({'error': str(e), 'sessionId': session_id}) + b"\n\n"
+            return
+        yield b"data: " + orjson.dumps({'done': True, 'sessionId': session_id}) + b"\n\n"
+
+    return StreamingResponse(event_iter(), media_type="text/event-stream")
+
+
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """
@@ -496,13 +753,11 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         
         # Get is_audio from query parameters
         is_audio = websocket.query_params.get("is_audio", "false")
-        print(f"Client {user_id} connected, audio mode: {is_audio}")
+        logger.info("Client %s connected, audio mode: %s", user_id, is_audio)
 
         live_events, live_request_queue = await start_agent_session(user_id, is_audio == "true")
     except Exception as e:
-        print(f"Error accepting WebSocket connection for {user_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error accepting WebSocket connection for %s: %s", user_id, e)
         # Try to close the connection if it was partially established
         try:
             await websocket.close(code=1011, reason="Internal server error")
@@ -518,25 +773,42 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         client_to_agent_messaging(websocket, live_request_queue)
     )
 
+    tasks = [agent_to_client_task, client_to_agent_task]
+    pending = tasks
     try:
-        # Wait for either task to complete (connection close or error)
-        tasks = [agent_to_client_task, client_to_agent_task]
-        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        # Both coroutines handle their own errors and return when the connection
+        # ends, so the first one to finish means this client is done
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
 
         # Check for errors in completed tasks
         for task in done:
             if task.exception() is not None:
-                print(f"Task error for client {user_id}: {task.exception()}")
-                import traceback
-                traceback.print_exception(
-                    type(task.exception()),
-                    task.exception(),
-                    task.exception().__traceback__
-                )
+                logger.error("Task error for client %s: %s", user_id, task.exception(),
+                             exc_info=task.exception())
     finally:
-        # Clean up resources
+        # Close the queue first so in-flight sends drain, then stop the other
+        # direction; otherwise it lingers holding the queue and the live session
         live_request_queue.close()
-        print(f"Client {user_id} disconnected")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        _known_sessions.delete((APP_NAME, user_id, f"{APP_NAME}_{user_id}"))
+        logger.info("Client %s disconnected", user_id)
+
+
+def _uvicorn_event_loop_options() -> dict:
+    """Prefer uvloop + httptools; fall back to the pure-Python stack (e.g. on Windows)."""
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+    return {"loop": loop, "http": http, "ws": "websockets"}
 
 
 if __name__ == "__main__":
@@ -544,9 +816,6 @@ if __name__ == "__main__":
     host = os.getenv("AGENT_SERVER_HOST", "0.0.0.0")
     
     print(f"Starting ADK Agent Server on {host}:{port}")
-    print(f"Chat Agent: {chat_agent.name} (Model: {chat_agent.model})")
-    print(f"Voice Agent: {voice_agent.name} (Model: {voice_agent.model})")
-    print(f"Tools: {len(chat_agent.tools)}")
     
-    uvicorn.run(app, host=host, port=port)
+    uvicorn.run(app, host=host, port=port, **_uvicorn_event_loop_options())
 
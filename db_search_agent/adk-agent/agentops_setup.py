@@ -33,7 +33,7 @@ if AGENTOPS_API_KEY:
         logger.warning("AgentOps package not installed. Install with: pip install agentops")
         agentops = None
     except Exception as e:
-        logger.error(f"Failed to initialize AgentOps: {str(e)}")
+        logger.error("Failed to initialize AgentOps: %s", e)
         agentops = None
 else:
     logger.info("AgentOps API key not found, observability disabled")
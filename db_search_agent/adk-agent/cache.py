@@ -0,0 +1,132 @@
+"""
+In-process TTL + LRU cache for tool results.
+Repeat tool calls with the same arguments are served from memory instead of
+going back to the database.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, List
+
+_MISSING = object()
+
+# Every cache created through ttl_cached(), so bust_cache() can clear them all
+_registry: List["TTLCache"] = []
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def register_cache(cache: TTLCache) -> TTLCache:
+    """Include a cache created outside ttl_cached() in bust_cache()."""
+    _registry.append(cache)
+    return cache
+
+
+def _is_cacheable(result: Any) -> bool:
+    """Never cache tool errors or timeouts - the next call should retry the database."""
+    return not (isinstance(result, dict) and result.get("status") in ("error", "timeout"))
+
+
+def ttl_cached(ttl: float = 60.0, maxsize: int = 1024, casefold: Iterable[str] = ()):
+    """
+    Decorator that caches a tool function's result keyed on its normalized arguments.
+
+    Arguments are bound against the function signature (defaults applied), so
+    `search_products(query="jeans")` and `search_products(query="jeans", limit=10)`
+    share one entry. Works for both sync and async functions.
+
+    Args:
+        ttl: Seconds an entry stays valid
+        maxsize: Maximum number of entries before least-recently-used eviction
+        casefold: Names of string arguments the function treats case-insensitively
+            (e.g. search text); "Jeans " and "jeans" then share one entry
+    """
+    casefold = frozenset(casefold)
+
+    def decorator(fn: Callable) -> Callable:
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        _registry.append(cache)
+        signature = inspect.signature(fn)
+
+        def make_key(args, kwargs) -> tuple:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            if casefold:
+                arguments = {
+                    name: value.strip().casefold() if name in casefold and isinstance(value, str) else value
+                    for name, value in arguments.items()
+                }
+            return (fn.__name__, tuple(sorted(arguments.items())))
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                result = cache.get(key, _MISSING)
+                if result is _MISSING:
+                    result = await fn(*args, **kwargs)
+                    if _is_cacheable(result):
+                        cache.set(key, result)
+                return result
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                result = cache.get(key, _MISSING)
+                if result is _MISSING:
+                    result = fn(*args, **kwargs)
+                    if _is_cacheable(result):
+                        cache.set(key, result)
+                return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def bust_cache() -> None:
+    """Invalidate every tool-result cache (call after any catalog write)."""
+    for cache in _registry:
+        cache.clear()
@@ -1,20 +1,194 @@
 """
 Database wrapper that mimics MCPToolboxForDatabases interface.
-Provides direct PostgreSQL connection using psycopg2.
+Provides pooled PostgreSQL connections using psycopg2.
 """
+import asyncio
+import copy
+import functools
+import hashlib
+import io
+import itertools
 import logging
-from typing import Dict, List, Optional, Any
-from urllib.parse import quote_plus, unquote_plus
+import operator
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Sequence, Tuple
+from urllib.parse import quote, urlsplit, urlunsplit
 import psycopg2  # type: ignore[import-untyped]
-from psycopg2 import OperationalError  # type: ignore[import-untyped]
+from psycopg2 import InterfaceError, OperationalError, sql  # type: ignore[import-untyped]
+from psycopg2.extensions import (  # type: ignore[import-untyped]
+    connection as PGConnection,
+    new_type,
+    register_type
+)
+from psycopg2.pool import PoolError, ThreadedConnectionPool  # type: ignore[import-untyped]
+from psycopg2.extras import (  # type: ignore[import-untyped]
+    RealDictCursor,
+    execute_batch,
+    execute_values,
+    register_default_json,
+    register_default_jsonb
+)
+import orjson
+
+from cache import TTLCache, register_cache
 
 logger = logging.getLogger(__name__)
 
+# Errors meaning the database cannot be reached, as opposed to a failing query.
+# Tools let these propagate so tool_runtime's circuit breaker counts them.
+DB_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolError)
+
+# Decode json/jsonb columns with orjson instead of the stdlib json module
+register_default_json(globally=True, loads=orjson.loads)
+register_default_jsonb(globally=True, loads=orjson.loads)
+
+# Return numeric columns (prices, averages) as float instead of Decimal:
+# results go straight into JSON for the model, which has no use for Decimal
+_NUMERIC_OID = 1700
+register_type(new_type(
+    (_NUMERIC_OID,), "DEC2FLOAT",
+    lambda value, cursor: float(value) if value is not None else None
+))
+
+# :name placeholders, skipping PostgreSQL ::type casts
+_NAMED_PARAM = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+_STATEMENT_NAME = re.compile(r"^[A-Za-z_]\w*$")
+_READ_QUERY = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_WRITE_QUERY = re.compile(r"^\s*(INSERT|UPDATE|DELETE|TRUNCATE)\b", re.IGNORECASE)
+# INSERT ... VALUES %s templates expanded by execute_values
+_VALUES_TEMPLATE = re.compile(r"\bVALUES\s+%s", re.IGNORECASE)
+# Unique names for server-side (named) cursors
+_cursor_ids = itertools.count(1)
+_column_name = operator.itemgetter(0)
+
+# Upper bound on remembered result column names (distinct query texts)
+_COLUMN_CACHE_SIZE = 1024
+
+
+def _to_positional(query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Rewrite :name placeholders as $1..$n for PREPARE.
+
+    Returns:
+        The rewritten query and the parameter names in positional order
+    """
+    names: List[str] = []
+
+    def replace(match):
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return _NAMED_PARAM.sub(replace, query), tuple(names)
+
+
+@functools.lru_cache(maxsize=512)
+def _rewrite_placeholders(query: str, param_keys: frozenset) -> str:
+    """
+    Rewrite :name placeholders as psycopg2 %(name)s, once per query text and key set.
+
+    Only names present in `param_keys` are rewritten; casts and other colons are left alone.
+    Literal % (LIKE patterns, pg_trgm operators) is doubled so psycopg2 keeps it.
+    """
+    return _NAMED_PARAM.sub(
+        lambda match: f"%({match.group(1)})s" if match.group(1) in param_keys else match.group(0),
+        query.replace("%", "%%")
+    )
+
+
+@functools.lru_cache(maxsize=512)
+def _statement_name_for(query: str) -> str:
+    """Stable prepared statement name for a query text."""
+    return "p_" + hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+
+
+def _result_cache_key(
+    query: str,
+    parameters: Optional[Dict[str, Any]],
+    as_dicts: bool = False
+) -> Optional[tuple]:
+    """Hashable cache key for a query and its parameters, or None if a value can't be hashed."""
+    if not parameters:
+        return (query, (), as_dicts)
+    items = tuple(sorted(
+        (key, tuple(value) if isinstance(value, list) else value)
+        for key, value in parameters.items()
+    ))
+    try:
+        hash(items)
+    except TypeError:
+        return None
+    return (query, items, as_dicts)
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _format_value_for_copy(value: Any) -> str:
+    """Format one value for PostgreSQL COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = orjson.dumps(value).decode()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+# password=... in key/value DSNs and URL query strings
+_DSN_PASSWORD = re.compile(r"(password\s*=\s*)('(?:[^'\\]|\\.)*'|[^\s&]+)", re.IGNORECASE)
+
+
+def _encode_dsn_password(dsn: str) -> str:
+    """
+    Percent-encode the password of a URL DSN that contains a raw '@'
+    (e.g. postgresql://user:p@ss@host/db), so libpq splits off the right host.
+    """
+    parts = urlsplit(dsn)
+    userinfo, at, hostport = parts.netloc.rpartition('@')
+    if not at or '@' not in userinfo:
+        return dsn
+    user, colon, password = userinfo.partition(':')
+    if not colon:
+        return dsn
+    return urlunsplit(parts._replace(netloc=f"{user}:{quote(password, safe='')}@{hostport}"))
+
+
+def _redact_dsn(dsn: str) -> str:
+    """Connection string that is safe to log: any password is replaced by ***."""
+    parts = urlsplit(dsn)
+    if parts.scheme and '@' in parts.netloc:
+        userinfo, _, hostport = parts.netloc.rpartition('@')
+        user = userinfo.partition(':')[0]
+        dsn = urlunsplit(parts._replace(netloc=f"{user}:***@{hostport}"))
+    return _DSN_PASSWORD.sub(r"\1***", dsn)
 
+
+class _PreparingConnection(PGConnection):
+    """
+    psycopg2 connection that remembers which statements it has PREPAREd.
+
+    Runs in autocommit mode, so a single statement needs no BEGIN/COMMIT round
+    trips; multi-statement work opts into a transaction via _connection().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.autocommit = True
+        self.prepared_statements = set()
+
+
+@dataclass(frozen=True, slots=True)
 class DatabaseCredentialsConfig:
     """Placeholder for credentials config (not needed for direct connections)."""
-    def __init__(self, credentials=None):
-        self.credentials = credentials
+    credentials: Any = None
 
 
 class MCPToolboxForDatabases:
@@ -27,63 +201,142 @@ class MCPToolboxForDatabases:
         self,
         database_type: str,
         connection_string: str,
-        credentials_config: Optional[DatabaseCredentialsConfig] = None
+        credentials_config: Optional[DatabaseCredentialsConfig] = None,
+        min_connections: int = 1,
+        max_connections: int = 10,
+        statement_timeout_ms: Optional[int] = None,
+        result_cache_ttl: float = 0.0,
+        result_cache_size: int = 1024
     ):
         """
-        Initialize database connection.
+        Initialize database connection pool settings.
         
         Args:
             database_type: Type of database (e.g., "postgresql")
             connection_string: PostgreSQL connection string
             credentials_config: Optional credentials config (not used for direct connections)
+            min_connections: Connections kept open in the pool
+            max_connections: Upper bound on concurrent connections
+            statement_timeout_ms: Optional server-side statement_timeout per connection
+            result_cache_ttl: Seconds to serve repeated SELECT results from memory (0 disables)
+            result_cache_size: Maximum number of cached SELECT results
         """
         if database_type.lower() != "postgresql":
             raise ValueError(f"Unsupported database type: {database_type}. Only PostgreSQL is supported.")
         
-        # Handle passwords with special characters (like @)
-        # If connection string has @@, it means password contains @
-        # We need to URL-encode the password part
-        if '@@' in connection_string:
-            # Split the connection string to extract password
-            # Format: postgresql://user:password@@host:port/db
-            # The first @ is part of password, second @ is separator
-            parts = connection_string.split('://', 1)
-            if len(parts) == 2:
-                scheme = parts[0]
-                rest = parts[1]
-                # Find the last @ which is the separator before host
-                last_at_index = rest.rfind('@')
-                if last_at_index > 0:
-                    user_pass = rest[:last_at_index]
-                    host_db = rest[last_at_index + 1:]
-                    if ':' in user_pass:
-                        user, password = user_pass.split(':', 1)
-                        # URL-encode the password (including the @ in it)
-                        password_encoded = quote_plus(password)
-                        # Reconstruct connection string
-                        connection_string = f"{scheme}://{user}:{password_encoded}@{host_db}"
-                        logger.info("URL-encoded password with special characters")
-        
-        self.connection_string = connection_string
-        self._connection = None
-        logger.info(f"Initialized MCPToolboxForDatabases for {database_type}")
+        # Passwords with special characters (like @) must be URL-encoded
+        # for libpq to parse the connection string
+        encoded = _encode_dsn_password(connection_string)
+        if encoded != connection_string:
+            logger.info("URL-encoded password with special characters")
+        
+        self.connection_string = encoded
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.statement_timeout_ms = statement_timeout_ms
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises instead of waiting when exhausted,
+        # so bound concurrent checkouts to make extra callers block.
+        self._slots = threading.BoundedSemaphore(max_connections)
+        # statement name -> (positional SQL, parameter order)
+        self._statements: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        # statement name or query text -> result column names
+        self._column_names: Dict[str, Tuple[str, ...]] = {}
+        # (query, parameters) -> SQLResult for SELECTs; cleared by any write
+        # through this toolbox and by cache.bust_cache()
+        self._result_cache: Optional[TTLCache] = None
+        if result_cache_ttl > 0:
+            self._result_cache = register_cache(TTLCache(maxsize=result_cache_size, ttl=result_cache_ttl))
+        logger.info("Initialized MCPToolboxForDatabases for %s", database_type)
+    
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Get or create the connection pool (connections are opened on first use)."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    connect_kwargs = {}
+                    if self.statement_timeout_ms:
+                        # Server-side cap so a runaway query can't hold a pooled connection
+                        connect_kwargs["options"] = f"-c statement_timeout={int(self.statement_timeout_ms)}"
+                    try:
+                        self._pool = ThreadedConnectionPool(
+                            self.min_connections,
+                            self.max_connections,
+                            self.connection_string,
+                            connection_factory=_PreparingConnection,
+                            **connect_kwargs
+                        )
+                    except OperationalError as e:
+                        # Provide more helpful error message
+                        logger.error("Failed to connect to database: %s", e)
+                        logger.error("Connection string: %s", _redact_dsn(self.connection_string))
+                        raise
+                    logger.info("Database pool ready (min=%s, max=%s)", self.min_connections, self.max_connections)
+        return self._pool
     
     def _get_connection(self):
-        """Get or create database connection."""
-        if self._connection is None or self._connection.closed:
-            try:
-                self._connection = psycopg2.connect(self.connection_string)
-            except OperationalError as e:
-                # Provide more helpful error message
-                logger.error(f"Failed to connect to database: {e}")
-                logger.error(f"Connection string format: {self.connection_string.split('@')[0]}@***")
-                raise
-        return self._connection
+        """Check a connection out of the pool, waiting if all are in use."""
+        pool = self._get_pool()
+        self._slots.acquire()
+        try:
+            return pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def _release_connection(self, conn, discard: bool = False):
+        """Return a connection to the pool, dropping it if it died or is poisoned."""
+        try:
+            self._get_pool().putconn(conn, close=discard or bool(conn.closed))
+        finally:
+            self._slots.release()
+    
+    @contextmanager
+    def _connection(self, transaction: bool = False) -> Iterator[PGConnection]:
+        """
+        Check a connection out for one unit of work.
+        
+        Pooled connections are in autocommit mode. With transaction=True the
+        block runs in one transaction, committed when it exits cleanly.
+        
+        On error the transaction is rolled back. Connections that died or
+        cannot be rolled back are closed instead of being handed to the next
+        caller.
+        """
+        conn = self._get_connection()
+        discard = False
+        try:
+            if transaction:
+                conn.autocommit = False
+            yield conn
+            if transaction:
+                conn.commit()
+        except BaseException:
+            # BaseException too: a generator closed early or a cancelled caller
+            # must not leave the connection inside a transaction
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+            raise
+        finally:
+            if transaction and not discard and not conn.closed:
+                try:
+                    conn.autocommit = True
+                except Exception:
+                    discard = True
+            self._release_connection(conn, discard)
     
     def execute_sql(
         self,
         query: str,
-        parameters: Optional[Dict[str, Any]] = None
+        parameters: Optional[Dict[str, Any]] = None,
+        statement_name: Optional[str] = None,
+        prepare: bool = False,
+        as_dicts: bool = False,
+        settings: Optional[Dict[str, str]] = None
     ) -> 'SQLResult':
         """
         Execute SQL query and return results.
@@ -91,52 +344,269 @@ class MCPToolboxForDatabases:
         Args:
             query: SQL query string (supports :param_name placeholders)
             parameters: Dictionary of parameters for the query
+            statement_name: Optional name for a server-side prepared statement.
+                The query is PREPAREd once per pooled connection and run with
+                EXECUTE afterwards, so PostgreSQL skips parse/plan on repeats.
+            prepare: Prepare the query under a name derived from its text. Meant
+                for queries built from a small set of variants (optional filters),
+                where each distinct text gets its own prepared statement.
+            as_dicts: Return each row as a dict keyed by column name, built by
+                psycopg2's RealDictCursor instead of zipping columns in Python.
+            settings: Optional server settings (e.g. statement_timeout) applied
+                with SET LOCAL semantics, so they last for this query only.
+                The query then runs inside its own short transaction.
             
         Returns:
             SQLResult object with rows attribute
         """
+        cache_key = None
+        if self._result_cache is not None:
+            if _READ_QUERY.match(query):
+                cache_key = _result_cache_key(query, parameters, as_dicts)
+                cached = self._result_cache.get(cache_key) if cache_key else None
+                if cached is not None:
+                    # Callers may modify rows (and the dicts decoded from json
+                    # columns); each one gets its own copy
+                    return copy.deepcopy(cached)
+            elif _WRITE_QUERY.match(query):
+                self._result_cache.clear()
+        
+        if prepare and not statement_name:
+            statement_name = _statement_name_for(query)
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # Replace :param_name with %(param_name)s for psycopg2
-            if parameters:
-                # Convert :param to %(param)s format
-                formatted_query = query
-                for key in parameters.keys():
-                    formatted_query = formatted_query.replace(f":{key}", f"%({key})s")
-            else:
-                formatted_query = query
-                parameters = {}
-            
-            cursor.execute(formatted_query, parameters)
+            with self._connection(transaction=bool(settings)) as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor if as_dicts else None)
+                
+                if settings:
+                    # set_config(..., true) is SET LOCAL with bindable values;
+                    # one round trip for all of them
+                    cursor.execute(
+                        "SELECT " + ", ".join(["set_config(%s, %s, true)"] * len(settings)),
+                        tuple(itertools.chain.from_iterable(settings.items()))
+                    )
+                
+                if statement_name:
+                    self._execute_prepared(conn, cursor, statement_name, query, parameters or {})
+                # Replace :param_name with %(param_name)s for psycopg2
+                elif parameters:
+                    formatted_query = _rewrite_placeholders(query, frozenset(parameters))
+                else:
+                    formatted_query = query
+                    parameters = {}
+                
+                if not statement_name:
+                    cursor.execute(formatted_query, parameters)
+                
+                # Fetch results
+                if cursor.description:
+                    columns = self._columns_for(statement_name or formatted_query, cursor.description)
+                    rows = cursor.fetchall()
+                else:
+                    columns = ()
+                    rows = []
+                
+                cursor.close()
             
-            # Fetch results
-            if cursor.description:
-                columns = [desc[0] for desc in cursor.description]
-                rows = cursor.fetchall()
-            else:
-                columns = []
-                rows = []
+            logger.debug("Executed SQL query, returned %s rows", len(rows))
             
-            conn.commit()
-            cursor.close()
-            
-            logger.debug(f"Executed SQL query, returned {len(rows)} rows")
+            result = SQLResult(rows=rows, columns=columns)
+            if cache_key:
+                self._result_cache.set(cache_key, copy.deepcopy(result))
+            return result
             
-            return SQLResult(rows=rows, columns=columns)
+        except Exception as e:
+            logger.error("SQL execution error: %s", e, exc_info=True)
+            raise
+    
+    def execute_many(
+        self,
+        query: str,
+        argslist: Sequence[Any],
+        fetch: bool = False,
+        page_size: int = 500
+    ) -> 'SQLResult':
+        """
+        Run one statement for many parameter sets in as few round trips as possible.
+        
+        `INSERT ... VALUES %s` statements go through psycopg2's execute_values,
+        which sends up to `page_size` rows per multi-row VALUES statement.
+        Anything else goes through execute_batch, which sends `page_size`
+        statements per round trip. Everything runs in one transaction.
+        
+        Args:
+            query: Either an `INSERT ... VALUES %s` template (argslist holds row
+                tuples) or a statement with :param_name placeholders (argslist
+                holds dicts) or %s placeholders (argslist holds tuples)
+            argslist: Parameter sets, one per row/statement
+            fetch: Return the rows produced by RETURNING (execute_values only)
+            page_size: Rows or statements per round trip
             
+        Returns:
+            SQLResult with the RETURNING rows when fetch=True, otherwise empty
+        """
+        values_mode = bool(_VALUES_TEMPLATE.search(query))
+        if fetch and not values_mode:
+            raise ValueError("fetch=True needs an 'INSERT ... VALUES %s' statement")
+        if not values_mode and argslist and isinstance(argslist[0], dict):
+            query = _rewrite_placeholders(query, frozenset(argslist[0]))
+        
+        rows: List[tuple] = []
+        columns: Tuple[str, ...] = ()
+        try:
+            with self._connection(transaction=True) as conn:
+                cursor = conn.cursor()
+                if values_mode:
+                    rows = execute_values(cursor, query, argslist, page_size=page_size, fetch=fetch) or []
+                    if fetch and cursor.description:
+                        columns = tuple(map(_column_name, cursor.description))
+                else:
+                    execute_batch(cursor, query, argslist, page_size=page_size)
+                cursor.close()
         except Exception as e:
-            logger.error(f"SQL execution error: {str(e)}", exc_info=True)
-            if self._connection:
-                self._connection.rollback()
+            logger.error("Batch SQL execution error: %s", e, exc_info=True)
             raise
+        
+        if self._result_cache is not None:
+            self._result_cache.clear()
+        logger.debug("Executed batch of %s parameter sets", len(argslist))
+        return SQLResult(rows=rows, columns=columns)
+    
+    def bulk_load(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Sequence[Any]]
+    ) -> int:
+        """
+        Load rows into a table with COPY ... FROM STDIN in one transaction.
+        
+        Much faster than INSERTs in a loop for seed/fixture data: there is no
+        per-row statement round trip, parse or plan.
+        
+        Args:
+            table: Table name, optionally schema-qualified (e.g. "public.products")
+            columns: Column names, in the order of each row's values
+            rows: Row value sequences (None -> NULL; dict/list -> JSON)
+            
+        Returns:
+            Number of rows loaded
+        """
+        buffer = io.StringIO()
+        count = 0
+        for row in rows:
+            buffer.write("\t".join(_format_value_for_copy(value) for value in row))
+            buffer.write("\n")
+            count += 1
+        buffer.seek(0)
+        
+        statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(*table.split(".")),
+            sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.copy_expert(statement, buffer)
+            cursor.close()
+        
+        if self._result_cache is not None:
+            self._result_cache.clear()
+        logger.info("Loaded %s rows into %s", count, table)
+        return count
+    
+    def iter_sql(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        itersize: int = 1000
+    ) -> Iterator[tuple]:
+        """
+        Stream the rows of a large SELECT through a named server-side cursor.
+        
+        Only `itersize` rows are held in memory at a time, instead of the whole
+        result set as with execute_sql. The pooled connection stays checked out
+        until the iterator is exhausted or closed; closing it early closes the
+        cursor, so PostgreSQL stops producing rows.
+        
+        Args:
+            query: SQL query string (supports :param_name placeholders)
+            parameters: Dictionary of parameters for the query
+            itersize: Rows fetched per network round trip
+            
+        Yields:
+            Row tuples
+        """
+        if parameters:
+            query = _rewrite_placeholders(query, frozenset(parameters))
+        # Named cursors only exist inside a transaction
+        with self._connection(transaction=True) as conn:
+            cursor = conn.cursor(name=f"stream_{next(_cursor_ids)}")
+            cursor.itersize = itersize
+            try:
+                cursor.execute(query, parameters or {})
+                yield from cursor
+            finally:
+                cursor.close()
+    
+    async def execute_sql_async(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        statement_name: Optional[str] = None,
+        prepare: bool = False,
+        as_dicts: bool = False,
+        settings: Optional[Dict[str, str]] = None
+    ) -> 'SQLResult':
+        """
+        Coroutine version of execute_sql for callers running on an event loop.
+        
+        The query runs on a pooled connection in a worker thread, so concurrent
+        callers overlap their database round trips without blocking the loop.
+        Arguments and result are the same as execute_sql.
+        """
+        return await asyncio.to_thread(
+            self.execute_sql, query, parameters, statement_name, prepare, as_dicts, settings
+        )
+    
+    def _columns_for(self, key: str, description) -> Tuple[str, ...]:
+        """Column names of a result; a given query text always yields the same ones."""
+        columns = self._column_names.get(key)
+        if columns is None:
+            columns = tuple(map(_column_name, description))
+            if len(self._column_names) < _COLUMN_CACHE_SIZE:
+                self._column_names[key] = columns
+        return columns
+    
+    def _execute_prepared(
+        self,
+        conn,
+        cursor,
+        statement_name: str,
+        query: str,
+        parameters: Dict[str, Any]
+    ):
+        """PREPARE the statement on this connection if needed, then EXECUTE it."""
+        if statement_name not in self._statements:
+            if not _STATEMENT_NAME.match(statement_name):
+                raise ValueError(f"Invalid prepared statement name: {statement_name}")
+            self._statements[statement_name] = _to_positional(query)
+        positional_query, param_names = self._statements[statement_name]
+        
+        if statement_name not in conn.prepared_statements:
+            cursor.execute(f"PREPARE {statement_name} AS {positional_query}")
+            conn.prepared_statements.add(statement_name)
+        
+        values = tuple(parameters[name] for name in param_names)
+        if values:
+            placeholders = ", ".join(["%s"] * len(values))
+            cursor.execute(f"EXECUTE {statement_name} ({placeholders})", values)
+        else:
+            cursor.execute(f"EXECUTE {statement_name}")
     
     def close(self):
-        """Close database connection."""
-        if self._connection and not self._connection.closed:
-            self._connection.close()
-            logger.info("Database connection closed")
+        """Close all pooled database connections."""
+        if self._pool is not None and not self._pool.closed:
+            self._pool.closeall()
+            logger.info("Database connection pool closed")
     
     def __enter__(self):
         return self
@@ -148,7 +618,14 @@ class MCPToolboxForDatabases:
 class SQLResult:
     """Result object that mimics MCP Toolbox SQL result."""
     
-    def __init__(self, rows: List[tuple], columns: Optional[List[str]] = None):
+    # One per query and kept in the result cache, so skip the per-instance __dict__
+    __slots__ = ("rows", "columns")
+    
+    def __init__(self, rows: List[Any], columns: Sequence[str] = ()):
         self.rows = rows
-        self.columns = columns or []
+        self.columns = columns
+    
+    def iter_rows(self) -> Iterator[tuple]:
+        """Iterate over the rows (use MCPToolboxForDatabases.iter_sql to stream large results)."""
+        return iter(self.rows)
 
@@ -12,6 +12,34 @@ from google.adk.sessions.in_memory_session_service import InMemorySessionService
 # Load environment variables
 load_dotenv()
 
+async def run_query(runner, session_service, user_id: str, query: str) -> str:
+    """Run one query in its own session and return the collected response text."""
+    from google.genai import types
+    
+    # One session per query keeps the concurrent conversations isolated
+    session = await session_service.create_session(
+        app_name="product-catalog-agent",
+        user_id=user_id,
+    )
+    
+    # Create message content
+    new_message = types.Content(parts=[types.Part(text=query)])
+    
+    # Collect response
+    response_parts = []
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session.id,
+        new_message=new_message,
+    ):
+        if hasattr(event, 'content') and event.content:
+            for part in event.content.parts:
+                if hasattr(part, 'text') and part.text:
+                    response_parts.append(part.text)
+    
+    return " ".join(response_parts) if response_parts else "No response received"
+
+
 async def main():
     """Example usage of the product catalog agent."""
     
@@ -39,44 +67,24 @@ async def main():
     print("=" * 60)
     print()
     
-    # Create a session for the user
+    # The queries are independent, so run them concurrently: total time is
+    # roughly the slowest query instead of the sum of all of them
     user_id = "test_user"
-    session = await session_service.create_session(
-        app_name="product-catalog-agent",
-        user_id=user_id,
+    results = await asyncio.gather(
+        *(run_query(runner, session_service, user_id, query) for query in queries),
+        return_exceptions=True,
     )
     
-    from google.genai import types
-    
-    for i, query in enumerate(queries, 1):
+    for i, (query, result) in enumerate(zip(queries, results), 1):
         print(f"Query {i}: {query}")
         print("-" * 60)
         
-        try:
-            # Create message content
-            new_message = types.Content(parts=[types.Part(text=query)])
-            
-            # Run the query
-            response_generator = runner.run(
-                user_id=user_id,
-                session_id=session.id,
-                new_message=new_message,
-            )
-            
-            # Collect response
-            response_parts = []
-            for event in response_generator:
-                if hasattr(event, 'content') and event.content:
-                    for part in event.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            response_parts.append(part.text)
-            
-            response = " ".join(response_parts) if response_parts else "No response received"
-            print(f"Response: {response}")
-        except Exception as e:
-            print(f"Error: {e}")
+        if isinstance(result, Exception):
+            print(f"Error: {result}")
             import traceback
-            traceback.print_exc()
+            traceback.print_exception(type(result), result, result.__traceback__)
+        else:
+            print(f"Response: {result}")
         
         print()
         print("=" * 60)
@@ -85,4 +93,3 @@ async def main():
 
 if __name__ == "__main__":
     asyncio.run(main())
-
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for agent_server.
+
+    gunicorn agent_server:app -c gunicorn.conf.py
+
+Each worker is a separate uvicorn event loop, so /query and /ws traffic spreads
+across cores. Sessions must be visible to every worker, so set REDIS_URL
+(Redis session store) before raising WEB_CONCURRENCY above 1.
+"""
+import os
+
+bind = f"{os.getenv('AGENT_SERVER_HOST', '0.0.0.0')}:{os.getenv('AGENT_SERVER_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "1000"))
+
+# No preload_app: the agents, runners and database pools are built lazily in each
+# worker's startup warmup, so preloading would share almost nothing and would only
+# start the logging listener thread in the master before fork.
+preload_app = False
+
+# Long-lived WebSocket voice sessions must not be killed as "hung" workers
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "0"))
+graceful_timeout = 30
+keepalive = 5
@@ -2,17 +2,27 @@
 Example of how to integrate the ADK agent with Express backend.
 This shows how the backend can call the Python agent.
 """
+import functools
 import os
 import sys
 from dotenv import load_dotenv
-from agent_mcp import root_agent
-from google.adk.runners import Runner
 
 # Load environment variables
 load_dotenv()
 
-# Initialize runner (you'd typically do this once and reuse it)
-runner = Runner(agent=root_agent)
+
+@functools.lru_cache(maxsize=None)
+def get_runner():
+    """
+    Build the runner on first use (you'd typically do this once and reuse it).
+
+    Importing agent_mcp pulls in google.adk and opens the database pool, so it
+    is deferred until a query actually needs the agent.
+    """
+    from agent_mcp import root_agent
+    from google.adk.runners import Runner
+
+    return Runner(agent=root_agent)
 
 
 def query_agent(user_message: str, session_id: str = None) -> dict:
@@ -35,7 +45,7 @@ def query_agent(user_message: str, session_id: str = None) -> dict:
     try:
         # Run the agent query
         # Note: In production, you'd want to use a proper session service
-        response = runner.run(user_message)
+        response = get_runner().run(user_message)
         
         return {
             "status": "success",
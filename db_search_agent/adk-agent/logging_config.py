@@ -1,13 +1,49 @@
+import atexit
 import logging
+import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
+# Background thread that does the actual stdout/file writes
+_listener: Optional[QueueListener] = None
+# Root handler that feeds _listener's queue
+_queue_handler: Optional[QueueHandler] = None
+
+
+def _stop_listener() -> None:
+    """Flush queued records and stop the listener thread (runs at exit)."""
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener_after_fork() -> None:
+    """
+    Give a forked child (e.g. a gunicorn worker forked after import) its own
+    listener thread: threads do not survive fork(), so without this the
+    child's records would pile up in a queue nobody reads. A fresh queue
+    also drops records the parent had not written yet.
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
 
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     """
     Configure logging for ADK agent.
 
+    Log calls only enqueue the record; a QueueListener thread formats it and
+    does the blocking stdout/file writes, so request paths never wait on I/O.
+    Calling this again (agent_mcp and agent_complete both do) reuses the
+    first listener; forked child processes start their own.
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
         log_file: Optional file path for log output
@@ -15,23 +51,43 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     Returns:
         Logger instance
     """
-    # Create logs directory if it doesn't exist
-    if log_file:
-        log_path = Path(log_file)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
+    global _listener, _queue_handler
+
+    if _listener is None:
+        # Create logs directory if it doesn't exist
+        if log_file:
+            log_path = Path(log_file)
+            log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Configure root logger
-    handlers = [logging.StreamHandler(sys.stdout)]
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
 
-    if log_file:
-        handlers.append(logging.FileHandler(log_file))
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        queue_handler = QueueHandler(log_queue)
+        # Only merge args into the message here; the listener's handlers add
+        # the timestamp/location prefix
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
 
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
-        handlers=handlers,
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+        _queue_handler = queue_handler
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Flush queued records on interpreter exit
+        atexit.register(_stop_listener)
+        if hasattr(os, "register_at_fork"):  # not available on Windows
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+        # Configure root logger
+        logging.basicConfig(
+            level=getattr(logging, log_level.upper()),
+            handlers=[queue_handler]
+        )
 
     # Set specific loggers
     logging.getLogger("google.adk").setLevel(logging.INFO)
@@ -39,4 +95,3 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     logging.getLogger("urllib3").setLevel(logging.WARNING)
 
     return logging.getLogger(__name__)
-
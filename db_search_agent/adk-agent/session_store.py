@@ -0,0 +1,105 @@
+"""
+Redis-backed ADK session service.
+Sessions survive restarts and are shared by every agent_server worker, which is
+what allows running more than one gunicorn/uvicorn worker.
+
+Enabled by setting REDIS_URL; otherwise agent_server keeps InMemorySessionService.
+"""
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+logger = logging.getLogger(__name__)
+
+
+class RedisSessionService(BaseSessionService):
+    """
+    Store each ADK session as one JSON document under
+    `{key_prefix}:{app_name}:{user_id}:{session_id}`, expiring after `ttl` seconds
+    of inactivity.
+
+    Session state is per session; app:/user: scoped state is not shared
+    across sessions.
+    """
+
+    def __init__(self, redis_url: str, ttl: int = 3600, key_prefix: str = "sess"):
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(redis_url)
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+
+    def _key(self, app_name: str, user_id: str, session_id: str) -> str:
+        return f"{self.key_prefix}:{app_name}:{user_id}:{session_id}"
+
+    async def _save(self, session: Session) -> None:
+        await self._redis.set(
+            self._key(session.app_name, session.user_id, session.id),
+            session.model_dump_json(),
+            ex=self.ttl,
+        )
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=(session_id or "").strip() or str(uuid.uuid4()),
+            state=state or {},
+            last_update_time=time.time(),
+        )
+        await self._save(session)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        raw = await self._redis.get(self._key(app_name, user_id, session_id))
+        if raw is None:
+            return None
+        session = Session.model_validate_json(raw)
+        if config:
+            if config.num_recent_events:
+                session.events = session.events[-config.num_recent_events:]
+            if config.after_timestamp:
+                session.events = [e for e in session.events if e.timestamp >= config.after_timestamp]
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        pattern = self._key(app_name, user_id or "*", "*")
+        keys = [key async for key in self._redis.scan_iter(match=pattern)]
+        sessions = []
+        if keys:
+            for raw in await self._redis.mget(keys):
+                if raw is not None:
+                    session = Session.model_validate_json(raw)
+                    session.events = []
+                    sessions.append(session)
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._redis.delete(self._key(app_name, user_id, session_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+        await self._save(session)
+        return event
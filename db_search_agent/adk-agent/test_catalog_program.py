@@ -0,0 +1,88 @@
+"""
+Tests for the catalog program evaluator (an AST whitelist - keep it tight).
+Run with: python -m unittest test_catalog_program
+"""
+import ast
+import unittest
+from unittest import mock
+
+try:
+    from tools import catalog_program
+    from tools.catalog_program import CatalogProgramError, _evaluate, execute_catalog_program_mcp
+except ImportError:  # psycopg2 and friends not installed
+    catalog_program = None
+
+RESULTS = {
+    "r": {"products": [{"id": 1, "price": 30}, {"id": 2, "price": 70}, {"id": 3, "price": 45}]}
+}
+
+
+def _expression(source: str):
+    return ast.parse(source, mode="eval").body
+
+
+@unittest.skipIf(catalog_program is None, "catalog_program dependencies not installed")
+class EvaluateTest(unittest.TestCase):
+
+    def test_comprehension_filter(self):
+        self.assertEqual(
+            _evaluate(_expression('[p["id"] for p in r["products"] if p["price"] < 50]'), RESULTS),
+            [1, 3]
+        )
+
+    def test_chained_comparison_and_bool_ops(self):
+        source = '[p["id"] for p in r["products"] if 40 < p["price"] <= 70 and not p["id"] in [3]]'
+        self.assertEqual(_evaluate(_expression(source), RESULTS), [2])
+
+    def test_rejects_unsupported_syntax(self):
+        for source in (
+            'r.products',                              # Attribute
+            'search(query="jeans")',                   # Call inside an argument
+            '[f(p) for p in r["products"] if len(p)]',  # Call in a comprehension
+            '(lambda: 1)',                             # Lambda
+            'r is None',                               # identity comparison
+        ):
+            with self.subTest(source=source):
+                with self.assertRaises(CatalogProgramError):
+                    _evaluate(_expression(source), RESULTS)
+
+    def test_rejects_unknown_names(self):
+        for source in ('__builtins__', 'open', '[p for p in secrets]'):
+            with self.subTest(source=source):
+                with self.assertRaises(CatalogProgramError):
+                    _evaluate(_expression(source), RESULTS)
+
+
+@unittest.skipIf(catalog_program is None, "catalog_program dependencies not installed")
+class ExecuteProgramTest(unittest.TestCase):
+
+    def test_chained_steps_resolve(self):
+        calls = []
+
+        def search(mcp_toolbox, query):
+            calls.append(("search", query))
+            return RESULTS["r"]
+
+        def availability_batch(mcp_toolbox, product_ids):
+            calls.append(("availability_batch", product_ids))
+            return {"status": "success", "ids": product_ids}
+
+        functions = {"search": search, "availability_batch": availability_batch}
+        with mock.patch.dict(catalog_program.CATALOG_FUNCTIONS, functions, clear=True):
+            result = execute_catalog_program_mcp(
+                None,
+                'r = search(query="jeans")\n'
+                'a = availability_batch(product_ids=[p["id"] for p in r["products"] if p["price"] < 50])'
+            )
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["results"]["a"]["ids"], [1, 3])
+        self.assertEqual(calls, [("search", "jeans"), ("availability_batch", [1, 3])])
+
+    def test_rejects_non_whitelisted_call(self):
+        result = execute_catalog_program_mcp(None, 'x = __import__(name="os")')
+        self.assertEqual(result["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Tests for the tool circuit breaker.
+Run with: python -m unittest test_tool_runtime
+"""
+import asyncio
+import unittest
+
+import tool_runtime
+from tool_runtime import BREAKER_FAIL_MAX, CircuitBreaker, run_tool
+
+try:
+    import psycopg2  # type: ignore[import-untyped]
+except ImportError:
+    psycopg2 = None
+
+
+class _DownToolbox:
+    """Toolbox whose database refuses every connection."""
+
+    def execute_sql(self, *args, **kwargs):
+        raise psycopg2.OperationalError("could not connect to server: Connection refused")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        tool_runtime._breakers.clear()
+
+    def test_breaker_opens_after_fail_max_failures(self):
+        calls = []
+
+        def failing_tool():
+            calls.append(1)
+            raise ConnectionError("database is down")
+
+        for _ in range(BREAKER_FAIL_MAX):
+            result = asyncio.run(run_tool(failing_tool))
+            self.assertEqual(result["status"], "error")
+        self.assertEqual(len(calls), BREAKER_FAIL_MAX)
+
+        # Open: the tool is no longer called
+        result = asyncio.run(run_tool(failing_tool))
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(len(calls), BREAKER_FAIL_MAX)
+
+    def test_error_results_do_not_open_breaker(self):
+        def not_found_tool():
+            return {"status": "error", "error_message": "Product not found"}
+
+        for _ in range(BREAKER_FAIL_MAX + 1):
+            asyncio.run(run_tool(not_found_tool))
+        self.assertTrue(tool_runtime.get_breaker("not_found_tool").allow())
+
+    def test_half_open_allows_one_trial_call(self):
+        breaker = CircuitBreaker(fail_max=1, reset_timeout=0)
+        breaker.record_failure()
+
+        self.assertTrue(breaker.allow())
+        # Concurrent callers wait for the trial call's outcome
+        self.assertFalse(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_call_reopens_breaker(self):
+        breaker = CircuitBreaker(fail_max=3, reset_timeout=60)
+        for _ in range(3):
+            breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        breaker._opened_at -= 60
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+    @unittest.skipIf(psycopg2 is None, "psycopg2 not installed")
+    def test_database_down_opens_breaker(self):
+        from tools.product_tools import get_product_details_mcp
+
+        for _ in range(BREAKER_FAIL_MAX):
+            asyncio.run(run_tool(get_product_details_mcp, mcp_toolbox=_DownToolbox(), product_id=1))
+        self.assertFalse(tool_runtime.get_breaker("get_product_details_mcp").allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
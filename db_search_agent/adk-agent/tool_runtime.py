@@ -0,0 +1,157 @@
+"""
+Runtime helpers for agent tools.
+The database tools are blocking (psycopg2), so they run in worker threads.
+This lets ADK overlap several tool calls that the model emits in one turn.
+
+Every call is bounded by MCP_TOOL_TIMEOUT seconds, and each tool has a circuit
+breaker so a dead or hung database fails fast instead of stalling agent turns.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "10"))
+BREAKER_FAIL_MAX = int(os.getenv("TOOL_BREAKER_FAIL_MAX", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("TOOL_BREAKER_RESET_TIMEOUT", "30"))
+
+
+class CircuitBreaker:
+    """
+    Minimal circuit breaker.
+
+    After `fail_max` consecutive failures the breaker opens and rejects calls
+    for `reset_timeout` seconds, then lets one trial call through (half-open).
+    Other calls are rejected until that trial call records its outcome.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._trial_in_flight:
+                return False
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Half-open: allow one trial call, re-open if it fails
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give up a trial call that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+_UNAVAILABLE = {
+    "status": "error",
+    "error_message": "The product database is temporarily unavailable. Please try again shortly."
+}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the circuit breaker for a tool, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(BREAKER_FAIL_MAX, BREAKER_RESET_TIMEOUT)
+            _breakers[name] = breaker
+        return breaker
+
+
+async def run_tool(fn: Callable[..., Any], **kwargs) -> Any:
+    """
+    Run a tool function without stalling the event loop.
+
+    Blocking functions run in a worker thread; coroutine functions are awaited
+    directly.
+
+    Timeouts and raised exceptions count as breaker failures. The database
+    tools raise only for connection-class errors (db_wrapper.DB_UNAVAILABLE_ERRORS),
+    so a database that is down opens the breaker. Error dicts the tools return
+    themselves (e.g. "product not found") do not count.
+
+    Args:
+        fn: Tool implementation (e.g. search_products_mcp)
+        **kwargs: Keyword arguments forwarded to fn
+
+    Returns:
+        Whatever fn returns, or a structured error dict on timeout, raised
+        exception or open breaker
+    """
+    breaker = get_breaker(fn.__name__)
+    if not breaker.allow():
+        logger.warning("Circuit open for %s, failing fast", fn.__name__)
+        return dict(_UNAVAILABLE)
+
+    try:
+        if inspect.iscoroutinefunction(fn):
+            call = fn(**kwargs)
+        else:
+            call = asyncio.to_thread(fn, **kwargs)
+        result = await asyncio.wait_for(call, timeout=MCP_TOOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        breaker.record_failure()
+        logger.warning("Tool %s exceeded %ss", fn.__name__, MCP_TOOL_TIMEOUT)
+        return {
+            "status": "timeout",
+            "error_message": f"query exceeded {MCP_TOOL_TIMEOUT:g}s"
+        }
+    except Exception as e:
+        breaker.record_failure()
+        logger.error("Tool %s failed: %s", fn.__name__, e, exc_info=True)
+        return dict(_UNAVAILABLE)
+    except BaseException:
+        # Cancelled: no verdict on the database, but let the next call be the trial
+        breaker.release_trial()
+        raise
+
+    breaker.record_success()
+    return result
+
+
+def install_uvloop() -> bool:
+    """
+    Use uvloop's event loop policy when it is available (not on Windows).
+
+    Must run before the event loop is created. Returns True if uvloop is active.
+    """
+    if sys.platform == "win32":
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        logger.debug("uvloop not installed, using the default asyncio event loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
@@ -0,0 +1,128 @@
+"""
+Shared MCP Toolbox setup for the agent modules.
+agent_complete and agent_mcp both import from here, so a process that loads
+both still has a single toolbox (and a single connection pool).
+"""
+import functools
+import os
+import logging
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from db_wrapper import (
+    MCPToolboxForDatabases,
+    DatabaseCredentialsConfig
+)
+
+logger = logging.getLogger(__name__)
+
+# Database connection configuration
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable is required")
+
+
+def _redact_database_url(url: str) -> str:
+    """Return the database URL with username and password masked, for logging."""
+    try:
+        parsed = urlparse(url)
+        if not parsed.hostname:
+            return "configured"
+        host = f"{parsed.hostname}:{parsed.port}" if parsed.port else parsed.hostname
+        return parsed._replace(netloc=f"***:***@{host}").geturl()
+    except ValueError:
+        return "configured"
+
+
+# Computed once; safe to log
+SAFE_DATABASE_URL = _redact_database_url(DATABASE_URL)
+
+# Refresh Google credentials this many seconds before they expire
+CREDENTIAL_REFRESH_MARGIN = 300
+CREDENTIAL_RETRY_DELAY = 60
+
+
+@functools.lru_cache(maxsize=None)
+def get_agentops():
+    """Initialize AgentOps once via agentops_setup, if it is configured."""
+    try:
+        from agentops_setup import agentops
+        if agentops:
+            logger.info("AgentOps observability enabled")
+        return agentops
+    except ImportError:
+        logger.debug("AgentOps not configured, skipping observability setup")
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_credentials_config() -> DatabaseCredentialsConfig:
+    """Load Google Application Default Credentials once."""
+    try:
+        import google.auth
+        credentials, project = google.auth.default()
+        logger.info("Google credentials loaded successfully")
+        _schedule_credentials_refresh(credentials)
+        return DatabaseCredentialsConfig(credentials=credentials)
+    except Exception as e:
+        logger.warning("Could not load Google credentials: %s. Using default credentials.", e)
+        return DatabaseCredentialsConfig()
+
+
+def _schedule_credentials_refresh(credentials, delay=None):
+    """
+    Refresh credentials on a daemon timer shortly before they expire.
+
+    Tool calls then never wait on a token refresh. Credentials that have not
+    been refreshed yet (no expiry) are refreshed right away in the background.
+    """
+    if delay is None:
+        expiry = getattr(credentials, "expiry", None)
+        if expiry is None:
+            delay = 0
+        else:
+            # google-auth stores expiry as a naive UTC datetime
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            delay = max((expiry - now).total_seconds() - CREDENTIAL_REFRESH_MARGIN, 0)
+    timer = threading.Timer(delay, _refresh_credentials, args=(credentials,))
+    timer.daemon = True
+    timer.start()
+
+
+def _refresh_credentials(credentials):
+    try:
+        from google.auth.transport.requests import Request
+        credentials.refresh(Request())
+        logger.debug("Google credentials refreshed")
+    except Exception as e:
+        logger.warning("Could not refresh Google credentials: %s", e)
+        _schedule_credentials_refresh(credentials, delay=CREDENTIAL_RETRY_DELAY)
+        return
+    if getattr(credentials, "expiry", None) is not None:
+        _schedule_credentials_refresh(credentials)
+
+
+@functools.lru_cache(maxsize=None)
+def get_mcp_toolbox() -> MCPToolboxForDatabases:
+    """Create the shared MCP Toolbox for PostgreSQL on first use."""
+    logger.info("Initializing MCP Toolbox with database: %s", SAFE_DATABASE_URL)
+    try:
+        mcp_toolbox = MCPToolboxForDatabases(
+            database_type="postgresql",
+            connection_string=DATABASE_URL,
+            credentials_config=get_credentials_config(),
+            min_connections=int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            max_connections=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "8000")),
+            result_cache_ttl=float(os.getenv("DB_RESULT_CACHE_TTL", "30"))
+        )
+        logger.info("MCP Toolbox initialized successfully")
+        return mcp_toolbox
+    except Exception as e:
+        logger.error("Failed to initialize MCP Toolbox: %s", e, exc_info=True)
+        raise
@@ -0,0 +1,199 @@
+"""
+Catalog programs: run several product tools in one tool call.
+
+The model sends a short program such as
+
+    r = search(query="jeans", limit=3)
+    v = variants(product_id=r["products"][0]["id"])
+
+and gets every named result back at once, instead of spending one LLM turn per
+tool call. Programs are parsed with `ast` and only a tiny, side-effect-free
+subset is evaluated: assignments of whitelisted calls with keyword arguments
+made of literals, earlier results, subscripts and simple list comprehensions
+(filters may use comparisons, and/or/not). Nothing is ever passed to
+eval()/exec().
+"""
+import ast
+import logging
+import operator
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_wrapper import MCPToolboxForDatabases
+from tools.product_tools import (
+    search_products_mcp,
+    get_product_details_mcp,
+    get_product_by_slug_mcp,
+    check_product_availability_mcp,
+    check_product_availability_batch_mcp,
+    get_product_variants_mcp,
+    get_categories_mcp
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_PROGRAM_STEPS = 8
+
+# Independent steps run concurrently, each on its own pooled connection
+_step_executor = ThreadPoolExecutor(max_workers=MAX_PROGRAM_STEPS, thread_name_prefix="catalog-step")
+
+# Names available to programs
+CATALOG_FUNCTIONS: Dict[str, Callable[..., Dict]] = {
+    "search": search_products_mcp,
+    "details": get_product_details_mcp,
+    "by_slug": get_product_by_slug_mcp,
+    "availability": check_product_availability_mcp,
+    "availability_batch": check_product_availability_batch_mcp,
+    "variants": get_product_variants_mcp,
+    "categories": get_categories_mcp,
+}
+
+
+# Comparison operators programs may use (no identity checks, no operator overloading hooks)
+_COMPARE_OPERATORS: Dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+}
+
+
+class CatalogProgramError(ValueError):
+    """Raised when a catalog program uses unsupported syntax or names."""
+
+
+def _evaluate(node: ast.AST, env: Dict[str, Any]) -> Any:
+    """Evaluate an argument expression against earlier step results."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_evaluate(node.operand, env)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return not _evaluate(node.operand, env)
+    if isinstance(node, ast.Compare):
+        left = _evaluate(node.left, env)
+        for op, comparator in zip(node.ops, node.comparators):
+            compare = _COMPARE_OPERATORS.get(type(op))
+            if compare is None:
+                raise CatalogProgramError(f"Unsupported comparison: {type(op).__name__}")
+            right = _evaluate(comparator, env)
+            if not compare(left, right):
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.BoolOp):
+        # Short-circuits like Python's and/or
+        value = None
+        for operand in node.values:
+            value = _evaluate(operand, env)
+            if isinstance(node.op, ast.And) != bool(value):
+                return value
+        return value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_evaluate(element, env) for element in node.elts]
+    if isinstance(node, ast.Name):
+        if node.id not in env:
+            raise CatalogProgramError(f"Unknown name: {node.id}")
+        return env[node.id]
+    if isinstance(node, ast.Subscript):
+        return _evaluate(node.value, env)[_evaluate(node.slice, env)]
+    if isinstance(node, ast.ListComp) and len(node.generators) == 1:
+        generator = node.generators[0]
+        if not isinstance(generator.target, ast.Name) or generator.is_async:
+            raise CatalogProgramError("Only 'for name in ...' comprehensions are supported")
+        items = []
+        for item in _evaluate(generator.iter, env):
+            scope = {**env, generator.target.id: item}
+            if all(_evaluate(condition, scope) for condition in generator.ifs):
+                items.append(_evaluate(node.elt, scope))
+        return items
+    raise CatalogProgramError(f"Unsupported expression: {type(node).__name__}")
+
+
+def execute_catalog_program_mcp(
+    mcp_toolbox: MCPToolboxForDatabases,
+    program: str
+) -> Dict:
+    """
+    Run a catalog program using MCP database tools.
+
+    Args:
+        mcp_toolbox: MCP Toolbox instance for database access
+        program: One call per line, optionally assigned to a name, e.g.
+            'r = search(query="jeans")' then 'details(product_id=r["products"][0]["id"])'
+
+    Returns:
+        dict: Status and the result of every step, keyed by name (or step_N)
+    """
+    results: Dict[str, Any] = {}
+    try:
+        statements = ast.parse(program).body
+        if len(statements) > MAX_PROGRAM_STEPS:
+            raise CatalogProgramError(f"Programs are limited to {MAX_PROGRAM_STEPS} steps")
+
+        # Consecutive steps that don't use each other's results form a batch
+        # and run concurrently; a step that needs a pending result starts a new batch.
+        batch: List[Tuple[str, Callable[..., Dict], Dict[str, Any]]] = []
+
+        def run_batch() -> None:
+            if len(batch) == 1:
+                name, function, kwargs = batch[0]
+                results[name] = function(mcp_toolbox=mcp_toolbox, **kwargs)
+            else:
+                futures = [
+                    (name, _step_executor.submit(function, mcp_toolbox=mcp_toolbox, **kwargs))
+                    for name, function, kwargs in batch
+                ]
+                for name, future in futures:
+                    results[name] = future.result()
+            batch.clear()
+
+        for index, statement in enumerate(statements, start=1):
+            if isinstance(statement, ast.Assign) and len(statement.targets) == 1 \
+                    and isinstance(statement.targets[0], ast.Name):
+                name, call = statement.targets[0].id, statement.value
+            elif isinstance(statement, ast.Expr):
+                name, call = f"step_{index}", statement.value
+            else:
+                raise CatalogProgramError(f"Line {statement.lineno}: expected 'name = function(...)'")
+
+            if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Name)
+                    and call.func.id in CATALOG_FUNCTIONS):
+                raise CatalogProgramError(
+                    f"Line {statement.lineno}: call one of {', '.join(CATALOG_FUNCTIONS)}"
+                )
+            if call.args or any(keyword.arg is None for keyword in call.keywords):
+                raise CatalogProgramError(f"Line {statement.lineno}: use keyword arguments only")
+
+            pending = {pending_name for pending_name, _, _ in batch}
+            uses = {node.id for keyword in call.keywords for node in ast.walk(keyword.value)
+                    if isinstance(node, ast.Name)}
+            if name in pending or uses & pending:
+                run_batch()
+
+            kwargs = {keyword.arg: _evaluate(keyword.value, results) for keyword in call.keywords}
+            logger.info("Catalog program step %s: %s(%s)", index, call.func.id, kwargs)
+            batch.append((name, CATALOG_FUNCTIONS[call.func.id], kwargs))
+
+        if batch:
+            run_batch()
+
+        return {
+            "status": "success",
+            "results": results
+        }
+    except (SyntaxError, CatalogProgramError, LookupError, TypeError) as e:
+        logger.warning("Catalog program rejected: %s", e)
+        return {
+            "status": "error",
+            "error_message": f"Invalid catalog program: {e}",
+            "results": results
+        }
@@ -1,9 +1,15 @@
 """
 Image search tool - prioritizes database images, falls back to Unsplash API.
 """
+import asyncio
+import functools
 import os
+import re
 import sys
 import requests
+from urllib.parse import parse_qs, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional
 import logging
 
@@ -12,6 +18,21 @@ logger = logging.getLogger(__name__)
 # Unsplash API endpoint (public access, no auth required for basic searches)
 UNSPLASH_API_URL = "https://api.unsplash.com/search/photos"
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY", "")
+# Seconds to wait on the database before also starting the Unsplash request
+# (roughly the database lookup's p50); fast database hits never spend quota
+UNSPLASH_HEDGE_DELAY = float(os.getenv("UNSPLASH_HEDGE_DELAY", "0.25"))
+
+# Appended to Unsplash image URLs that don't set a width yet
+_IMAGE_OPTIMIZATION_QUERY = "w=600&auto=format&fit=crop&q=60"
+
+# One keep-alive session for all Unsplash calls, so TLS setup is paid once per
+# pooled connection instead of once per search
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504)),
+))
 
 # MCP toolbox will be passed as parameter to avoid circular imports
 # Type hint for Optional MCPToolboxForDatabases
@@ -23,41 +44,72 @@ except ImportError:
     pass
 
 
+# Example Unsplash image URLs used when the API is unavailable or rate-limited
+_TSHIRT_IMAGES = (
+    "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
+    "https://images.unsplash.com/photo-1618354691373-d851c5c3a990?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
+    "https://images.unsplash.com/photo-1583743814966-8936f5b7be1a?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
+)
+_PANTS_IMAGES = (
+    "https://images.unsplash.com/photo-1605518216938-7c31b7b14ad0?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxzZWFyY2h8Nnx8cGFudHxlbnwwfHwwfHx8MA%3D%3D",
+    "https://plus.unsplash.com/premium_photo-1674828600712-7d0caab39109?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxzZWFyY2h8NXx8cGFudHxlbnwwfHwwfHx8MA%3D%3D",
+)
+_FALLBACK_URLS = {
+    "t-shirt": _TSHIRT_IMAGES,
+    "shirt": _TSHIRT_IMAGES[:2],
+    "red": _TSHIRT_IMAGES[:1],
+    "jeans": _PANTS_IMAGES[:1],
+    "pants": _PANTS_IMAGES,
+}
+# Most specific first
+_FALLBACK_PRIORITY = ("t-shirt", "shirt", "red", "jeans", "pants")
+_FALLBACK_RE = re.compile(r"t[- ]?shirt|shirt|red|jeans|pants")
+
+
+def _canonical_fallback_key(term: str) -> str:
+    """Fold the t-shirt spellings ("tshirt", "t shirt") onto one key."""
+    return "t-shirt" if term.startswith("t") else term
+
+
+# Map product-specific terms to better search queries.
+# The first key (in this order) found in the query wins, wherever it appears:
+# "jeans and t-shirt" maps to the t-shirt query. Longer phrases come first so
+# they win over their suffixes (e.g. "red cotton t-shirt" over "t-shirt").
+_QUERY_MAPPINGS = {
+    "red cotton t-shirt": "red t-shirt clothing",
+    "red cotton t shirt": "red t-shirt clothing",
+    "blue denim jeans": "blue jeans",
+    "t-shirt": "t-shirt clothing",
+    "tshirt": "t-shirt clothing",
+    "t shirt": "t-shirt clothing",
+    "jeans": "jeans clothing",
+    "pants": "pants clothing",
+    "yoga mat": "yoga mat",
+}
+
+# Brand names and descriptive words that might confuse search
+_WORDS_TO_REMOVE = frozenset({"cotton", "denim", "leather", "basicwear", "sportswear"})
+_CLOTHING_RE = re.compile("shirt|pants|jeans|jacket|dress|shoes|boots")
+
+
+@functools.lru_cache(maxsize=1024)
 def _normalize_query(query: str) -> str:
     """
     Normalize product query to better match Unsplash search terms.
     """
     query_lower = query.lower().strip()
     
-    # Map product-specific terms to better search queries
-    query_mappings = {
-        "t-shirt": "t-shirt clothing",
-        "tshirt": "t-shirt clothing",
-        "t shirt": "t-shirt clothing",
-        "red cotton t-shirt": "red t-shirt clothing",
-        "red cotton t shirt": "red t-shirt clothing",
-        "blue denim jeans": "blue jeans",
-        "jeans": "jeans clothing",
-        "pants": "pants clothing",
-        "yoga mat": "yoga mat",
-    }
-    
-    # Check for exact matches first
-    for key, mapped_query in query_mappings.items():
+    # Check for known product terms first
+    for key, mapped_query in _QUERY_MAPPINGS.items():
         if key in query_lower:
             return mapped_query
     
     # If no mapping found, clean up the query
-    # Remove brand names and extra descriptive words that might confuse search
-    words_to_remove = ["cotton", "denim", "leather", "basicwear", "sportswear"]
-    query_words = query_lower.split()
-    cleaned_words = [w for w in query_words if w not in words_to_remove]
+    cleaned_words = [w for w in query_lower.split() if w not in _WORDS_TO_REMOVE]
     
     # Add "clothing" if it's a clothing item
-    clothing_keywords = ["shirt", "pants", "jeans", "jacket", "dress", "shoes", "boots"]
-    if any(keyword in query_lower for keyword in clothing_keywords):
-        if "clothing" not in cleaned_words:
-            cleaned_words.append("clothing")
+    if _CLOTHING_RE.search(query_lower) and "clothing" not in cleaned_words:
+        cleaned_words.append("clothing")
     
     return " ".join(cleaned_words) if cleaned_words else query_lower
 
@@ -82,64 +134,34 @@ def get_product_images_from_db(
         return {}
     
     try:
-        logger.info(f"Searching database for product images: '{product_query}'")
+        logger.info("Searching database for product images: '%s'", product_query)
         
         # Import here to avoid circular imports
-        from tools.product_tools import search_products_mcp, get_product_details_mcp
+        from tools.product_tools import get_product_images_mcp
         
-        # Search for products matching the query
-        search_result = search_products_mcp(
-            mcp_toolbox=mcp_toolbox,
-            query=product_query,
-            limit=1  # Get the first matching product
-        )
+        # Best-matching product and its images in one round-trip
+        product_images = get_product_images_mcp(mcp_toolbox, product_query, count)
         
-        logger.info(f"Database search result status: {search_result.get('status')}, products found: {len(search_result.get('products', []))}")
-        
-        if search_result.get("status") != "success" or not search_result.get("products"):
-            logger.info(f"No products found in database for query: '{product_query}'")
+        if product_images.get("status") != "success":
+            logger.info("No products found in database for query: '%s'", product_query)
             return {}
         
-        product = search_result["products"][0]
-        product_id = product.get("id")
-        product_name = product.get("name", product_query)
-        
-        logger.info(f"Found product in database: ID={product_id}, Name='{product_name}'")
+        product_name = product_images.get("name") or product_query
+        images = product_images.get("images", [])
         
-        if not product_id:
-            logger.warning(f"Product found but no ID: {product}")
-            return {}
-        
-        # Get product details which includes images
-        product_details = get_product_details_mcp(mcp_toolbox, product_id)
-        
-        if product_details.get("status") != "success":
-            logger.warning(f"Failed to get product details for ID {product_id}: {product_details.get('error_message')}")
-            return {}
-        
-        product_data = product_details.get("product", {})
-        images = product_data.get("images", [])
-        
-        logger.info(f"Product '{product_name}' has {len(images)} images in database")
-        
-        if not images:
-            logger.info(f"No images found in database for product ID: {product_id} (Product: {product_name})")
-            return {}
+        logger.info("Product '%s' (ID=%s) has %s images in database", product_name, product_images.get("productId"), len(images))
         
         # Format images for response
-        image_list = []
-        for img in images[:count]:
-            if img.get("url"):
-                image_list.append({
-                    "url": img["url"],
-                    "description": img.get("altText") or product_data.get("name") or product_query,
-                    "author": "Product Catalog",
-                    "unsplash_url": "",
-                    "from_database": True
-                })
+        image_list = [{
+            "url": img["url"],
+            "description": img.get("altText") or product_name,
+            "author": "Product Catalog",
+            "unsplash_url": "",
+            "from_database": True
+        } for img in images]
         
         if image_list:
-            logger.info(f"Found {len(image_list)} images from database for product: '{product_data.get('name', product_query)}'")
+            logger.info("Found %s images from database for product: '%s'", len(image_list), product_name)
             return {
                 "success": True,
                 "query": product_query,
@@ -151,13 +173,20 @@ def get_product_images_from_db(
         return {}
         
     except Exception as e:
-        logger.error(f"Error getting images from database: {str(e)}")
+        logger.error("Error getting images from database: %s", e)
         return {}
 
 
-def search_images(query: str, count: int = 3, mcp_toolbox = None) -> Dict:
+async def search_images(query: str, count: int = 3, mcp_toolbox = None) -> Dict:
     """
-    Search for product images - FIRST checks database, then falls back to Unsplash API.
+    Search for product images - database images first, Unsplash as the fallback.
+    
+    The Unsplash request is hedged: it starts only after a database miss, or
+    once the database lookup has taken UNSPLASH_HEDGE_DELAY seconds, so a slow
+    miss costs about max(t_db, UNSPLASH_HEDGE_DELAY + t_http) instead of
+    t_db + t_http. The request runs in a worker thread and cannot be
+    cancelled: once started it completes and spends one Unsplash request
+    from the quota even if the database then returns images.
     
     Args:
         query: Product name or query (e.g., "t-shirt", "Red Cotton T-Shirt", "jeans")
@@ -167,172 +196,150 @@ def search_images(query: str, count: int = 3, mcp_toolbox = None) -> Dict:
     Returns:
         Dict with 'images' list containing image URLs and metadata
     """
+    # Limit count to reasonable range
+    count = min(max(1, count), 10)
+    
+    db_task = None
+    if mcp_toolbox:
+        logger.info("Attempting database search for images with query: '%s'", query)
+        db_task = asyncio.create_task(asyncio.to_thread(get_product_images_from_db, mcp_toolbox, query, count))
+    else:
+        logger.warning("No mcp_toolbox provided, skipping database search")
+    
+    # Unsplash request, only possible with an access key
+    http_task = None
+    
+    def start_unsplash():
+        nonlocal http_task
+        if UNSPLASH_ACCESS_KEY and http_task is None:
+            http_task = asyncio.create_task(asyncio.to_thread(_search_unsplash, query, count))
+    
     try:
-        # FIRST: Try to get images from database
-        if mcp_toolbox:
-            logger.info(f"Attempting database search for images with query: '{query}'")
-            db_result = get_product_images_from_db(mcp_toolbox, query, count)
+        if db_task:
+            # A slow database lookup gets a hedged Unsplash request alongside it
+            done, _ = await asyncio.wait({db_task}, timeout=UNSPLASH_HEDGE_DELAY)
+            if not done:
+                start_unsplash()
+            db_result = await db_task
             if db_result.get("images"):
-                logger.info(f"✓ Found {len(db_result['images'])} images from database for query: '{query}'")
+                logger.info("✓ Found %s images from database for query: '%s'", len(db_result['images']), query)
                 return db_result
-            else:
-                logger.info(f"✗ No database images found for query: '{query}', will try Unsplash")
-        else:
-            logger.warning("No mcp_toolbox provided, skipping database search")
+            logger.info("✗ No database images found for query: '%s', will try Unsplash", query)
         
-        # If no database images found, fall back to Unsplash
-        logger.info(f"Falling back to Unsplash search for: '{query}'")
-        
-        # Normalize the query for better search results
-        normalized_query = _normalize_query(query)
-        logger.info(f"Image search: original='{query}', normalized='{normalized_query}'")
-        
-        # Limit count to reasonable range
-        count = min(max(1, count), 10)
-        
-        # Prepare headers
-        headers = {}
-        if UNSPLASH_ACCESS_KEY:
-            headers["Authorization"] = f"Client-ID {UNSPLASH_ACCESS_KEY}"
-        else:
+        start_unsplash()
+        if http_task is None:
             # Without API key, Unsplash API has limited access
             # We'll use fallback for better results
             logger.warning("No UNSPLASH_ACCESS_KEY found, using fallback images")
             return _get_fallback_images(query, count)
         
-        # Make request to Unsplash API
-        params = {
-            "query": normalized_query,
-            "per_page": count,
-        }
-        
-        response = requests.get(UNSPLASH_API_URL, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            results = data.get("results", [])
-            
-            images = []
-            for result in results[:count]:
-                # Extract image URL - prefer regular, then small, then raw
-                image_url = (
-                    result.get("urls", {}).get("regular") or 
-                    result.get("urls", {}).get("small") or 
-                    result.get("urls", {}).get("raw")
-                )
-                
-                # Build optimized URL similar to the examples provided
-                # Format: https://images.unsplash.com/photo-{id}?w=600&auto=format&fit=crop&q=60
-                if image_url:
-                    # Use regular URL with optimization parameters
-                    # Unsplash URLs already include the photo ID
-                    if "unsplash.com" in image_url:
-                        # Add optimization parameters if not already present
-                        if "?" not in image_url:
-                            optimized_url = f"{image_url}?w=600&auto=format&fit=crop&q=60"
-                        elif "w=" not in image_url:
-                            optimized_url = f"{image_url}&w=600&auto=format&fit=crop&q=60"
-                        else:
-                            optimized_url = image_url
-                    else:
-                        optimized_url = image_url
-                    
-                    images.append({
-                        "url": optimized_url,
-                        "description": result.get("description") or result.get("alt_description") or query,
-                        "author": result.get("user", {}).get("name", "Unknown"),
-                        "unsplash_url": result.get("links", {}).get("html", "")
-                    })
-            
-            return {
-                "success": True,
-                "query": query,
-                "images": images,
-                "count": len(images)
-            }
-        else:
-            # If API fails, return example URLs based on query
-            logger.warning(f"Unsplash API returned status {response.status_code}, using fallback")
-            return _get_fallback_images(query, count)
+        return await http_task or _get_fallback_images(query, count)
             
     except Exception as e:
-        logger.error(f"Error searching images: {str(e)}")
+        logger.error("Error searching images: %s", e)
         return _get_fallback_images(query, count)
 
 
-def _get_fallback_images(query: str, count: int) -> Dict:
+@functools.lru_cache(maxsize=2048)
+def _optimize_image_url(image_url: str) -> str:
     """
-    Fallback function that returns example Unsplash image URLs.
-    This is used when the API is unavailable or rate-limited.
+    Add resize/compression parameters to an Unsplash URL, unless it already has a width.
+    Format: https://images.unsplash.com/photo-{id}?w=600&auto=format&fit=crop&q=60
+    """
+    parts = urlsplit(image_url)
+    if not parts.netloc.endswith("unsplash.com"):
+        return image_url
+    if parts.query:
+        if "w" in parse_qs(parts.query):
+            return image_url
+        return f"{image_url}&{_IMAGE_OPTIMIZATION_QUERY}"
+    return f"{image_url}?{_IMAGE_OPTIMIZATION_QUERY}"
+
+
+def _search_unsplash(query: str, count: int) -> Optional[Dict]:
     """
-    logger.info(f"Using fallback images for query: '{query}', count: {count}")
+    Search Unsplash for images (blocking; run in a worker thread).
     
-    # Map common queries to example image URLs
-    # These are actual Unsplash t-shirt image URLs
-    fallback_urls = {
-        "pants": [
-            "https://images.unsplash.com/photo-1605518216938-7c31b7b14ad0?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxzZWFyY2h8Nnx8cGFudHxlbnwwfHwwfHx8MA%3D%3D",
-            "https://plus.unsplash.com/premium_photo-1674828600712-7d0caab39109?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxzZWFyY2h8NXx8cGFudHxlbnwwfHwwfHx8MA%3D%3D"
-        ],
-        "jeans": [
-            "https://images.unsplash.com/photo-1605518216938-7c31b7b14ad0?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxzZWFyY2h8Nnx8cGFudHxlbnwwfHwwfHx8MA%3D%3D"
-        ],
-        # T-shirt specific images - using actual t-shirt images from Unsplash
-        "t-shirt": [
-            "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
-            "https://images.unsplash.com/photo-1618354691373-d851c5c3a990?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
-            "https://images.unsplash.com/photo-1583743814966-8936f5b7be1a?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0"
-        ],
-        "tshirt": [
-            "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
-            "https://images.unsplash.com/photo-1618354691373-d851c5c3a990?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
-            "https://images.unsplash.com/photo-1583743814966-8936f5b7be1a?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0"
-        ],
-        "shirt": [
-            "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
-            "https://images.unsplash.com/photo-1618354691373-d851c5c3a990?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0"
-        ],
-        "t shirt": [
-            "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
-            "https://images.unsplash.com/photo-1618354691373-d851c5c3a990?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0",
-            "https://images.unsplash.com/photo-1583743814966-8936f5b7be1a?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0"
-        ],
-        "red": [
-            "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=600&auto=format&fit=crop&q=60&ixlib=rb-4.1.0"
-        ]
+    Returns:
+        Dict with 'images', or None if the API did not answer with 200
+    """
+    logger.info("Searching Unsplash for: '%s'", query)
+    
+    # Normalize the query for better search results
+    normalized_query = _normalize_query(query)
+    logger.info("Image search: original='%s', normalized='%s'", query, normalized_query)
+    
+    headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
+    
+    # Make request to Unsplash API
+    params = {
+        "query": normalized_query,
+        "per_page": count,
     }
     
-    # Find matching fallback URLs - check for most specific matches first
-    query_lower = query.lower().strip()
-    urls = []
-    matched_key = None
+    response = _http.get(UNSPLASH_API_URL, params=params, headers=headers, timeout=10)
     
-    # Check for exact matches first (more specific)
-    # Check in order of specificity
-    for key in ["t-shirt", "tshirt", "t shirt", "shirt", "red", "jeans", "pants"]:
-        if key in query_lower:
-            matched_key = key
-            urls.extend(fallback_urls[key])
-            logger.info(f"Matched fallback key: '{key}' for query: '{query}'")
-            break
+    if response.status_code != 200:
+        # If API fails, the caller returns example URLs based on query
+        logger.warning("Unsplash API returned status %s, using fallback", response.status_code)
+        return None
+    
+    data = response.json()
+    results = data.get("results", [])
     
-    # If no match, use default t-shirt images (most common request)
-    if not urls:
-        matched_key = "t-shirt"
-        urls = fallback_urls["t-shirt"]
-        logger.info(f"No specific match found, using default t-shirt images for query: '{query}'")
+    images = []
+    for result in results[:count]:
+        # Extract image URL - prefer regular, then small, then raw
+        image_url = (
+            result.get("urls", {}).get("regular") or 
+            result.get("urls", {}).get("small") or 
+            result.get("urls", {}).get("raw")
+        )
+        
+        if image_url:
+            images.append({
+                "url": _optimize_image_url(image_url),
+                "description": result.get("description") or result.get("alt_description") or query,
+                "author": result.get("user", {}).get("name", "Unknown"),
+                "unsplash_url": result.get("links", {}).get("html", "")
+            })
+    
+    return {
+        "success": True,
+        "query": query,
+        "images": images,
+        "count": len(images)
+    }
+
+
+def _get_fallback_images(query: str, count: int) -> Dict:
+    """
+    Fallback function that returns example Unsplash image URLs.
+    This is used when the API is unavailable or rate-limited.
+    """
+    logger.info("Using fallback images for query: '%s', count: %s", query, count)
+    
+    # Find matching fallback URLs - the most specific key found in the query wins
+    query_lower = query.lower().strip()
+    found = {_canonical_fallback_key(m.group(0)) for m in _FALLBACK_RE.finditer(query_lower)}
     
-    # Limit to requested count
-    urls = urls[:count]
+    if found:
+        matched_key = min(found, key=_FALLBACK_PRIORITY.index)
+        urls = _FALLBACK_URLS[matched_key]
+        logger.info("Matched fallback key: '%s' for query: '%s'", matched_key, query)
+    else:
+        # If no match, use default t-shirt images (most common request)
+        urls = _TSHIRT_IMAGES
+        logger.info("No specific match found, using default t-shirt images for query: '%s'", query)
     
     images = [{
         "url": url,
         "description": f"{query} image",
         "author": "Unsplash",
         "unsplash_url": ""
-    } for url in urls]
+    } for url in urls[:count]]
     
-    logger.info(f"Returning {len(images)} fallback images for query: '{query}'")
+    logger.info("Returning %s fallback images for query: '%s'", len(images), query)
     
     return {
         "success": True,
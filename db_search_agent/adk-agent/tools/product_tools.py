@@ -1,17 +1,236 @@
 """
 Product query tools using MCP Toolbox for direct database access.
 """
+import functools
 import logging
+import re
 import sys
 import os
 from typing import Optional, Dict, List
 
+from psycopg2.errors import QueryCanceled  # type: ignore[import-untyped]
+
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from db_wrapper import MCPToolboxForDatabases
+from cache import ttl_cached
+from db_wrapper import DB_UNAVAILABLE_ERRORS, MCPToolboxForDatabases
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on search results handed back to the model in one tool call
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "50"))
+
+# One variant (aliased v, attributes va; the query groups by variant) as a JSON
+# object, so the availability/variant tools get final dicts from PostgreSQL
+VARIANT_JSON_SQL = """json_build_object(
+            'id', v.id,
+            'name', v.name,
+            'sku', v.sku,
+            'price', v.price::float8,
+            'compareAtPrice', v.compare_at_price::float8,
+            'stockQuantity', v.stock_quantity,
+            'trackInventory', v.track_inventory,
+            'attributes', COALESCE(
+                json_object_agg(va.attribute_name, va.attribute_value)
+                    FILTER (WHERE va.attribute_name IS NOT NULL),
+                '{}'::json
+            )
+        )"""
+
+# Per-query limits for product searches, applied with SET LOCAL so one
+# pathological search cannot hold a pooled connection for long
+SEARCH_STATEMENT_TIMEOUT_MS = int(os.getenv("SEARCH_STATEMENT_TIMEOUT_MS", "1500"))
+SEARCH_WORK_MEM = os.getenv("SEARCH_WORK_MEM", "16MB")
+
+# Most distinct words of a search query that are matched; longer queries
+# only add tsquery terms and trigram work, not better results
+SEARCH_MAX_WORDS = int(os.getenv("SEARCH_MAX_WORDS", "6"))
+
+# A query that is only a price ("50", "$19.99") - nothing to text-search for
+_PRICE_QUERY = re.compile(r"\$?\d+(?:\.\d+)?")
+
+# Seconds the set of known brand names is reused before re-reading it
+BRAND_CACHE_TTL = float(os.getenv("BRAND_CACHE_TTL", "300"))
+
+# Seconds category slug -> id lookups are reused (same setting as the agents' category cache)
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "600"))
+
+# Full-text document for product search: the stored, weighted (name > brand >
+# short description > description) products.search_vector column, GIN-indexed
+# by idx_products_search_vector in database/schema.sql.
+SEARCH_DOCUMENT_SQL = "p.search_vector"
+
+# User search text as a tsquery. websearch syntax lets the model pass
+# "quoted phrases", "or" and -exclusions.
+SEARCH_QUERY_SQL = "websearch_to_tsquery('simple', immutable_unaccent(:query))"
+
+# Products matching :query - indexed full-text match on name/brand/descriptions,
+# typo-tolerant word similarity on the name ("jens", "tshrt"; trigram GIN
+# index), or a category whose name/slug matches :like_query ("apparel").
+# Category matches resolve to ids first so the planner can BitmapOr the index scans.
+SEARCH_MATCH_SQL = f"""
+    ({SEARCH_DOCUMENT_SQL} @@ {SEARCH_QUERY_SQL}
+     OR :query <% p.name
+     OR p.category_id = ANY(ARRAY(
+         SELECT id FROM categories
+         WHERE name ILIKE :like_query OR slug ILIKE :like_query
+     )))
+"""
+
+
+@functools.lru_cache(maxsize=128)
+def _build_search_sql(
+    has_query: bool,
+    has_category: bool,
+    has_max_price: bool,
+    has_min_price: bool,
+    has_brand: bool,
+    has_featured: bool,
+    in_stock: bool,
+    has_cursor: bool = False,
+    has_category_id: bool = False
+) -> str:
+    """
+    SQL for search_products_mcp for one combination of filters.
+
+    There are only a few hundred combinations, so each text is built once per process;
+    its hash-named prepared statement is then reused on every pooled connection.
+    """
+    if has_query:
+        # Best-ranked matches first (name hits outweigh description hits),
+        # then closest names (pg_trgm)
+        order_by = (
+            f"ts_rank_cd({SEARCH_DOCUMENT_SQL}, {SEARCH_QUERY_SQL}) DESC, "
+            "similarity(p.name, :query) DESC, p.featured DESC, p.created_at DESC, p.id DESC"
+        )
+    else:
+        order_by = "p.featured DESC, p.created_at DESC, p.id DESC"
+
+    sql_query = f"""
+    SELECT
+        ROW_NUMBER() OVER (ORDER BY {order_by}) as position,
+        p.id, p.name, p.slug, p.description, p.short_description,
+        p.price, p.compare_at_price, p.brand, p.featured, p.created_at,
+        c.id as category_id, c.name as category_name, c.slug as category_slug,
+        -- Variant stock summary, maintained on products by a trigger on
+        -- product_variants (see database/schema.sql)
+        p.in_stock_variant_count as in_stock_variants, p.total_stock_quantity, p.total_variants
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    WHERE p.status = 'active'
+    """
+
+    conditions = []
+
+    if has_query:
+        # The 'simple' parser splits "T-Shirt" into t-shirt, t and shirt,
+        # so "t shirt" matches too.
+        conditions.append(SEARCH_MATCH_SQL)
+
+    if has_category_id:
+        # Category given by slug, resolved up front: an indexed equality on products
+        conditions.append("p.category_id = :category_id")
+    elif has_category:
+        conditions.append("c.name ILIKE :category")
+
+    if has_max_price:
+        conditions.append("p.price <= :max_price")
+
+    if has_min_price:
+        conditions.append("p.price >= :min_price")
+
+    if has_brand:
+        conditions.append("p.brand ILIKE :brand")
+
+    if has_featured:
+        conditions.append("p.featured = :featured")
+
+    # Filter by stock availability
+    if in_stock:
+        conditions.append("p.in_stock_variant_count > 0")
+
+    # Keyset pagination (browse ordering only): rows after the cursor's row
+    if has_cursor:
+        conditions.append("(p.featured, p.created_at, p.id) < (:c_feat, :c_ts, :c_id)")
+
+    if conditions:
+        sql_query += " AND " + " AND ".join(conditions)
+
+    sql_query += f"""
+    ORDER BY {order_by}
+    LIMIT :limit
+    """
+
+    # Let PostgreSQL assemble the final product list as one JSON value,
+    # so there is no per-row tuple -> dict conversion in Python.
+    # The primary image is joined here, after LIMIT, so it is looked up
+    # once per returned product rather than once per matching product.
+    # The second column holds each row's keyset cursor for the next page.
+    return f"""
+    SELECT COALESCE(json_agg(json_build_object(
+        'id', r.id,
+        'name', r.name,
+        'slug', r.slug,
+        'description', r.description,
+        'shortDescription', r.short_description,
+        'price', r.price::float8,
+        'compareAtPrice', r.compare_at_price::float8,
+        'brand', r.brand,
+        'featured', r.featured,
+        'category', CASE WHEN r.category_id IS NULL THEN NULL ELSE json_build_object(
+            'id', r.category_id,
+            'name', r.category_name,
+            'slug', r.category_slug
+        ) END,
+        'inStock', r.in_stock_variants > 0,
+        'stockQuantity', r.total_stock_quantity,
+        'totalVariants', r.total_variants,
+        'image', img.url
+    ) ORDER BY r.position), '[]'::json),
+    json_agg(concat_ws('|', r.featured, r.created_at, r.id) ORDER BY r.position)
+    FROM ({sql_query}) r
+    LEFT JOIN LATERAL (
+        SELECT url FROM product_images pi
+        WHERE pi.product_id = r.id AND pi.is_primary
+        ORDER BY pi.sort_order
+        LIMIT 1
+    ) img ON true
+    """
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_search_query(query: str) -> str:
+    """
+    Search text reduced to its first SEARCH_MAX_WORDS distinct words.
+
+    Repeated words ("shirt shirt", "Shirt shirt") are dropped, keeping the
+    first spelling. Cached because the model repeats the same searches.
+    """
+    words = {}
+    for word in query.split():
+        words.setdefault(word.casefold(), word)
+    return " ".join(list(words.values())[:SEARCH_MAX_WORDS])
+
+
+@ttl_cached(ttl=BRAND_CACHE_TTL, maxsize=4)
+def _known_brands(mcp_toolbox: MCPToolboxForDatabases) -> frozenset:
+    """Casefolded brand names of active products."""
+    result = mcp_toolbox.execute_sql(
+        query="SELECT DISTINCT brand FROM products WHERE status = 'active' AND brand IS NOT NULL",
+        statement_name='known_brands'
+    )
+    return frozenset(row[0].casefold() for row in result.rows)
+
+
+@ttl_cached(ttl=CATEGORY_CACHE_TTL, maxsize=4)
+def _category_ids_by_slug(mcp_toolbox: MCPToolboxForDatabases) -> Dict[str, int]:
+    """Category id for every category slug."""
+    result = mcp_toolbox.execute_sql(
+        query="SELECT slug, id FROM categories",
+        statement_name='category_ids_by_slug'
+    )
+    return dict(result.rows)
+
 
 def search_products_mcp(
     mcp_toolbox: MCPToolboxForDatabases,
@@ -22,7 +241,8 @@ def search_products_mcp(
     brand: Optional[str] = None,
     in_stock: bool = True,
     featured: Optional[bool] = None,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None
 ) -> Dict:
     """
     Search for products using MCP database tools.
@@ -36,132 +256,123 @@ def search_products_mcp(
         brand: Brand name to filter by
         in_stock: Only show products in stock (default: True)
         featured: Filter by featured status
-        limit: Maximum number of results (default: 10)
+        limit: Maximum number of results (default: 10, capped at SEARCH_MAX_LIMIT)
+        cursor: 'nextCursor' of a previous browse (no query) result, to fetch
+            the page after it. Ignored for text searches, which are ranked.
 
     Returns:
         dict: Dictionary with status and list of matching products
+              ('hasMore' is True when more products matched than were returned;
+              browse results then also carry 'nextCursor')
     """
     try:
-        logger.info(f"Searching products with query: {query}, category: {category}, max_price: {max_price}")
+        logger.info("Searching products with query: %s, category: %s, max_price: %s", query, category, max_price)
 
-        # Build SQL query dynamically
-        sql_query = """
-        SELECT
-            p.id, p.name, p.slug, p.description, p.short_description,
-            p.price, p.compare_at_price, p.brand, p.featured,
-            c.id as category_id, c.name as category_name, c.slug as category_slug,
-            COUNT(DISTINCT v.id) FILTER (WHERE v.stock_quantity > 0) as in_stock_variants,
-            COALESCE(SUM(v.stock_quantity), 0) as total_stock_quantity,
-            COUNT(DISTINCT v.id) as total_variants,
-            (
-                SELECT url FROM product_images pi
-                WHERE pi.product_id = p.id AND pi.is_primary = true
-                LIMIT 1
-            ) as primary_image_url
-        FROM products p
-        LEFT JOIN categories c ON p.category_id = c.id
-        LEFT JOIN product_variants v ON p.id = v.product_id
-        WHERE p.status = 'active'
-        """
+        if query:
+            query = _normalize_search_query(query)
+
+        # Queries that are only a price or a brand name need no text search:
+        # a bare number matches nothing useful, and a brand is served by the
+        # brand filter without the full-text/trigram OR chain.
+        if query:
+            if _PRICE_QUERY.fullmatch(query):
+                query = None
+            elif not brand and query.casefold() in _known_brands(mcp_toolbox):
+                brand, query = query, None
 
-        conditions = []
         params = {}
 
         if query:
-            # Improved search: handle hyphens/spaces and also search in category names
-            # This helps match "T shirt" with "T-Shirt" and "apparel" with category name
-            conditions.append("""
-                (p.name ILIKE :query 
-                 OR p.description ILIKE :query 
-                 OR p.short_description ILIKE :query 
-                 OR p.brand ILIKE :query
-                 OR REPLACE(LOWER(p.name), '-', ' ') LIKE REPLACE(LOWER(:query), '-', ' ')
-                 OR REPLACE(LOWER(p.name), ' ', '-') LIKE REPLACE(LOWER(:query), ' ', '-')
-                 OR c.name ILIKE :query
-                 OR c.slug ILIKE :query)
-            """)
-            params['query'] = f'%{query}%'
+            params['query'] = query
+            params['like_query'] = f'%{query}%'
 
+        category_id = None
         if category:
-            conditions.append("(c.slug = :category OR c.name ILIKE :category)")
-            params['category'] = category
+            category_id = _category_ids_by_slug(mcp_toolbox).get(category)
+            if category_id is not None:
+                params['category_id'] = category_id
+            else:
+                params['category'] = category
 
         if max_price:
-            conditions.append("p.price <= :max_price")
             params['max_price'] = float(max_price)
 
         if min_price:
-            conditions.append("p.price >= :min_price")
             params['min_price'] = float(min_price)
 
         if brand:
-            conditions.append("p.brand ILIKE :brand")
             params['brand'] = f'%{brand}%'
 
         if featured is not None:
-            conditions.append("p.featured = :featured")
             params['featured'] = featured
 
-        if conditions:
-            sql_query += " AND " + " AND ".join(conditions)
+        if cursor and not query:
+            try:
+                c_feat, c_ts, c_id = cursor.split('|', 2)
+                params['c_feat'] = c_feat == 't'
+                params['c_ts'] = c_ts
+                params['c_id'] = int(c_id)
+            except ValueError:
+                return {
+                    "status": "error",
+                    "error_message": f"Invalid cursor: {cursor}"
+                }
+        else:
+            cursor = None
 
-        sql_query += """
-        GROUP BY p.id, p.name, p.slug, p.description, p.short_description,
-                 p.price, p.compare_at_price, p.brand, p.featured,
-                 c.id, c.name, c.slug
-        """
-        
+        # Fetch one extra row to tell the model whether it should narrow the search
+        limit = max(1, min(int(limit), SEARCH_MAX_LIMIT))
+        params['limit'] = limit + 1
 
-        # Filter by stock availability
-        if in_stock:
-            sql_query += " HAVING COUNT(DISTINCT v.id) FILTER (WHERE v.stock_quantity > 0) > 0"
+        sql_query = _build_search_sql(
+            bool(query), bool(category), bool(max_price), bool(min_price),
+            bool(brand), featured is not None, bool(in_stock), bool(cursor),
+            category_id is not None
+        )
 
-        sql_query += """
-        ORDER BY p.featured DESC, p.created_at DESC
-        LIMIT :limit
-        """
-        params['limit'] = limit
+        settings = {
+            'statement_timeout': f'{SEARCH_STATEMENT_TIMEOUT_MS}ms',
+            'work_mem': SEARCH_WORK_MEM
+        }
+        if query:
+            # The text match is served by the search_vector/trigram GIN indexes
+            settings['enable_seqscan'] = 'off'
 
         # Execute query using MCP toolbox
         result = mcp_toolbox.execute_sql(
             query=sql_query,
-            parameters=params
+            parameters=params,
+            prepare=True,
+            settings=settings
         )
 
-        logger.info(f"Found {len(result.rows)} products")
-
-        products = []
-        for row in result.rows:
-            # Column order: id, name, slug, desc, short_desc, price, compare_price, brand, featured,
-            #               cat_id, cat_name, cat_slug, in_stock_variants, total_stock_quantity, total_variants, image
-            products.append({
-                "id": row[0],
-                "name": row[1],
-                "slug": row[2],
-                "description": row[3],
-                "shortDescription": row[4],
-                "price": float(row[5]) if row[5] else None,
-                "compareAtPrice": float(row[6]) if row[6] else None,
-                "brand": row[7],
-                "featured": row[8],
-                "category": {
-                    "id": row[9],
-                    "name": row[10],
-                    "slug": row[11]
-                } if row[9] else None,
-                "inStock": row[12] > 0 if row[12] is not None else False,
-                "stockQuantity": int(row[13]) if len(row) > 13 and row[13] is not None else 0,
-                "totalVariants": row[14] if len(row) > 14 and row[14] is not None else 0,
-                "image": row[15] if len(row) > 15 and row[15] else None
-            })
+        # json/jsonb columns arrive already decoded (orjson, see db_wrapper)
+        products, cursors = result.rows[0] if result.rows else ([], None)
 
-        return {
+        has_more = len(products) > limit
+        products = products[:limit]
+
+        logger.info("Found %s products", len(products))
+
+        response = {
             "status": "success",
             "count": len(products),
+            "hasMore": has_more,
             "products": products
         }
+        if has_more and not query:
+            response["nextCursor"] = cursors[limit - 1]
+        return response
+    except QueryCanceled:
+        logger.warning("Product search exceeded %sms (query: %s)", SEARCH_STATEMENT_TIMEOUT_MS, query)
+        return {
+            "status": "timeout",
+            "error_message": "The search took too long. Try narrower filters (category, brand or price)."
+        }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
-        logger.error(f"Error searching products: {str(e)}", exc_info=True)
+        logger.error("Error searching products: %s", e, exc_info=True)
         return {
             "status": "error",
             "error_message": f"Failed to search products: {str(e)}"
@@ -170,7 +381,8 @@ def search_products_mcp(
 
 def get_product_details_mcp(
     mcp_toolbox: MCPToolboxForDatabases,
-    product_id: int
+    product_id: Optional[int] = None,
+    slug: Optional[str] = None
 ) -> Dict:
     """
     Get detailed information about a specific product using MCP database tools.
@@ -178,22 +390,33 @@ def get_product_details_mcp(
     Args:
         mcp_toolbox: MCP Toolbox instance for database access
         product_id: The ID of the product
+        slug: Product slug, used instead of product_id when given
 
     Returns:
         dict: Product details or error message
     """
     try:
-        logger.info(f"Fetching product details for ID: {product_id}")
-
-        # Get product with variants and images
-        sql_query = """
+        if slug is not None:
+            logger.info("Fetching product details for slug: %s", slug)
+            lookup, parameters = "p.slug = :slug", {'slug': slug}
+            statement_name = 'product_details_by_slug'
+            not_found = f"Product with slug '{slug}' not found."
+        else:
+            logger.info("Fetching product details for ID: %s", product_id)
+            lookup, parameters = "p.id = :product_id", {'product_id': product_id}
+            statement_name = 'product_details'
+            not_found = f"Product with ID {product_id} not found."
+
+        # Product, variants (with attributes), images, tags and review summary
+        # in one round trip
+        sql_query = f"""
         SELECT
             p.id, p.name, p.slug, p.description, p.short_description,
             p.sku, p.price, p.compare_at_price, p.cost_price,
             p.brand, p.status, p.featured,
             c.id as category_id, c.name as category_name, c.slug as category_slug,
-            json_agg(
-                DISTINCT jsonb_build_object(
+            (
+                SELECT json_agg(jsonb_build_object(
                     'id', v.id,
                     'name', v.name,
                     'sku', v.sku,
@@ -202,157 +425,89 @@ def get_product_details_mcp(
                     'stockQuantity', v.stock_quantity,
                     'trackInventory', v.track_inventory,
                     'weight', v.weight,
-                    'dimensions', v.dimensions
-                )
-            ) FILTER (WHERE v.id IS NOT NULL) as variants
+                    'dimensions', v.dimensions,
+                    'attributes', COALESCE((
+                        SELECT jsonb_object_agg(va.attribute_name, va.attribute_value ORDER BY va.attribute_name)
+                        FROM variant_attributes va
+                        WHERE va.variant_id = v.id
+                    ), '{{}}'::jsonb)
+                ) ORDER BY v.id)
+                FROM product_variants v
+                WHERE v.product_id = p.id
+            ) as variants,
+            (
+                SELECT json_agg(json_build_object(
+                    'id', i.id,
+                    'url', i.url,
+                    'altText', i.alt_text,
+                    'sortOrder', i.sort_order,
+                    'isPrimary', i.is_primary
+                ) ORDER BY i.is_primary DESC, i.sort_order ASC)
+                FROM product_images i
+                WHERE i.product_id = p.id
+            ) as images,
+            (
+                SELECT json_agg(json_build_object(
+                    'id', t.id,
+                    'name', t.name,
+                    'slug', t.slug
+                ))
+                FROM product_tags t
+                JOIN product_tag_relations ptr ON t.id = ptr.tag_id
+                WHERE ptr.product_id = p.id
+            ) as tags,
+            rv.review_count, rv.average_rating
         FROM products p
         LEFT JOIN categories c ON p.category_id = c.id
-        LEFT JOIN product_variants v ON p.id = v.product_id
-        WHERE p.id = :product_id AND p.status = 'active'
-        GROUP BY p.id, p.name, p.slug, p.description, p.short_description,
-                 p.sku, p.price, p.compare_at_price, p.cost_price,
-                 p.brand, p.status, p.featured,
-                 c.id, c.name, c.slug
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*) as review_count, AVG(rating) as average_rating
+            FROM product_reviews r
+            WHERE r.product_id = p.id
+        ) rv
+        WHERE {lookup} AND p.status = 'active'
         """
 
+        # Rows keyed by column name, so the mapping below does not depend on
+        # column positions; numeric columns already arrive as float (db_wrapper)
         result = mcp_toolbox.execute_sql(
             query=sql_query,
-            parameters={'product_id': product_id}
+            parameters=parameters,
+            statement_name=statement_name,
+            as_dicts=True
         )
 
         if not result.rows:
             return {
                 "status": "error",
-                "error_message": f"Product with ID {product_id} not found."
+                "error_message": not_found
             }
 
         row = result.rows[0]
-
-        # Get variant attributes
-        variant_ids = []
-        if row[15]:  # variants JSON
-            import json
-            variants_data = json.loads(row[15]) if isinstance(row[15], str) else row[15]
-            variant_ids = [v.get('id') for v in variants_data if v.get('id')]
-
-        attributes_query = """
-        SELECT va.variant_id, va.attribute_name, va.attribute_value
-        FROM variant_attributes va
-        WHERE va.variant_id = ANY(:variant_ids)
-        ORDER BY va.variant_id, va.attribute_name
-        """
-        attributes_result = mcp_toolbox.execute_sql(
-            query=attributes_query,
-            parameters={'variant_ids': variant_ids}
-        ) if variant_ids else None
-
-        # Get product images
-        images_query = """
-        SELECT id, url, alt_text, sort_order, is_primary
-        FROM product_images
-        WHERE product_id = :product_id
-        ORDER BY is_primary DESC, sort_order ASC
-        """
-        images_result = mcp_toolbox.execute_sql(
-            query=images_query,
-            parameters={'product_id': product_id}
-        )
-
-        # Get product tags
-        tags_query = """
-        SELECT t.id, t.name, t.slug
-        FROM product_tags t
-        JOIN product_tag_relations ptr ON t.id = ptr.tag_id
-        WHERE ptr.product_id = :product_id
-        """
-        tags_result = mcp_toolbox.execute_sql(
-            query=tags_query,
-            parameters={'product_id': product_id}
-        )
-
-        # Get reviews summary
-        reviews_query = """
-        SELECT 
-            COUNT(*) as review_count,
-            AVG(rating) as average_rating
-        FROM product_reviews
-        WHERE product_id = :product_id
-        """
-        reviews_result = mcp_toolbox.execute_sql(
-            query=reviews_query,
-            parameters={'product_id': product_id}
-        )
-
-        # Process variants with attributes
-        variants = []
-        if row[15]:
-            import json
-            variants_data = json.loads(row[15]) if isinstance(row[15], str) else row[15]
-            variant_attrs = {}
-            if attributes_result:
-                for attr_row in attributes_result.rows:
-                    vid = attr_row[0]
-                    if vid not in variant_attrs:
-                        variant_attrs[vid] = {}
-                    variant_attrs[vid][attr_row[1]] = attr_row[2]
-
-            for variant in variants_data:
-                variant['attributes'] = variant_attrs.get(variant.get('id'), {})
-                variants.append(variant)
-
-        # Process images
-        images = []
-        if images_result:
-            for img_row in images_result.rows:
-                images.append({
-                    "id": img_row[0],
-                    "url": img_row[1],
-                    "altText": img_row[2],
-                    "sortOrder": img_row[3],
-                    "isPrimary": img_row[4]
-                })
-
-        # Process tags
-        tags = []
-        if tags_result:
-            for tag_row in tags_result.rows:
-                tags.append({
-                    "id": tag_row[0],
-                    "name": tag_row[1],
-                    "slug": tag_row[2]
-                })
-
-        # Process reviews summary
-        review_count = 0
-        average_rating = None
-        if reviews_result and reviews_result.rows:
-            review_row = reviews_result.rows[0]
-            review_count = review_row[0] or 0
-            average_rating = float(review_row[1]) if review_row[1] else None
+        variants = row["variants"] or []
 
         product = {
-            "id": row[0],
-            "name": row[1],
-            "slug": row[2],
-            "description": row[3],
-            "shortDescription": row[4],
-            "sku": row[5],
-            "price": float(row[6]) if row[6] else None,
-            "compareAtPrice": float(row[7]) if row[7] else None,
-            "costPrice": float(row[8]) if row[8] else None,
-            "brand": row[7],
-            "status": row[10],
-            "featured": row[11],
+            "id": row["id"],
+            "name": row["name"],
+            "slug": row["slug"],
+            "description": row["description"],
+            "shortDescription": row["short_description"],
+            "sku": row["sku"],
+            "price": row["price"],
+            "compareAtPrice": row["compare_at_price"],
+            "costPrice": row["cost_price"],
+            "brand": row["brand"],
+            "status": row["status"],
+            "featured": row["featured"],
             "category": {
-                "id": row[12],
-                "name": row[13],
-                "slug": row[14]
-            } if row[12] else None,
+                "id": row["category_id"],
+                "name": row["category_name"],
+                "slug": row["category_slug"]
+            } if row["category_id"] else None,
             "variants": variants,
-            "images": images,
-            "tags": tags,
-            "reviewCount": review_count,
-            "averageRating": average_rating,
+            "images": row["images"] or [],
+            "tags": row["tags"] or [],
+            "reviewCount": row["review_count"] or 0,
+            "averageRating": row["average_rating"],
             "inStock": any(v.get('stockQuantity', 0) > 0 for v in variants) if variants else False
         }
 
@@ -360,8 +515,10 @@ def get_product_details_mcp(
             "status": "success",
             "product": product
         }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching product: {str(e)}", exc_info=True)
+        logger.error("Error fetching product: %s", e, exc_info=True)
         return {
             "status": "error",
             "error_message": f"Failed to get product: {str(e)}"
@@ -382,34 +539,86 @@ def get_product_by_slug_mcp(
     Returns:
         dict: Product details or error message
     """
+    # The details query looks the product up by slug itself (unique index),
+    # so there is no separate id lookup round trip
+    return get_product_details_mcp(mcp_toolbox, slug=slug)
+
+
+def get_product_images_mcp(
+    mcp_toolbox: MCPToolboxForDatabases,
+    query: str,
+    count: int = 3
+) -> Dict:
+    """
+    Find the best-matching in-stock product and its images in one query.
+
+    Matches products the same way search_products_mcp does and takes the first
+    result, so the image tool does not need a search plus a details round-trip.
+
+    Args:
+        mcp_toolbox: MCP Toolbox instance for database access
+        query: Product name or query to search for
+        count: Maximum number of images to return
+
+    Returns:
+        dict: Product id/name and its images (primary first), or error message
+    """
     try:
-        logger.info(f"Fetching product by slug: {slug}")
+        logger.info("Fetching product images for query: %s", query)
 
-        # First get product ID by slug
-        id_query = "SELECT id FROM products WHERE slug = :slug AND status = 'active'"
-        id_result = mcp_toolbox.execute_sql(
-            query=id_query,
-            parameters={'slug': slug}
+        sql_query = f"""
+        SELECT
+            p.id, p.name,
+            (
+                SELECT COALESCE(json_agg(json_build_object(
+                    'url', i.url,
+                    'altText', i.alt_text
+                )), '[]'::json)
+                FROM (
+                    SELECT url, alt_text FROM product_images pi
+                    WHERE pi.product_id = p.id AND pi.url IS NOT NULL
+                    ORDER BY pi.is_primary DESC, pi.sort_order ASC
+                    LIMIT :count
+                ) i
+            ) as images
+        FROM products p
+        WHERE p.status = 'active'
+          AND {SEARCH_MATCH_SQL}
+          AND p.in_stock_variant_count > 0
+        ORDER BY ts_rank_cd({SEARCH_DOCUMENT_SQL}, {SEARCH_QUERY_SQL}) DESC,
+                 similarity(p.name, :query) DESC, p.featured DESC, p.created_at DESC
+        LIMIT 1
+        """
+
+        result = mcp_toolbox.execute_sql(
+            query=sql_query,
+            parameters={'query': query, 'like_query': f'%{query}%', 'count': max(1, int(count))},
+            prepare=True
         )
 
-        if not id_result.rows:
+        if not result.rows:
             return {
                 "status": "error",
-                "error_message": f"Product with slug '{slug}' not found."
+                "error_message": f"No product found for '{query}'."
             }
 
-        product_id = id_result.rows[0][0]
+        product_id, name, images = result.rows[0]
 
-        # Use the get_product_details_mcp function
-        return get_product_details_mcp(mcp_toolbox, product_id)
+        return {
+            "status": "success",
+            "productId": product_id,
+            "name": name,
+            "images": images
+        }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching product by slug: {str(e)}", exc_info=True)
+        logger.error("Error fetching product images: %s", e, exc_info=True)
         return {
             "status": "error",
-            "error_message": f"Failed to get product: {str(e)}"
+            "error_message": f"Failed to get product images: {str(e)}"
         }
 
-
 def check_product_availability_mcp(
     mcp_toolbox: MCPToolboxForDatabases,
     product_id: int,
@@ -429,78 +638,138 @@ def check_product_availability_mcp(
         dict: Availability information
     """
     try:
-        logger.info(f"Checking availability for product {product_id}, size: {size}, color: {color}")
+        logger.info("Checking availability for product %s, size: %s, color: %s", product_id, size, color)
 
-        sql_query = """
-        SELECT
-            v.id, v.name, v.sku, v.price, v.compare_at_price,
-            v.stock_quantity, v.track_inventory,
-            json_object_agg(va.attribute_name, va.attribute_value) as attributes
+        sql_query = f"""
+        SELECT {VARIANT_JSON_SQL}
         FROM product_variants v
         JOIN variant_attributes va ON v.id = va.variant_id
-        WHERE v.product_id = :product_id
         """
 
         params = {'product_id': product_id}
 
         if size:
             sql_query += """
-            AND EXISTS (
-                SELECT 1 FROM variant_attributes va2
-                WHERE va2.variant_id = v.id
-                AND va2.attribute_name = 'size'
-                AND LOWER(va2.attribute_value) = LOWER(:size)
-            )
+        JOIN variant_attributes va_s ON va_s.variant_id = v.id
+            AND va_s.attribute_name = 'size'
+            AND LOWER(va_s.attribute_value) = LOWER(:size)
             """
             params['size'] = size
 
         if color:
             sql_query += """
-            AND EXISTS (
-                SELECT 1 FROM variant_attributes va3
-                WHERE va3.variant_id = v.id
-                AND va3.attribute_name = 'color'
-                AND LOWER(va3.attribute_value) = LOWER(:color)
-            )
+        JOIN variant_attributes va_c ON va_c.variant_id = v.id
+            AND va_c.attribute_name = 'color'
+            AND LOWER(va_c.attribute_value) = LOWER(:color)
             """
             params['color'] = color
 
         sql_query += """
+        WHERE v.product_id = :product_id
         GROUP BY v.id, v.name, v.sku, v.price, v.compare_at_price,
                  v.stock_quantity, v.track_inventory
         HAVING v.stock_quantity > 0 OR v.track_inventory = false
         ORDER BY v.stock_quantity DESC
         """
 
-        result = mcp_toolbox.execute_sql(query=sql_query, parameters=params)
-
-        variants = []
-        total_stock = 0
-        for row in result.rows:
-            import json
-            attributes = json.loads(row[7]) if isinstance(row[7], str) else row[7] if row[7] else {}
-            
-            variant = {
-                "id": row[0],
-                "name": row[1],
-                "sku": row[2],
-                "price": float(row[3]) if row[3] else None,
-                "compareAtPrice": float(row[4]) if row[4] else None,
-                "stockQuantity": row[5],
-                "trackInventory": row[6],
-                "attributes": attributes
-            }
-            variants.append(variant)
-            total_stock += row[5] if row[5] else 0
+        result = mcp_toolbox.execute_sql(query=sql_query, parameters=params, prepare=True)
+
+        variants = [row[0] for row in result.rows]
 
         return {
             "status": "success",
             "available": len(variants) > 0,
             "variants": variants,
-            "totalStock": total_stock
+            "totalStock": sum(v["stockQuantity"] or 0 for v in variants)
+        }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        logger.error("Error checking availability: %s", e, exc_info=True)
+        return {
+            "status": "error",
+            "error_message": f"Failed to check availability: {str(e)}"
+        }
+
+
+def check_product_availability_batch_mcp(
+    mcp_toolbox: MCPToolboxForDatabases,
+    product_ids: List[int],
+    size: Optional[str] = None,
+    color: Optional[str] = None
+) -> Dict:
+    """
+    Check availability of several products in one query using MCP database tools.
+
+    Args:
+        mcp_toolbox: MCP Toolbox instance for database access
+        product_ids: IDs of the products to check
+        size: Optional size to check (e.g., "M", "10")
+        color: Optional color to check (e.g., "red", "black")
+
+    Returns:
+        dict: Availability information per product, in the order requested
+    """
+    try:
+        logger.info("Checking availability for products %s, size: %s, color: %s", product_ids, size, color)
+
+        if not product_ids:
+            return {"status": "success", "products": []}
+
+        sql_query = f"""
+        SELECT v.product_id, {VARIANT_JSON_SQL}
+        FROM product_variants v
+        JOIN variant_attributes va ON v.id = va.variant_id
+        """
+
+        params = {'product_ids': list(product_ids)}
+
+        if size:
+            sql_query += """
+        JOIN variant_attributes va_s ON va_s.variant_id = v.id
+            AND va_s.attribute_name = 'size'
+            AND LOWER(va_s.attribute_value) = LOWER(:size)
+            """
+            params['size'] = size
+
+        if color:
+            sql_query += """
+        JOIN variant_attributes va_c ON va_c.variant_id = v.id
+            AND va_c.attribute_name = 'color'
+            AND LOWER(va_c.attribute_value) = LOWER(:color)
+            """
+            params['color'] = color
+
+        sql_query += """
+        WHERE v.product_id = ANY(:product_ids)
+        GROUP BY v.product_id, v.id, v.name, v.sku, v.price, v.compare_at_price,
+                 v.stock_quantity, v.track_inventory
+        HAVING v.stock_quantity > 0 OR v.track_inventory = false
+        ORDER BY v.product_id, v.stock_quantity DESC
+        """
+
+        result = mcp_toolbox.execute_sql(query=sql_query, parameters=params, prepare=True)
+
+        availability = {
+            product_id: {"productId": product_id, "available": False, "variants": [], "totalStock": 0}
+            for product_id in product_ids
+        }
+        for product_id, variant in result.rows:
+            entry = availability.get(product_id)
+            if entry is None:
+                continue
+            entry["variants"].append(variant)
+            entry["available"] = True
+            entry["totalStock"] += variant["stockQuantity"] or 0
+
+        return {
+            "status": "success",
+            "products": list(availability.values())
         }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
-        logger.error(f"Error checking availability: {str(e)}", exc_info=True)
+        logger.error("Error checking availability: %s", e, exc_info=True)
         return {
             "status": "error",
             "error_message": f"Failed to check availability: {str(e)}"
@@ -525,21 +794,28 @@ def get_product_variants_mcp(
         dict: Product variants with attributes (sizes, colors, etc.)
     """
     try:
-        # If product_name provided but not product_id, find the product first
+        # If product_name provided but not product_id, resolve it with a
+        # single indexed id lookup rather than a full product search
         if product_name and not product_id:
-            logger.info(f"Searching for product by name: {product_name}")
-            search_result = search_products_mcp(
-                mcp_toolbox=mcp_toolbox,
-                query=product_name,
-                limit=1
+            logger.info("Resolving product by name: %s", product_name)
+            result = mcp_toolbox.execute_sql(
+                query=f"""
+                SELECT p.id
+                FROM products p
+                WHERE p.status = 'active'
+                AND ({SEARCH_DOCUMENT_SQL} @@ {SEARCH_QUERY_SQL} OR :query <% p.name)
+                ORDER BY word_similarity(:query, p.name) DESC, p.featured DESC
+                LIMIT 1
+                """,
+                parameters={'query': product_name},
+                statement_name='resolve_product_id'
             )
-            if search_result.get("status") == "success" and search_result.get("products"):
-                product_id = search_result["products"][0]["id"]
-            else:
+            if not result.rows:
                 return {
                     "status": "error",
                     "error_message": f"Product '{product_name}' not found"
                 }
+            product_id = result.rows[0][0]
 
         if not product_id:
             return {
@@ -547,14 +823,25 @@ def get_product_variants_mcp(
                 "error_message": "Product ID or name is required"
             }
 
-        logger.info(f"Fetching variants for product ID: {product_id}")
+        logger.info("Fetching variants for product ID: %s", product_id)
 
-        # Get all variants with their attributes
-        sql_query = """
+        # Get all variants with their attributes. The distinct sizes/colors are
+        # uncorrelated subqueries, so PostgreSQL computes them once per query.
+        sql_query = f"""
         SELECT
-            v.id, v.name, v.sku, v.price, v.compare_at_price,
-            v.stock_quantity, v.track_inventory,
-            json_object_agg(va.attribute_name, va.attribute_value) as attributes
+            {VARIANT_JSON_SQL},
+            (
+                SELECT array_agg(DISTINCT a.attribute_value ORDER BY a.attribute_value)
+                FROM variant_attributes a
+                JOIN product_variants pv ON pv.id = a.variant_id
+                WHERE pv.product_id = :product_id AND a.attribute_name = 'size'
+            ) as sizes,
+            (
+                SELECT array_agg(DISTINCT a.attribute_value ORDER BY a.attribute_value)
+                FROM variant_attributes a
+                JOIN product_variants pv ON pv.id = a.variant_id
+                WHERE pv.product_id = :product_id AND a.attribute_name = 'color'
+            ) as colors
         FROM product_variants v
         LEFT JOIN variant_attributes va ON v.id = va.variant_id
         WHERE v.product_id = :product_id
@@ -565,51 +852,125 @@ def get_product_variants_mcp(
 
         result = mcp_toolbox.execute_sql(
             query=sql_query,
-            parameters={'product_id': product_id}
+            parameters={'product_id': product_id},
+            statement_name='product_variants'
         )
 
-        variants = []
-        sizes = set()
-        colors = set()
-        
-        for row in result.rows:
-            import json
-            attributes = json.loads(row[7]) if isinstance(row[7], str) else row[7] if row[7] else {}
-            
-            variant = {
-                "id": row[0],
-                "name": row[1],
-                "sku": row[2],
-                "price": float(row[3]) if row[3] else None,
-                "compareAtPrice": float(row[4]) if row[4] else None,
-                "stockQuantity": row[5],
-                "trackInventory": row[6],
-                "attributes": attributes
-            }
-            variants.append(variant)
-            
-            # Extract sizes and colors
-            if 'size' in attributes:
-                sizes.add(attributes['size'])
-            if 'color' in attributes:
-                colors.add(attributes['color'])
+        variants = [row[0] for row in result.rows]
 
+        first_row = result.rows[0] if result.rows else None
         return {
             "status": "success",
             "productId": product_id,
             "variants": variants,
-            "availableSizes": sorted(list(sizes)) if sizes else [],
-            "availableColors": sorted(list(colors)) if colors else [],
+            "availableSizes": (first_row[1] or []) if first_row else [],
+            "availableColors": (first_row[2] or []) if first_row else [],
             "totalVariants": len(variants)
         }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching product variants: {str(e)}", exc_info=True)
+        logger.error("Error fetching product variants: %s", e, exc_info=True)
         return {
             "status": "error",
             "error_message": f"Failed to get product variants: {str(e)}"
         }
 
 
+def get_product_with_variants_mcp(
+    mcp_toolbox: MCPToolboxForDatabases,
+    name_or_slug: str
+) -> Dict:
+    """
+    Find a product by slug or name and return it together with its variants in one query.
+
+    Args:
+        mcp_toolbox: MCP Toolbox instance for database access
+        name_or_slug: Product slug, or (part of) the product name
+
+    Returns:
+        dict: Product summary plus variants with attributes (sizes, colors, etc.)
+    """
+    try:
+        logger.info("Fetching product with variants for: %s", name_or_slug)
+
+        sql_query = f"""
+        WITH p AS (
+            SELECT p.id, p.name, p.slug, p.short_description, p.price, p.compare_at_price, p.brand
+            FROM products p
+            WHERE p.status = 'active'
+            AND (p.slug = :name_or_slug
+                 OR {SEARCH_DOCUMENT_SQL} @@ plainto_tsquery('simple', immutable_unaccent(:name_or_slug)))
+            ORDER BY (p.slug = :name_or_slug) DESC, similarity(p.name, :name_or_slug) DESC
+            LIMIT 1
+        )
+        SELECT json_build_object(
+            'id', p.id,
+            'name', p.name,
+            'slug', p.slug,
+            'shortDescription', p.short_description,
+            'price', p.price::float8,
+            'compareAtPrice', p.compare_at_price::float8,
+            'brand', p.brand,
+            'variants', COALESCE((
+                SELECT json_agg(json_build_object(
+                    'id', v.id,
+                    'name', v.name,
+                    'sku', v.sku,
+                    'price', v.price::float8,
+                    'compareAtPrice', v.compare_at_price::float8,
+                    'stockQuantity', v.stock_quantity,
+                    'trackInventory', v.track_inventory,
+                    'attributes', COALESCE((
+                        SELECT json_object_agg(va.attribute_name, va.attribute_value)
+                        FROM variant_attributes va
+                        WHERE va.variant_id = v.id
+                    ), '{{}}'::json)
+                ) ORDER BY v.stock_quantity DESC)
+                FROM product_variants v
+                WHERE v.product_id = p.id
+            ), '[]'::json)
+        )
+        FROM p
+        """
+
+        result = mcp_toolbox.execute_sql(
+            query=sql_query,
+            parameters={'name_or_slug': name_or_slug},
+            statement_name='product_with_variants'
+        )
+
+        if not result.rows:
+            return {
+                "status": "error",
+                "error_message": f"Product '{name_or_slug}' not found"
+            }
+
+        row = result.rows[0][0]
+        variants = row["variants"]
+        product = {key: value for key, value in row.items() if key != "variants"}
+
+        sizes = {v["attributes"]["size"] for v in variants if "size" in v["attributes"]}
+        colors = {v["attributes"]["color"] for v in variants if "color" in v["attributes"]}
+
+        return {
+            "status": "success",
+            "product": product,
+            "variants": variants,
+            "availableSizes": sorted(sizes),
+            "availableColors": sorted(colors),
+            "totalVariants": len(variants)
+        }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        logger.error("Error fetching product with variants: %s", e, exc_info=True)
+        return {
+            "status": "error",
+            "error_message": f"Failed to get product with variants: {str(e)}"
+        }
+
+
 def get_categories_mcp(
     mcp_toolbox: MCPToolboxForDatabases
 ) -> Dict:
@@ -626,41 +987,35 @@ def get_categories_mcp(
         logger.info("Fetching all categories")
 
         sql_query = """
-        SELECT
-            c.id, c.name, c.slug, c.description, c.parent_id,
-            (
+        SELECT json_build_object(
+            'id', c.id,
+            'name', c.name,
+            'slug', c.slug,
+            'description', c.description,
+            'parentId', c.parent_id,
+            'children', COALESCE((
                 SELECT json_agg(json_build_object('id', child.id, 'name', child.name, 'slug', child.slug))
                 FROM categories child
                 WHERE child.parent_id = c.id
-            ) as children
+            ), '[]'::json)
+        )
         FROM categories c
         WHERE c.parent_id IS NULL
         ORDER BY c.name ASC
         """
 
-        result = mcp_toolbox.execute_sql(query=sql_query)
-
-        categories = []
-        for row in result.rows:
-            import json
-            children = json.loads(row[5]) if isinstance(row[5], str) else row[5] if row[5] else []
-            
-            category = {
-                "id": row[0],
-                "name": row[1],
-                "slug": row[2],
-                "description": row[3],
-                "parentId": row[4],
-                "children": children
-            }
-            categories.append(category)
+        result = mcp_toolbox.execute_sql(query=sql_query, statement_name='top_level_categories')
+
+        categories = [row[0] for row in result.rows]
 
         return {
             "status": "success",
             "categories": categories
         }
+    except DB_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching categories: {str(e)}", exc_info=True)
+        logger.error("Error fetching categories: %s", e, exc_info=True)
         return {
             "status": "error",
             "error_message": f"Failed to get categories: {str(e)}"
@@ -0,0 +1,34 @@
+-- Objects the ADK agent's product search queries require
+-- (mirrors database/schema.sql; see adk-agent/tools/product_tools.py).
+
+-- CreateExtension
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- CreateExtension
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- CreateFunction
+-- unaccent() is only STABLE; the wrapper may be used in generated columns and indexes
+CREATE OR REPLACE FUNCTION immutable_unaccent(text)
+RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- AlterTable
+-- Stored, weighted search document (name > brand > short description > description)
+ALTER TABLE "products" ADD COLUMN IF NOT EXISTS "search_vector" tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce("name", ''))), 'A') ||
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce("brand", ''))), 'B') ||
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce("short_description", ''))), 'C') ||
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce("description", ''))), 'D')
+    ) STORED;
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "idx_products_search_vector" ON "products" USING GIN ("search_vector");
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "idx_products_name_trgm" ON "products" USING GIN ("name" gin_trgm_ops);
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "idx_products_brand_trgm" ON "products" USING GIN ("brand" gin_trgm_ops);
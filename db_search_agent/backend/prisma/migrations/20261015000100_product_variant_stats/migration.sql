@@ -0,0 +1,51 @@
+-- Variant stock summary per product, kept current by a trigger on
+-- product_variants (mirrors database/schema.sql)
+
+-- AlterTable
+ALTER TABLE "products"
+    ADD COLUMN IF NOT EXISTS "in_stock_variant_count" INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS "total_stock_quantity" INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS "total_variants" INTEGER NOT NULL DEFAULT 0;
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION refresh_product_variant_stats(p_product_id INTEGER)
+RETURNS void AS $$
+    UPDATE products p
+    SET in_stock_variant_count = vs.in_stock_variants,
+        total_stock_quantity = vs.total_stock_quantity,
+        total_variants = vs.total_variants
+    FROM (
+        SELECT
+            COUNT(*) FILTER (WHERE v.stock_quantity > 0) AS in_stock_variants,
+            COALESCE(SUM(v.stock_quantity), 0) AS total_stock_quantity,
+            COUNT(*) AS total_variants
+        FROM product_variants v
+        WHERE v.product_id = p_product_id
+    ) vs
+    WHERE p.id = p_product_id
+    AND (p.in_stock_variant_count, p.total_stock_quantity, p.total_variants)
+        IS DISTINCT FROM (vs.in_stock_variants::int, vs.total_stock_quantity::int, vs.total_variants::int);
+$$ LANGUAGE sql;
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION product_variants_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM refresh_product_variant_stats(OLD.product_id);
+    END IF;
+    IF TG_OP <> 'DELETE' AND (TG_OP = 'INSERT' OR NEW.product_id <> OLD.product_id) THEN
+        PERFORM refresh_product_variant_stats(NEW.product_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- CreateTrigger
+DROP TRIGGER IF EXISTS product_variants_refresh_stats ON product_variants;
+CREATE TRIGGER product_variants_refresh_stats
+    AFTER INSERT OR DELETE OR UPDATE OF product_id, stock_quantity ON product_variants
+    FOR EACH ROW EXECUTE FUNCTION product_variants_stats_trigger();
+
+-- Backfill existing products
+SELECT refresh_product_variant_stats(id) FROM products;
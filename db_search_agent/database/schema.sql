@@ -108,12 +108,64 @@ CREATE TABLE IF NOT EXISTS product_reviews (
 CREATE INDEX IF NOT EXISTS idx_products_name ON products USING gin(to_tsvector('english', name));
 CREATE INDEX IF NOT EXISTS idx_products_description ON products USING gin(to_tsvector('english', description));
 
+-- Accent-insensitive product search used by the agent's search_products tool.
+-- unaccent() is only STABLE, so wrap it to allow use in an index expression.
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION immutable_unaccent(text)
+RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- Stored, weighted search document (name > brand > short description > description)
+-- so ranking reads it instead of re-tokenizing every matched row.
+-- Used as SEARCH_DOCUMENT_SQL in adk-agent/tools/product_tools.py.
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce(name, ''))), 'A') ||
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce(brand, ''))), 'B') ||
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce(short_description, ''))), 'C') ||
+        setweight(to_tsvector('simple', immutable_unaccent(coalesce(description, ''))), 'D')
+    ) STORED;
+
+-- Variant stock summary per product, kept current by the
+-- refresh_product_variant_stats trigger below, so product searches filter
+-- and report stock without aggregating product_variants.
+-- Note: PostgreSQL recomputes the stored search_vector on every UPDATE of a
+-- products row, including these stat refreshes.
+ALTER TABLE products
+    ADD COLUMN IF NOT EXISTS in_stock_variant_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_stock_quantity INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_variants INTEGER NOT NULL DEFAULT 0;
+
+-- Replaced by the index on the stored column
+DROP INDEX IF EXISTS idx_products_search;
+CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products USING gin(search_vector);
+
+-- Trigram indexes: typo-tolerant name matching (word similarity, <%) and
+-- substring brand filters (ILIKE '%...%') in the agent's search tools
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING gin(name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_brand_trgm ON products USING gin(brand gin_trgm_ops);
+
 -- Standard indexes for filtering and sorting
 CREATE INDEX IF NOT EXISTS idx_products_category ON products(category_id);
 CREATE INDEX IF NOT EXISTS idx_products_status ON products(status);
 CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
 CREATE INDEX IF NOT EXISTS idx_products_featured ON products(featured);
+
+-- Top-K orderings of search_products (featured first, newest first) over
+-- active products, so ORDER BY ... LIMIT can stop early on an index scan
+CREATE INDEX IF NOT EXISTS idx_products_active_featured_created
+    ON products(featured DESC, created_at DESC) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_products_active_category_featured_created
+    ON products(category_id, featured DESC, created_at DESC) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_products_active_price
+    ON products(price) WHERE status = 'active';
 CREATE INDEX IF NOT EXISTS idx_variant_attributes ON variant_attributes(attribute_name, attribute_value);
+-- Case-insensitive size/color filters in availability checks
+CREATE INDEX IF NOT EXISTS idx_variant_attributes_lower
+    ON variant_attributes(variant_id, attribute_name, LOWER(attribute_value));
 CREATE INDEX IF NOT EXISTS idx_product_tags_name ON product_tags(name);
 
 -- Additional useful indexes
@@ -122,6 +174,8 @@ CREATE INDEX IF NOT EXISTS idx_products_sku ON products(sku);
 CREATE INDEX IF NOT EXISTS idx_product_variants_product_id ON product_variants(product_id);
 CREATE INDEX IF NOT EXISTS idx_product_variants_stock ON product_variants(stock_quantity);
 CREATE INDEX IF NOT EXISTS idx_product_images_product_id ON product_images(product_id);
+-- Primary-image lookups in search results
+CREATE INDEX IF NOT EXISTS idx_product_images_primary ON product_images(product_id, sort_order) WHERE is_primary;
 CREATE INDEX IF NOT EXISTS idx_product_reviews_product_id ON product_reviews(product_id);
 
 -- ============================================
@@ -139,7 +193,14 @@ $$ language 'plpgsql';
 CREATE TRIGGER update_categories_updated_at BEFORE UPDATE ON categories
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_products_updated_at BEFORE UPDATE ON products
+-- Only edits of the product itself count: the variant stock summary columns
+-- (refresh_product_variant_stats below) are left out of the column list, so
+-- stock changes do not bump products.updated_at
+DROP TRIGGER IF EXISTS update_products_updated_at ON products;
+CREATE TRIGGER update_products_updated_at
+    BEFORE UPDATE OF name, slug, description, short_description, sku, price,
+        compare_at_price, cost_price, category_id, brand, status, featured
+    ON products
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 CREATE TRIGGER update_product_variants_updated_at BEFORE UPDATE ON product_variants
@@ -148,3 +209,46 @@ CREATE TRIGGER update_product_variants_updated_at BEFORE UPDATE ON product_varia
 CREATE TRIGGER update_product_reviews_updated_at BEFORE UPDATE ON product_reviews
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================
+-- Trigger for the products variant stock summary
+-- ============================================
+
+CREATE OR REPLACE FUNCTION refresh_product_variant_stats(p_product_id INTEGER)
+RETURNS void AS $$
+    UPDATE products p
+    SET in_stock_variant_count = vs.in_stock_variants,
+        total_stock_quantity = vs.total_stock_quantity,
+        total_variants = vs.total_variants
+    FROM (
+        SELECT
+            COUNT(*) FILTER (WHERE v.stock_quantity > 0) AS in_stock_variants,
+            COALESCE(SUM(v.stock_quantity), 0) AS total_stock_quantity,
+            COUNT(*) AS total_variants
+        FROM product_variants v
+        WHERE v.product_id = p_product_id
+    ) vs
+    WHERE p.id = p_product_id
+    AND (p.in_stock_variant_count, p.total_stock_quantity, p.total_variants)
+        IS DISTINCT FROM (vs.in_stock_variants::int, vs.total_stock_quantity::int, vs.total_variants::int);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION product_variants_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM refresh_product_variant_stats(OLD.product_id);
+    END IF;
+    IF TG_OP <> 'DELETE' AND (TG_OP = 'INSERT' OR NEW.product_id <> OLD.product_id) THEN
+        PERFORM refresh_product_variant_stats(NEW.product_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS product_variants_refresh_stats ON product_variants;
+CREATE TRIGGER product_variants_refresh_stats
+    AFTER INSERT OR DELETE OR UPDATE OF product_id, stock_quantity ON product_variants
+    FOR EACH ROW EXECUTE FUNCTION product_variants_stats_trigger();
+
+-- Backfill existing products
+SELECT refresh_product_variant_stats(id) FROM products;
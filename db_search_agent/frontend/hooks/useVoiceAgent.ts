@@ -15,6 +15,19 @@ interface Message {
   isTranscript?: boolean;
 }
 
+// The agent server sends JSON as binary (UTF-8) frames
+const textDecoder = new TextDecoder();
+
+interface AgentMessage {
+  mime_type?: string;
+  data?: string;
+  role?: string;
+  is_transcript?: boolean;
+  is_user_transcript?: boolean;
+  turn_complete?: boolean;
+  interrupted?: boolean;
+}
+
 export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
   const { sessionId: initialSessionId } = options;
   const [sessionId] = useState(
@@ -45,6 +58,7 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
         const wsUrl = `${wsProtocol}//${wsHost}/ws/${sessionId}?is_audio=${isAudio}`;
 
         const ws = new WebSocket(wsUrl);
+        ws.binaryType = "arraybuffer";
 
         ws.onopen = () => {
           console.log("WebSocket connection opened");
@@ -52,8 +66,7 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
           setError(null);
         };
 
-        ws.onmessage = (event) => {
-          const message = JSON.parse(event.data);
+        const handleMessage = (message: AgentMessage) => {
           console.log("[AGENT TO CLIENT]", message);
 
           // Handle turn complete
@@ -82,13 +95,14 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
           }
 
           // Handle audio data
-          if (message.mime_type === "audio/pcm" && audioPlayerNodeRef.current) {
+          if (message.mime_type === "audio/pcm" && message.data && audioPlayerNodeRef.current) {
             const audioData = base64ToArrayBuffer(message.data);
             audioPlayerNodeRef.current.port.postMessage(audioData);
           }
 
           // Handle text (transcript or regular text)
           if (message.mime_type === "text/plain") {
+            const text = message.data ?? "";
             // Check if this is a user transcript (input transcription)
             if (message.is_user_transcript && message.role === "user") {
               // Accumulate user transcripts into a single message
@@ -97,7 +111,7 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
                 currentUserTranscriptIdRef.current = Math.random().toString(36).substring(7);
                 const userMessage: Message = {
                   role: "user",
-                  content: message.data,
+                  content: text,
                   timestamp: new Date(),
                   isTranscript: true,
                 };
@@ -109,7 +123,7 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
                   const lastMessage = updated[updated.length - 1];
                   if (lastMessage && lastMessage.role === "user" && lastMessage.isTranscript) {
                     // Add space if needed
-                    lastMessage.content += (lastMessage.content && !lastMessage.content.endsWith(" ") ? " " : "") + message.data;
+                    lastMessage.content += (lastMessage.content && !lastMessage.content.endsWith(" ") ? " " : "") + text;
                   }
                   return updated;
                 });
@@ -129,7 +143,7 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
               currentMessageIdRef.current = Math.random().toString(36).substring(7);
               const newMessage: Message = {
                 role: messageRole as "user" | "agent",
-                content: message.data,
+                content: text,
                 timestamp: new Date(),
                 isTranscript: message.is_transcript || false,
               };
@@ -140,13 +154,13 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
                 const updated = [...prev];
                 const lastMessage = updated[updated.length - 1];
                 if (lastMessage && lastMessage.role === messageRole) {
-                  lastMessage.content += message.data;
+                  lastMessage.content += text;
                 } else {
                   // Different role, create new message
                   currentMessageIdRef.current = Math.random().toString(36).substring(7);
                   const newMessage: Message = {
                     role: messageRole as "user" | "agent",
-                    content: message.data,
+                    content: text,
                     timestamp: new Date(),
                     isTranscript: message.is_transcript || false,
                   };
@@ -158,6 +172,16 @@ export function useVoiceAgent(options: UseVoiceAgentOptions = {}) {
           }
         };
 
+        ws.onmessage = (event) => {
+          // The server batches text messages into a JSON array; audio arrives one per frame
+          const raw = typeof event.data === "string" ? event.data : textDecoder.decode(event.data);
+          const payload: AgentMessage | AgentMessage[] = JSON.parse(raw);
+          const batch = Array.isArray(payload) ? payload : [payload];
+          for (const message of batch) {
+            handleMessage(message);
+          }
+        };
+
         ws.onclose = () => {
           console.log("WebSocket connection closed");
           setIsConnected(false);
@@ -1,17 +1,114 @@
+import asyncio
+import contextlib
+import functools
 import os
 import logging
-from typing import AsyncGenerator
-from google.adk.agents import LlmAgent, BaseAgent, LoopAgent, SequentialAgent
+import re
+import time
+from typing import AsyncGenerator, Literal
+from google.adk.agents import LlmAgent, BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
-from google.adk.events import Event
+from google.adk.events import Event, EventActions
+from google.adk.models import BaseLlm, Gemini, LlmRequest
+from google.genai import types
+from pydantic import BaseModel, Field
+
+from .semantic_cache import CachedLlmAgent, load_encoder, story_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class _AgentLogAdapter(logging.LoggerAdapter):
+    """Prefix messages with "[agent name] "; only runs for records that pass the level check."""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['agent']}] {msg}", kwargs
+
+
 # Model to use (can be overridden via environment variable)
 MODEL = os.getenv("DEMO_AGENT_MODEL", "gemini-2.0-flash-001")
 
+# The review (short criticism, grammar list and a tone label) is a simple
+# classification / extraction task; point it at a smaller, faster model tier
+# (e.g. gemini-2.0-flash-lite-001) once its outputs have been compared
+# against MODEL on a sample of stories.
+REVIEW_MODEL = os.getenv("DEMO_REVIEW_MODEL", MODEL)
+
+# The tone label the workflow branches on, even if the model adds punctuation
+# or extra words around it
+_TONE_RE = re.compile(r"\b(positive|negative|neutral)\b", re.IGNORECASE)
+
+# Criticism that means "nothing to revise" (the reviewer is asked for 'No issues')
+_NO_ISSUES_RE = re.compile(r"^\s*(none|no issues?|looks good|lgtm)\b", re.IGNORECASE)
+
+# Upper bounds per run, to bound worst-case latency. The Reviser critiques and
+# revises its own draft a second time within one call, so one round is the default.
+MAX_REVISIONS = int(os.getenv("DEMO_MAX_REVISIONS", "1"))
+MAX_REGENERATIONS = int(os.getenv("DEMO_MAX_REGENERATIONS", "2"))
+
+# Prompt + completion tokens one run may spend; no new stage starts past it
+TOKEN_BUDGET = int(os.getenv("DEMO_TOKEN_BUDGET", "8000"))
+# Seconds one sub-agent stage may take, streaming included
+STAGE_TIMEOUT = float(os.getenv("DEMO_STAGE_TIMEOUT", "60"))
+
+
+if hasattr(asyncio, "timeout_at"):  # Python 3.11+
+    _timeout_at = asyncio.timeout_at
+else:
+    @contextlib.asynccontextmanager
+    async def _timeout_at(when: float):
+        """
+        Minimal asyncio.timeout_at for Python 3.10: cancel the current task
+        at loop time `when` and raise TimeoutError from the block.
+        """
+        task = asyncio.current_task()
+        expired = False
+
+        def expire():
+            nonlocal expired
+            expired = True
+            task.cancel()
+
+        handle = asyncio.get_running_loop().call_at(when, expire)
+        try:
+            yield
+        except asyncio.CancelledError:
+            if expired:
+                raise asyncio.TimeoutError from None
+            raise
+        finally:
+            handle.cancel()
+        if expired:
+            # Fired as the block finished: absorb the pending cancellation here
+            try:
+                await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                pass
+            raise asyncio.TimeoutError
+
+
+class _WorkflowAborted(Exception):
+    """Raised by a stage when the run must stop (token budget or stage timeout)."""
+
+    def __init__(self, error_code: str, message: str):
+        super().__init__(message)
+        self.error_code = error_code
+
+
+class StoryReview(BaseModel):
+    """Structured output of the CombinedReviewer: critic, grammar and tone in one call."""
+
+    criticism: str = Field(
+        description="1-2 sentences of constructive criticism, or exactly 'No issues' if nothing needs changing"
+    )
+    grammar_suggestions: str = Field(
+        description="Suggested grammar corrections as a list, or 'Grammar is good!' if there are no errors"
+    )
+    tone: Literal["positive", "negative", "neutral"] = Field(
+        description="Overall tone of the story"
+    )
+
 
 class StoryFlowAgent(BaseAgent):
     """
@@ -21,18 +118,19 @@ class StoryFlowAgent(BaseAgent):
     This agent demonstrates:
     - Custom orchestration logic beyond standard workflow agents
     - Conditional branching based on state
-    - Using LoopAgent and SequentialAgent as sub-agents
+    - One structured-output LLM call standing in for several reviewers
     - State management across multiple sub-agents
     """
 
-    # Field declarations for Pydantic
+    # Field declarations for Pydantic. Pydantic v2 validates these once in
+    # __init__ (no validate_assignment) and keeps them in the instance
+    # __dict__, so reads in _run_async_impl are plain attribute lookups.
     story_generator: LlmAgent
-    critic: LlmAgent
+    reviewer: LlmAgent
     reviser: LlmAgent
-    grammar_check: LlmAgent
-    tone_check: LlmAgent
-    loop_agent: LoopAgent
-    sequential_agent: SequentialAgent
+
+    # Logger that prefixes messages with this agent's name
+    _log: logging.LoggerAdapter
 
     # Allow arbitrary types for agent instances
     model_config = {"arbitrary_types_allowed": True}
@@ -41,10 +139,8 @@ class StoryFlowAgent(BaseAgent):
         self,
         name: str,
         story_generator: LlmAgent,
-        critic: LlmAgent,
+        reviewer: LlmAgent,
         reviser: LlmAgent,
-        grammar_check: LlmAgent,
-        tone_check: LlmAgent,
     ):
         """
         Initialize the StoryFlowAgent with its sub-agents.
@@ -52,41 +148,19 @@ class StoryFlowAgent(BaseAgent):
         Args:
             name: The name of the agent
             story_generator: LlmAgent that generates the initial story
-            critic: LlmAgent that critiques the story
+            reviewer: LlmAgent that critiques the story and checks its grammar
+                and tone in one structured (StoryReview) response
             reviser: LlmAgent that revises the story based on criticism
-            grammar_check: LlmAgent that checks grammar
-            tone_check: LlmAgent that analyzes the tone
         """
-        # Create internal workflow agents before calling super().__init__
-        loop_agent = LoopAgent(
-            name="CriticReviserLoop",
-            sub_agents=[critic, reviser],
-            max_iterations=2
-        )
-        sequential_agent = SequentialAgent(
-            name="PostProcessing",
-            sub_agents=[grammar_check, tone_check]
-        )
-
-        # Define the top-level sub-agents list
-        sub_agents_list = [
-            story_generator,
-            loop_agent,
-            sequential_agent,
-        ]
-
         # Initialize BaseAgent with sub-agents
         super().__init__(
             name=name,
             story_generator=story_generator,
-            critic=critic,
+            reviewer=reviewer,
             reviser=reviser,
-            grammar_check=grammar_check,
-            tone_check=tone_check,
-            loop_agent=loop_agent,
-            sequential_agent=sequential_agent,
-            sub_agents=sub_agents_list,
+            sub_agents=[story_generator, reviewer, reviser],
         )
+        self._log = _AgentLogAdapter(logger, {"agent": name})
 
     async def _run_async_impl(
         self, ctx: InvocationContext
@@ -94,110 +168,349 @@ class StoryFlowAgent(BaseAgent):
         """
         Implements the custom orchestration logic for the story workflow.
         This is where the conditional logic happens!
+
+        Every sub-agent event is yielded as soon as it is produced, so with
+        RunConfig(streaming_mode=StreamingMode.SSE) the client sees the story
+        tokens (partial events) while StoryGenerator is still writing. A stage
+        that needs the finished story starts once the previous agent's
+        final-response event (Event.is_final_response()) has been yielded:
+        that event carries the output_key state_delta, e.g. current_story.
         """
-        logger.info(f"[{self.name}] Starting story generation workflow.")
+        self._log.info("Starting story generation workflow.")
+
+        # Budget and timeouts end the run with an error event; the session
+        # keeps whatever story was produced so far
+        try:
+            async for event in self._workflow(ctx):
+                yield event
+        except _WorkflowAborted as exc:
+            self._log.warning("Workflow aborted: %s", exc)
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                error_code=exc.error_code,
+                error_message=str(exc),
+            )
+
+    async def _workflow(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        """The story workflow proper; stages raise _WorkflowAborted to stop it."""
+        # A similar topic was already written: serve the stored story
+        topic = self._topic(ctx)
+        if topic and story_cache is not None:
+            cached_story = await asyncio.to_thread(story_cache.lookup, topic)
+            if cached_story:
+                self._log.info("Story cache hit, skipping the workflow.")
+                yield Event(
+                    invocation_id=ctx.invocation_id,
+                    author=self.name,
+                    branch=ctx.branch,
+                    content=types.Content(role="model", parts=[types.Part(text=cached_story)]),
+                    actions=EventActions(state_delta={"current_story": cached_story}),
+                )
+                return
+
+        # Token usage is counted per run
+        yield self._state_event(ctx, {"_tokens": 0})
 
         # Step 1: Generate the initial story
-        logger.info(f"[{self.name}] Running StoryGenerator...")
-        async for event in self.story_generator.run_async(ctx):
+        self._log.info("Running StoryGenerator...")
+        async for event in self._run_stage(self.story_generator, ctx):
             yield event
 
         # Check if story was generated before proceeding
         if "current_story" not in ctx.session.state or not ctx.session.state["current_story"]:
-            logger.error(f"[{self.name}] Failed to generate initial story. Aborting workflow.")
+            self._log.error("Failed to generate initial story. Aborting workflow.")
             return
 
-        logger.info(f"[{self.name}] Story state after generator: {ctx.session.state.get('current_story')}")
+        self._log_story(ctx, "after generator")
 
-        # Step 2: Critic-Reviser Loop (runs critic and reviser up to 2 times)
-        logger.info(f"[{self.name}] Running CriticReviserLoop...")
-        async for event in self.loop_agent.run_async(ctx):
+        # Step 2: Review (criticism, grammar and tone from one LLM call)
+        async for event in self._review(ctx):
             yield event
 
-        logger.info(f"[{self.name}] Story state after loop: {ctx.session.state.get('current_story')}")
+        # Step 3: Revise while there is criticism; a positive story is kept as is
+        revisions = 0
+        while (
+            self._tone_check_result(ctx) != "positive"
+            and self._needs_revision(ctx)
+            and revisions < MAX_REVISIONS
+        ):
+            revisions += 1
+            self._log.info("Running Reviser (revision %d)...", revisions)
+            async for event in self._run_stage(self.reviser, ctx):
+                yield event
+            async for event in self._review(ctx):
+                yield event
+
+        self._log_story(ctx, "after revisions")
+
+        # Step 4: Conditional Logic - Regenerate while tone is negative,
+        # re-reviewing each new story
+        tone_check_result = self._tone_check_result(ctx)
+        self._log.info("Tone check result: %s", tone_check_result)
+
+        if tone_check_result != "negative":
+            self._log.info("Tone is not negative. Keeping current story.")
+        else:
+            for attempt in range(1, MAX_REGENERATIONS + 1):
+                self._log.info("Tone is negative. Regenerating story (attempt %d)...", attempt)
+                yield self._state_event(ctx, {"_regen_count": attempt})
+                async for event in self._run_stage(self.story_generator, ctx):
+                    yield event
+                async for event in self._review(ctx):
+                    yield event
+                if self._tone_check_result(ctx) != "negative":
+                    break
+
+            self._log.info("Tone after regeneration: %s", self._tone_check_result(ctx))
+
+        # Only stories that ended up non-negative are worth serving again
+        if topic and story_cache is not None and self._tone_check_result(ctx) != "negative":
+            await asyncio.to_thread(story_cache.store, topic, ctx.session.state["current_story"])
+
+        self._log.info("Workflow finished.")
 
-        # Step 3: Sequential Post-Processing (Grammar and Tone Check)
-        logger.info(f"[{self.name}] Running PostProcessing...")
-        async for event in self.sequential_agent.run_async(ctx):
+    async def warmup(self) -> None:
+        """
+        Open each model client and load the embedding model before the first
+        request, so it does not pay TLS/auth setup and model loading.
+
+        Call once from the hosting app's startup hook, e.g.
+        `await story_flow_agent.agent.root_agent.warmup()`. Failures are
+        logged and otherwise ignored.
+        """
+        models = {}
+        for agent in (self.story_generator, self.reviewer, self.reviser):
+            llm = agent.canonical_model
+            models.setdefault(llm.model, llm)
+
+        results = await asyncio.gather(
+            asyncio.to_thread(load_encoder),
+            *(self._ping(llm) for llm in models.values()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self._log.warning("Warm-up step failed: %s", result)
+        self._log.info("Warm-up done (%d models).", len(models))
+
+    @staticmethod
+    async def _ping(llm: BaseLlm) -> None:
+        """One-token generation, just to establish the client connection."""
+        request = LlmRequest(
+            model=llm.model,
+            contents=[types.Content(role="user", parts=[types.Part(text="ping")])],
+            config=types.GenerateContentConfig(max_output_tokens=1),
+        )
+        async for _ in llm.generate_content_async(request):
+            pass
+
+    async def _review(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        """
+        Run the CombinedReviewer and copy its fields to the state keys the
+        workflow and the reviser read: criticism, grammar_suggestions and
+        tone_check_result.
+        """
+        self._log.info("Running CombinedReviewer...")
+        async for event in self._run_stage(self.reviewer, ctx):
             yield event
 
-        # Step 4: Conditional Logic - Regenerate if tone is negative
-        tone_check_result = ctx.session.state.get("tone_check_result", "").strip().lower()
-        logger.info(f"[{self.name}] Tone check result: {tone_check_result}")
+        review = ctx.session.state.get("review") or {}
+        yield self._state_event(ctx, {
+            "criticism": review.get("criticism", "").strip(),
+            "grammar_suggestions": review.get("grammar_suggestions", ""),
+            "tone_check_result": review.get("tone", ""),
+        })
 
-        if tone_check_result == "negative":
-            logger.info(f"[{self.name}] Tone is negative. Regenerating story...")
-            # Regenerate the story by running the generator again
-            async for event in self.story_generator.run_async(ctx):
+    async def _run_stage(
+        self, agent: BaseAgent, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        """
+        Forward one sub-agent's events unbuffered, logging time to first event
+        and final response.
+
+        The stage's token usage (usage_metadata of its complete responses) is
+        added to the run total in state['_tokens']. Raises _WorkflowAborted
+        instead of starting the stage once the run is over TOKEN_BUDGET, or
+        when the stage runs longer than STAGE_TIMEOUT.
+        """
+        tokens = ctx.session.state.get("_tokens", 0)
+        if tokens > TOKEN_BUDGET:
+            raise _WorkflowAborted(
+                "TOKEN_BUDGET_EXCEEDED", f"{tokens} tokens used, budget is {TOKEN_BUDGET}; {agent.name} not run"
+            )
+
+        used = 0
+        started = time.perf_counter()
+        first_event = True
+        # One deadline for the whole stage. Each step of the sub-agent runs in
+        # this task (no wait_for task per event), so ADK's tracing spans and
+        # context variables stay in one context across steps.
+        deadline = asyncio.get_running_loop().time() + STAGE_TIMEOUT
+        events = agent.run_async(ctx)
+        try:
+            while True:
+                try:
+                    async with _timeout_at(deadline):
+                        event = await events.__anext__()
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise _WorkflowAborted(
+                        "STAGE_TIMEOUT", f"{agent.name} exceeded {STAGE_TIMEOUT:g}s"
+                    ) from None
+                if first_event:
+                    self._log.info("%s first event after %.2fs", agent.name, time.perf_counter() - started)
+                    first_event = False
+                if event.is_final_response():
+                    self._log.info("%s final response after %.2fs", event.author, time.perf_counter() - started)
+                if not event.partial and event.usage_metadata and event.usage_metadata.total_token_count:
+                    used += event.usage_metadata.total_token_count
                 yield event
-        else:
-            logger.info(f"[{self.name}] Tone is not negative. Keeping current story.")
-
-        logger.info(f"[{self.name}] Workflow finished.")
-
-
-# Define the individual LLM sub-agents
-story_generator = LlmAgent(
-    name="StoryGenerator",
-    model=MODEL,
-    instruction=(
-        "You are a creative story writer. Write a short story (around 100-150 words) "
-        "based on the topic provided by the user in their message or in session state with key 'topic'. "
-        "Extract the topic from the user's message if provided. Make it engaging and well-written."
-    ),
-    output_key="current_story"  # Stores output in session state
-)
-
-critic = LlmAgent(
-    name="Critic",
-    model=MODEL,
-    instruction=(
-        "You are a story critic. Review the story provided in session state with key 'current_story'. "
-        "Provide 1-2 sentences of constructive criticism on how to improve it. "
-        "Focus on plot, character development, or narrative flow."
-    ),
-    output_key="criticism"  # Stores criticism in session state
-)
-
-reviser = LlmAgent(
-    name="Reviser",
-    model=MODEL,
-    instruction=(
-        "You are a story reviser. Revise the story provided in session state with key 'current_story', "
-        "based on the criticism in session state with key 'criticism'. "
-        "Output only the revised story, making it better while keeping the core narrative."
-    ),
-    output_key="current_story"  # Overwrites the original story
-)
-
-grammar_check = LlmAgent(
-    name="GrammarCheck",
-    model=MODEL,
-    instruction=(
-        "You are a grammar checker. Check the grammar of the story provided in session state "
-        "with key 'current_story'. Output only the suggested corrections as a list, "
-        "or output 'Grammar is good!' if there are no errors."
-    ),
-    output_key="grammar_suggestions"
-)
-
-tone_check = LlmAgent(
-    name="ToneCheck",
-    model=MODEL,
-    instruction=(
-        "You are a tone analyzer. Analyze the tone of the story provided in session state "
-        "with key 'current_story'. Output only one word: 'positive' if the tone is generally "
-        "positive, 'negative' if the tone is generally negative, or 'neutral' otherwise."
-    ),
-    output_key="tone_check_result"  # This determines the conditional flow!
-)
+        finally:
+            await events.aclose()
+
+        if used:
+            yield self._state_event(ctx, {"_tokens": tokens + used})
+
+    def _log_story(self, ctx: InvocationContext, stage: str) -> None:
+        """Log the story length; the full text only at DEBUG."""
+        story = ctx.session.state.get("current_story") or ""
+        self._log.info("Story state %s (%d chars)", stage, len(story))
+        if self._log.isEnabledFor(logging.DEBUG):
+            self._log.debug("Story %s: %s", stage, story)
+
+    @staticmethod
+    def _topic(ctx: InvocationContext) -> str:
+        """The 'topic' state value, else the text of the user's message."""
+        topic = ctx.session.state.get("topic")
+        if not topic and ctx.user_content and ctx.user_content.parts:
+            topic = " ".join(part.text for part in ctx.user_content.parts if part.text)
+        return (topic or "").strip()
+
+    @staticmethod
+    def _tone_check_result(ctx: InvocationContext) -> str:
+        match = _TONE_RE.search(ctx.session.state.get("tone_check_result") or "")
+        return match.group(1).lower() if match else "neutral"
+
+    @staticmethod
+    def _needs_revision(ctx: InvocationContext) -> bool:
+        criticism = ctx.session.state.get("criticism", "")
+        return bool(criticism) and not _NO_ISSUES_RE.match(criticism)
+
+    def _state_event(self, ctx: InvocationContext, state_delta: dict) -> Event:
+        """Event that records orchestration state (applied to the session when yielded)."""
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+@functools.cache
+def _llm(model: str) -> Gemini:
+    """
+    One Gemini instance per model name, shared by every sub-agent using it.
+
+    An LlmAgent given a model *name* builds a new Gemini wrapper, and with it
+    a new API client and connection pool, on each model call. A shared
+    instance keeps one client, so calls reuse its open connections.
+    """
+    return Gemini(model=model)
+
+
+# Define the individual LLM sub-agents.
+# They are built on first use (see __getattr__ below), so importing this
+# module does not construct and validate every agent up front.
+#
+# No explicit Gemini context cache (cached_content) is created for
+# current_story: cached content cannot be combined with a per-agent system
+# instruction, a 100-150 word story is far below the minimum cacheable size,
+# and each story version is read once by the reviewer and at most once by
+# the reviser, so a cache would never be hit.
+#
+# Instructions are plain strings built once per process with their agent;
+# Gemini tokenizes prompts server-side and the API takes no pre-tokenized
+# input, so there is no client-side tokenization to precompute.
+@functools.cache
+def _story_generator() -> LlmAgent:
+    return LlmAgent(
+        name="StoryGenerator",
+        model=_llm(MODEL),
+        instruction=(
+            "You are a creative story writer. Write a short story (around 100-150 words) "
+            "based on the topic provided by the user in their message or in session state with key 'topic'. "
+            "Extract the topic from the user's message if provided. Make it engaging and well-written."
+        ),
+        output_key="current_story"  # Stores output in session state
+    )
+
+
+# The review depends only on the story, so a story reviewed before reuses its
+# review instead of calling the model. Only an identical story hits: the
+# review drives revision and regeneration, so a revised or regenerated story
+# must be reviewed afresh.
+@functools.cache
+def _reviewer() -> LlmAgent:
+    return CachedLlmAgent(
+        name="CombinedReviewer",
+        model=_llm(REVIEW_MODEL),
+        instruction=(
+            "You are a story critic, grammar checker and tone analyzer. Review the story provided "
+            "in session state with key 'current_story' and return: 'criticism' - 1-2 sentences of "
+            "constructive criticism on plot, character development, or narrative flow, or exactly "
+            "'No issues' if nothing needs changing; "
+            "'grammar_suggestions' - the suggested corrections as a list, or 'Grammar is good!' "
+            "if there are no errors; 'tone' - 'positive', 'negative' or 'neutral'."
+        ),
+        output_schema=StoryReview,
+        # A short review; cap it so a rambling answer cannot run long
+        generate_content_config=types.GenerateContentConfig(max_output_tokens=512),
+        output_key="review",
+        cache_input_keys=["current_story"]
+    )
+
+
+@functools.cache
+def _reviser() -> LlmAgent:
+    return LlmAgent(
+        name="Reviser",
+        model=_llm(MODEL),
+        instruction=(
+            "You are a story reviser. Revise the story provided in session state with key 'current_story', "
+            "based on the criticism in session state with key 'criticism' and the grammar suggestions "
+            "in session state with key 'grammar_suggestions'. "
+            "Then critique your revision yourself and revise it once more. "
+            "Output only the final revised story, making it better while keeping the core narrative."
+        ),
+        output_key="current_story"  # Overwrites the original story
+    )
+
 
 # Instantiate the custom agent with all sub-agents
-root_agent = StoryFlowAgent(
-    name="story_flow_agent",
-    story_generator=story_generator,
-    critic=critic,
-    reviser=reviser,
-    grammar_check=grammar_check,
-    tone_check=tone_check,
-)
\ No newline at end of file
+@functools.cache
+def _root_agent() -> StoryFlowAgent:
+    return StoryFlowAgent(
+        name="story_flow_agent",
+        story_generator=_story_generator(),
+        reviewer=_reviewer(),
+        reviser=_reviser(),
+    )
+
+
+_LAZY_AGENTS = {
+    "root_agent": _root_agent,
+    "story_generator": _story_generator,
+    "reviewer": _reviewer,
+    "reviser": _reviser,
+}
+
+
+def __getattr__(name: str):
+    """Module attribute hook (PEP 562): `agent.root_agent` builds the agents on first access."""
+    factory = _LAZY_AGENTS.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return factory()
@@ -0,0 +1,250 @@
+"""
+Caches for the story workflow.
+
+CachedLlmAgent replays a sub-agent's stored response when its effective
+prompt (its instruction plus the session-state values it reads) is identical
+to an earlier one.
+
+TopicStoryCache works on whole runs: finished stories are kept on disk
+(SQLite) and served again for a semantically similar topic, compared by
+sentence-transformers embeddings. Without sentence-transformers installed,
+only identical topics hit.
+"""
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import AsyncGenerator, List, Optional, Tuple
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+
+try:
+    import numpy as np
+except ImportError:  # only needed together with sentence-transformers
+    np = None
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("DEMO_RESPONSE_CACHE_SIZE", "1000"))
+EMBEDDING_MODEL = os.getenv("DEMO_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Persistent topic -> final story store; set DEMO_STORY_CACHE_PATH="" to disable
+STORY_CACHE_PATH = os.getenv(
+    "DEMO_STORY_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "story_flow", "stories.sqlite3")
+)
+STORY_CACHE_THRESHOLD = float(os.getenv("DEMO_STORY_CACHE_THRESHOLD", "0.92"))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoder():
+    """Load the sentence-transformers model once, or None if it is not installed."""
+    if np is None:
+        logger.info("numpy not installed, story cache only matches identical topics")
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.info("sentence-transformers not installed, story cache only matches identical topics")
+        return None
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def load_encoder() -> None:
+    """Load the embedding model now instead of on the first cache lookup."""
+    _get_encoder()
+
+
+@functools.lru_cache(maxsize=256)
+def _embed(prompt: str):
+    """
+    Unit-length embedding of prompt (cosine similarity is then a dot product).
+
+    Memoized, so a topic looked up and then stored in one run goes through
+    the model once. Callers must not modify the returned array in place.
+    """
+    encoder = _get_encoder()
+    if encoder is None:
+        return None
+    return encoder.encode(prompt, normalize_embeddings=True)
+
+
+class ResponseCache:
+    """
+    LRU store of (agent name, prompt) -> response events.
+
+    Only identical prompts hit: a cached agent's output may drive the
+    workflow's branches, and a near-identical prompt (e.g. a revised story)
+    must get a fresh response.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], List[Event]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, agent_name: str, prompt: str) -> Optional[List[Event]]:
+        key = (agent_name, prompt)
+        with self._lock:
+            events = self._entries.get(key)
+            if events is not None:
+                self._entries.move_to_end(key)
+            return events
+
+    def store(self, agent_name: str, prompt: str, events: List[Event]) -> None:
+        key = (agent_name, prompt)
+        with self._lock:
+            self._entries[key] = events
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+
+class CachedLlmAgent(LlmAgent):
+    """
+    LlmAgent that replays its cached response for an identical input.
+
+    `cache_input_keys` names the session-state keys the instruction reads;
+    together with the instruction they form the cache key. Replayed events
+    carry the original state_delta, so `output_key` is written as usual.
+    """
+
+    cache_input_keys: List[str] = []
+
+    def _cache_prompt(self, ctx: InvocationContext) -> str:
+        instruction = self.instruction if isinstance(self.instruction, str) else self.name
+        inputs = [str(ctx.session.state.get(key, "")) for key in self.cache_input_keys]
+        return "\n".join([instruction, *inputs])
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        prompt = self._cache_prompt(ctx)
+
+        cached = response_cache.lookup(self.name, prompt)
+        if cached is not None:
+            logger.info("[%s] Response cache hit, skipping LLM call.", self.name)
+            for event in cached:
+                yield event.model_copy(
+                    update={
+                        "id": Event.new_id(),
+                        "invocation_id": ctx.invocation_id,
+                        "branch": ctx.branch,
+                        "timestamp": time.time(),
+                        # A replay costs no tokens
+                        "usage_metadata": None,
+                    },
+                    deep=True,
+                )
+            return
+
+        events = []
+        async for event in super()._run_async_impl(ctx):
+            if not event.partial:
+                events.append(event.model_copy(deep=True))
+            yield event
+
+        # Only complete, successful responses are worth replaying
+        if events and events[-1].is_final_response() and not any(e.error_code for e in events):
+            response_cache.store(self.name, prompt, events)
+
+
+class TopicStoryCache:
+    """
+    Finished stories keyed by topic, persisted in SQLite.
+
+    Topic embeddings are kept in memory as one matrix, so a lookup is a
+    single matrix product; a cosine similarity of at least `threshold` is a
+    hit. Without an embedding model, topics must match exactly (ignoring case).
+    Methods block on disk I/O and embedding; call them from a worker thread.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.92):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._ids: Optional[List[int]] = None
+        self._topics: List[str] = []
+        self._vectors = None
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stories ("
+            "id INTEGER PRIMARY KEY, topic TEXT NOT NULL, story TEXT NOT NULL, "
+            "embedding BLOB, hit_count INTEGER NOT NULL DEFAULT 0)"
+        )
+        return conn
+
+    def _load(self) -> None:
+        """Read the topic index from disk once (caller holds the lock)."""
+        if self._ids is not None:
+            return
+        use_vectors = _get_encoder() is not None
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, topic, embedding FROM stories"
+                + (" WHERE embedding IS NOT NULL" if use_vectors else "")
+            ).fetchall()
+        self._ids = [row[0] for row in rows]
+        self._topics = [row[1].casefold() for row in rows]
+        if use_vectors and rows:
+            self._vectors = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+
+    def lookup(self, topic: str) -> Optional[str]:
+        vector = _embed(topic)
+        with self._lock:
+            self._load()
+            if not self._ids:
+                return None
+            if vector is not None and self._vectors is not None:
+                similarities = self._vectors @ vector
+                index = int(np.argmax(similarities))
+                if similarities[index] < self.threshold:
+                    return None
+            else:
+                try:
+                    index = self._topics.index(topic.casefold())
+                except ValueError:
+                    return None
+            story_id = self._ids[index]
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE stories SET hit_count = hit_count + 1 WHERE id = ?", (story_id,))
+            row = conn.execute("SELECT story FROM stories WHERE id = ?", (story_id,)).fetchone()
+        return row[0] if row else None
+
+    def store(self, topic: str, story: str) -> None:
+        vector = _embed(topic)
+        if vector is not None:
+            vector = vector.astype(np.float32)
+        with self._lock:
+            self._load()
+            with closing(self._connect()) as conn, conn:
+                cursor = conn.execute(
+                    "INSERT INTO stories (topic, story, embedding) VALUES (?, ?, ?)",
+                    (topic, story, vector.tobytes() if vector is not None else None),
+                )
+            self._ids.append(cursor.lastrowid)
+            self._topics.append(topic.casefold())
+            if vector is not None:
+                self._vectors = (
+                    vector[np.newaxis, :] if self._vectors is None
+                    else np.vstack([self._vectors, vector])
+                )
+
+
+story_cache = TopicStoryCache(STORY_CACHE_PATH, STORY_CACHE_THRESHOLD) if STORY_CACHE_PATH else None